@@ -1,15 +1,18 @@
-﻿import React, { useMemo, useState } from "react";
+﻿import React, { useEffect, useMemo, useState } from "react";
 
 import { CallScreen } from "./components/CallScreen";
 import { Scorecard } from "./components/Scorecard";
 import {
+  STT_STREAM_URL,
   createSession,
-  generateDialogueTurn,
+  endSession,
+  fetchLiveScore,
   scoreSession,
-  synthesizeSpeech,
-  transcribeAudio,
+  scoreSessionById,
+  streamDialogueSpeech,
+  streamSpeech,
 } from "./lib/api";
-import { createPressToTalkRecorder, playWavBytes } from "./lib/audio";
+import { createStreamingRecorder, playPcmStream, playWavBytes } from "./lib/audio";
 import type { ScoreSessionResponse, TranscriptTurn } from "./types/session";
 
 type AppState = "idle" | "in_call" | "post_call";
@@ -33,19 +36,53 @@ export function App(): JSX.Element {
   const [valueStatement, setValueStatement] = useState<boolean>(false);
   const [objectionResolved, setObjectionResolved] = useState<boolean>(false);
   const [score, setScore] = useState<ScoreSessionResponse>(EMPTY_SCORE);
-
-  const recorder = useMemo(() => createPressToTalkRecorder(), []);
+  const [liveScore, setLiveScore] = useState<number | null>(null);
+  const [turnTimings, setTurnTimings] = useState<Record<string, number>>({});
+
+  const recorder = useMemo(() => createStreamingRecorder(STT_STREAM_URL), []);
+
+  useEffect(() => {
+    if (state !== "in_call" || !sessionId) return undefined;
+    const outcomes = {
+      close_attempt: closeAttempt,
+      value_statement: valueStatement,
+      objection_resolved: objectionResolved,
+    };
+    const poll = (): void => {
+      fetchLiveScore(sessionId, outcomes)
+        .then((live) => setLiveScore(live.total_score))
+        .catch(() => setLiveScore(null));
+    };
+    poll();
+    const timer = window.setInterval(poll, 5000);
+    return () => window.clearInterval(timer);
+  }, [state, sessionId, closeAttempt, valueStatement, objectionResolved, transcript.length]);
 
   async function startCall(): Promise<void> {
     const created = await createSession({ durationMinutes: 8 });
     setSessionId(created.session_id);
-    setTranscript([]);
+    // The prospect picks up first; the opener was prepared before the call started.
+    setTranscript(
+      created.opening_line
+        ? [{ speaker: "prospect", text: created.opening_line, ts: new Date().toISOString() }]
+        : [],
+    );
     setTrust(0.4);
     setResistance(0.6);
     setCloseAttempt(false);
     setValueStatement(false);
     setObjectionResolved(false);
+    setLiveScore(null);
     setState("in_call");
+    if (created.opening_audio) {
+      const wav = Uint8Array.from(atob(created.opening_audio), (c) => c.charCodeAt(0));
+      await playWavBytes(wav.buffer);
+    } else if (created.opening_line) {
+      // No pre-rendered audio (the pool was empty): stream the opener so it starts on the first chunk.
+      await streamSpeech(created.opening_line)
+        .then(playPcmStream)
+        .catch(() => undefined);
+    }
   }
 
   async function onPressStart(): Promise<void> {
@@ -60,8 +97,8 @@ export function App(): JSX.Element {
     setIsProcessingTurn(true);
 
     try {
-      const audioBlob = await recorder.stop();
-      const traineeText = await transcribeAudio(audioBlob);
+      // Audio was transcribed while the trainee spoke; this only waits for the last utterance.
+      const traineeText = await recorder.finish();
       const traineeTurn: TranscriptTurn = {
         speaker: "trainee",
         text: traineeText,
@@ -69,25 +106,30 @@ export function App(): JSX.Element {
       };
       setTranscript((prev) => [...prev, traineeTurn]);
 
-      const dialogue = await generateDialogueTurn({
+      // Each sentence arrives with its own audio, so playback starts before the reply is complete.
+      for await (const frame of streamDialogueSpeech({
         trust,
         resistance,
         traineeText,
         primaryObjection: "busy",
-      });
-
-      setTrust(dialogue.trust);
-      setResistance(dialogue.resistance);
-
-      const prospectTurn: TranscriptTurn = {
-        speaker: "prospect",
-        text: dialogue.text,
-        ts: new Date().toISOString(),
-      };
-      setTranscript((prev) => [...prev, prospectTurn]);
-
-      const wav = await synthesizeSpeech(dialogue.text);
-      await playWavBytes(wav);
+        sessionId,
+      })) {
+        if (frame.type === "state") {
+          setTrust(frame.trust);
+          setResistance(frame.resistance);
+        } else if (frame.type === "audio") {
+          const wav = Uint8Array.from(atob(frame.audio), (c) => c.charCodeAt(0));
+          await playWavBytes(wav.buffer);
+        } else if (frame.type === "done") {
+          setTurnTimings(frame.timings ?? {});
+          const prospectTurn: TranscriptTurn = {
+            speaker: "prospect",
+            text: frame.text,
+            ts: new Date().toISOString(),
+          };
+          setTranscript((prev) => [...prev, prospectTurn]);
+        }
+      }
     } finally {
       setIsProcessingTurn(false);
     }
@@ -95,14 +137,17 @@ export function App(): JSX.Element {
 
   async function endCall(): Promise<void> {
     if (!sessionId) return;
-    const scored = await scoreSession({
-      transcript,
-      outcomes: {
-        close_attempt: closeAttempt,
-        value_statement: valueStatement,
-        objection_resolved: objectionResolved,
-      },
-    });
+    const outcomes = {
+      close_attempt: closeAttempt,
+      value_statement: valueStatement,
+      objection_resolved: objectionResolved,
+    };
+    // Ending flushes the turn log; the conversation stays on the server for scoring.
+    await endSession(sessionId).catch(() => undefined);
+    // The server already holds the running counts; resend the transcript only if it lost the session.
+    const scored = await scoreSessionById(sessionId, outcomes).catch(() =>
+      scoreSession({ transcript, outcomes }),
+    );
     setScore(scored);
     setState("post_call");
   }
@@ -111,6 +156,8 @@ export function App(): JSX.Element {
     return (
       <CallScreen
         transcript={transcript}
+        liveScore={liveScore}
+        turnTimings={turnTimings}
         isRecording={isRecording}
         isProcessingTurn={isProcessingTurn}
         closeAttempt={closeAttempt}
@@ -4,6 +4,8 @@ import type { TranscriptTurn } from "../types/session";
 
 type CallScreenProps = {
   transcript: TranscriptTurn[];
+  liveScore: number | null;
+  turnTimings: Record<string, number>;
   isRecording: boolean;
   isProcessingTurn: boolean;
   closeAttempt: boolean;
@@ -19,6 +21,8 @@ type CallScreenProps = {
 
 export function CallScreen({
   transcript,
+  liveScore,
+  turnTimings,
   isRecording,
   isProcessingTurn,
   closeAttempt,
@@ -35,6 +39,15 @@ export function CallScreen({
     <section>
       <h2>Call in progress</h2>
       <p>{isProcessingTurn ? "Processing turn..." : "Live prospect simulation is active."}</p>
+      {liveScore !== null && <p>Live score: {liveScore}</p>}
+      {Object.keys(turnTimings).length > 0 && (
+        <p>
+          Last turn:{" "}
+          {Object.entries(turnTimings)
+            .map(([stage, ms]) => `${stage} ${Math.round(ms)} ms`)
+            .join(" · ")}
+        </p>
+      )}
 
       <button
         type="button"
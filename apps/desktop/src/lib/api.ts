@@ -1,13 +1,17 @@
 ﻿import type {
+  DialogueSpeechFrame,
   DialogueTurnRequest,
   DialogueTurnResponse,
+  ScoreOutcomes,
   ScoreSessionRequest,
   ScoreSessionResponse,
   SessionCreateRequest,
   SessionCreateResponse,
+  SpeechStream,
 } from "../types/session";
 
 const API_BASE = "http://127.0.0.1:8000";
+export const STT_STREAM_URL = "ws://127.0.0.1:8000/stt/stream";
 
 export async function createSession(
   payload: SessionCreateRequest,
@@ -27,7 +31,8 @@ export async function createSession(
 
 export async function transcribeAudio(audioBlob: Blob): Promise<string> {
   const form = new FormData();
-  form.append("audio", audioBlob, "turn.wav");
+  // Name the part after what MediaRecorder actually produced; the backend decodes by content.
+  form.append("audio", audioBlob, audioBlob.type.includes("wav") ? "turn.wav" : "turn.webm");
 
   const resp = await fetch(`${API_BASE}/stt/transcribe`, {
     method: "POST",
@@ -53,6 +58,7 @@ export async function generateDialogueTurn(
       resistance: payload.resistance,
       trainee_text: payload.traineeText,
       primary_objection: payload.primaryObjection,
+      session_id: payload.sessionId,
     }),
   });
 
@@ -63,6 +69,44 @@ export async function generateDialogueTurn(
   return (await resp.json()) as DialogueTurnResponse;
 }
 
+export async function* streamDialogueSpeech(
+  payload: DialogueTurnRequest,
+): AsyncGenerator<DialogueSpeechFrame> {
+  const resp = await fetch(`${API_BASE}/dialogue/turn/speech`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      trust: payload.trust,
+      resistance: payload.resistance,
+      trainee_text: payload.traineeText,
+      primary_objection: payload.primaryObjection,
+      session_id: payload.sessionId,
+    }),
+  });
+
+  if (!resp.ok || !resp.body) {
+    throw new Error(`Failed dialogue speech: ${resp.status}`);
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    let newline = buffered.indexOf("\n");
+    while (newline >= 0) {
+      const line = buffered.slice(0, newline).trim();
+      buffered = buffered.slice(newline + 1);
+      if (line) {
+        yield JSON.parse(line) as DialogueSpeechFrame;
+      }
+      newline = buffered.indexOf("\n");
+    }
+  }
+}
+
 export async function synthesizeSpeech(text: string): Promise<ArrayBuffer> {
   const resp = await fetch(`${API_BASE}/tts/synthesize`, {
     method: "POST",
@@ -77,6 +121,33 @@ export async function synthesizeSpeech(text: string): Promise<ArrayBuffer> {
   return await resp.arrayBuffer();
 }
 
+export async function streamSpeech(text: string): Promise<SpeechStream> {
+  const resp = await fetch(`${API_BASE}/tts/synthesize?format=pcm`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ text }),
+  });
+
+  if (!resp.ok || !resp.body) {
+    throw new Error(`Failed speech synthesis: ${resp.status}`);
+  }
+
+  const reader = resp.body.getReader();
+  return {
+    sampleRate: Number(resp.headers.get("X-Audio-Sample-Rate") ?? 22050),
+    channels: Number(resp.headers.get("X-Audio-Channels") ?? 1),
+    chunks: {
+      async *[Symbol.asyncIterator]() {
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) return;
+          if (value) yield value;
+        }
+      },
+    },
+  };
+}
+
 export async function scoreSession(
   payload: ScoreSessionRequest,
 ): Promise<ScoreSessionResponse> {
@@ -92,3 +163,47 @@ export async function scoreSession(
 
   return (await resp.json()) as ScoreSessionResponse;
 }
+
+// Scores from the server's running per-session counts; cheap enough to poll during the call.
+export async function fetchLiveScore(
+  sessionId: string,
+  outcomes: ScoreOutcomes,
+): Promise<ScoreSessionResponse> {
+  const params = new URLSearchParams({
+    close_attempt: String(outcomes.close_attempt),
+    value_statement: String(outcomes.value_statement),
+    objection_resolved: String(outcomes.objection_resolved),
+  });
+  const resp = await fetch(`${API_BASE}/sessions/${sessionId}/score/live?${params}`);
+
+  if (!resp.ok) {
+    throw new Error(`Failed live scoring: ${resp.status}`);
+  }
+
+  return (await resp.json()) as ScoreSessionResponse;
+}
+
+export async function endSession(sessionId: string): Promise<void> {
+  const resp = await fetch(`${API_BASE}/sessions/${sessionId}/end`, { method: "POST" });
+
+  if (!resp.ok) {
+    throw new Error(`Failed to end session: ${resp.status}`);
+  }
+}
+
+export async function scoreSessionById(
+  sessionId: string,
+  outcomes: ScoreOutcomes,
+): Promise<ScoreSessionResponse> {
+  const resp = await fetch(`${API_BASE}/sessions/${sessionId}/score`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ outcomes }),
+  });
+
+  if (!resp.ok) {
+    throw new Error(`Failed session scoring: ${resp.status}`);
+  }
+
+  return (await resp.json()) as ScoreSessionResponse;
+}
@@ -1,4 +1,6 @@
-﻿export type PressToTalkRecorder = {
+﻿import type { SpeechStream } from "../types/session";
+
+export type PressToTalkRecorder = {
   start: () => Promise<void>;
   stop: () => Promise<Blob>;
 };
@@ -41,6 +43,144 @@ export function createPressToTalkRecorder(): PressToTalkRecorder {
   };
 }
 
+export type StreamingTranscriptEvent =
+  | { type: "speech_start" }
+  | { type: "partial"; text: string }
+  | { type: "final"; text: string }
+  | { type: "end_of_turn"; reason: "vad" | "flush" }
+  | { type: "error"; stage: "partial" | "final"; detail: string };
+
+export type StreamingRecorder = {
+  start: () => Promise<void>;
+  finish: () => Promise<string>;
+};
+
+export function createStreamingRecorder(
+  url: string,
+  onEvent: (event: StreamingTranscriptEvent) => void = () => {},
+): StreamingRecorder {
+  let socket: WebSocket | null = null;
+  let context: AudioContext | null = null;
+  let stream: MediaStream | null = null;
+  let processor: ScriptProcessorNode | null = null;
+  let finals: string[] = [];
+  let onTurnEnd: ((error?: Error) => void) | null = null;
+  let flushError: Error | null = null;
+
+  return {
+    async start(): Promise<void> {
+      finals = [];
+      socket = new WebSocket(url);
+      socket.binaryType = "arraybuffer";
+      socket.onmessage = (message: MessageEvent) => {
+        const event = JSON.parse(String(message.data)) as StreamingTranscriptEvent;
+        if (event.type === "final") finals.push(event.text);
+        // Only the flush reply settles finish(); a VAD turn end or a failed partial can arrive just before it.
+        if (event.type === "error" && event.stage === "final" && onTurnEnd) flushError = new Error(event.detail);
+        if (event.type === "end_of_turn" && event.reason === "vad") flushError = null;
+        if (event.type === "end_of_turn" && event.reason === "flush") onTurnEnd?.(flushError ?? undefined);
+        onEvent(event);
+      };
+      socket.onclose = () => onTurnEnd?.(new Error("STT stream closed before the turn ended"));
+      await new Promise<void>((resolve, reject) => {
+        socket!.onopen = () => resolve();
+        socket!.onerror = () => reject(new Error("STT stream connection failed"));
+      });
+
+      stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+      // The backend VAD expects 16 kHz mono 16-bit PCM frames.
+      context = new AudioContext({ sampleRate: 16000 });
+      const source = context.createMediaStreamSource(stream);
+      processor = context.createScriptProcessor(2048, 1, 1);
+      processor.onaudioprocess = (event: AudioProcessingEvent) => {
+        const input = event.inputBuffer.getChannelData(0);
+        const pcm = new Int16Array(input.length);
+        for (let i = 0; i < input.length; i += 1) {
+          const clamped = Math.max(-1, Math.min(1, input[i]));
+          pcm[i] = clamped < 0 ? clamped * 0x8000 : clamped * 0x7fff;
+        }
+        if (socket?.readyState === WebSocket.OPEN) socket.send(pcm.buffer);
+      };
+      source.connect(processor);
+      processor.connect(context.destination);
+    },
+
+    async finish(): Promise<string> {
+      if (!socket) {
+        throw new Error("Recorder is not active");
+      }
+      processor?.disconnect();
+      stream?.getTracks().forEach((t) => t.stop());
+      await context?.close();
+
+      try {
+        await new Promise<void>((resolve, reject) => {
+          flushError = null;
+          onTurnEnd = (error) => (error ? reject(error) : resolve());
+          if (socket!.readyState !== WebSocket.OPEN) {
+            reject(new Error("STT stream closed before the turn ended"));
+            return;
+          }
+          socket!.send(JSON.stringify({ type: "flush" }));
+        });
+      } finally {
+        onTurnEnd = null;
+        socket.close();
+        socket = null;
+        context = null;
+        stream = null;
+        processor = null;
+      }
+      return finals.join(" ").trim();
+    },
+  };
+}
+
+// Schedules each chunk as soon as it arrives, so playback starts on the first one.
+export async function playPcmStream(stream: SpeechStream): Promise<void> {
+  const context = new AudioContext({ sampleRate: stream.sampleRate });
+  const frameBytes = 2 * stream.channels;
+  let carry = new Uint8Array(0);
+  let startAt = context.currentTime;
+  let last: AudioBufferSourceNode | null = null;
+  try {
+    for await (const chunk of stream.chunks) {
+      const bytes = new Uint8Array(carry.length + chunk.length);
+      bytes.set(carry);
+      bytes.set(chunk, carry.length);
+      const usable = bytes.length - (bytes.length % frameBytes);
+      carry = bytes.slice(usable);
+      if (!usable) continue;
+
+      const view = new DataView(bytes.buffer, 0, usable);
+      const frames = usable / frameBytes;
+      const buffer = context.createBuffer(stream.channels, frames, stream.sampleRate);
+      for (let channel = 0; channel < stream.channels; channel += 1) {
+        const data = buffer.getChannelData(channel);
+        for (let i = 0; i < frames; i += 1) {
+          data[i] = view.getInt16((i * stream.channels + channel) * 2, true) / 0x8000;
+        }
+      }
+      const source = context.createBufferSource();
+      source.buffer = buffer;
+      source.connect(context.destination);
+      // Chunks play back to back; if the network fell behind, resume from now instead of the past.
+      startAt = Math.max(startAt, context.currentTime);
+      source.start(startAt);
+      startAt += buffer.duration;
+      last = source;
+    }
+    if (last) {
+      const ending = last;
+      await new Promise<void>((resolve) => {
+        ending.onended = () => resolve();
+      });
+    }
+  } finally {
+    await context.close();
+  }
+}
+
 export async function playWavBytes(bytes: ArrayBuffer): Promise<void> {
   const blob = new Blob([bytes], { type: "audio/wav" });
   const url = URL.createObjectURL(blob);
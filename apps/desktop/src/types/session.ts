@@ -5,6 +5,8 @@
 export type SessionCreateResponse = {
   session_id: string;
   seed: number;
+  opening_line: string;
+  opening_audio: string | null;
 };
 
 export type DialogueTurnRequest = {
@@ -12,6 +14,7 @@ export type DialogueTurnRequest = {
   resistance: number;
   traineeText: string;
   primaryObjection: string;
+  sessionId?: string;
 };
 
 export type DialogueTurnResponse = {
@@ -20,19 +23,34 @@ export type DialogueTurnResponse = {
   resistance: number;
 };
 
+export type DialogueSpeechFrame =
+  | { type: "state"; trust: number; resistance: number }
+  | { type: "audio"; text: string; media_type: string; audio: string }
+  | { type: "text"; text: string }
+  | { type: "done"; text: string; timings?: Record<string, number> };
+
+// Raw 16-bit little-endian PCM from /tts/synthesize?format=pcm, readable as it arrives.
+export type SpeechStream = {
+  sampleRate: number;
+  channels: number;
+  chunks: AsyncIterable<Uint8Array>;
+};
+
 export type TranscriptTurn = {
   speaker: "trainee" | "prospect";
   text: string;
   ts: string;
 };
 
+export type ScoreOutcomes = {
+  close_attempt: boolean;
+  value_statement: boolean;
+  objection_resolved: boolean;
+};
+
 export type ScoreSessionRequest = {
   transcript: TranscriptTurn[];
-  outcomes: {
-    close_attempt: boolean;
-    value_statement: boolean;
-    objection_resolved: boolean;
-  };
+  outcomes: ScoreOutcomes;
 };
 
 export type ScoreSessionResponse = {
@@ -0,0 +1,13 @@
+
+import json, sys
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+stdout.write(b'{"ready": true, "sample_rate": 16000}\n'); stdout.flush()
+for line in stdin:
+    text = json.loads(line)["text"]
+    if text == "fail":
+        stdout.write(b'{"error": "bad text"}\n'); stdout.flush()
+        continue
+    for word in text.split():
+        pcm = word.encode() * 2
+        stdout.write(json.dumps({"pcm": len(pcm)}).encode() + b"\n" + pcm)
+    stdout.write(b'{"done": true}\n'); stdout.flush()
@@ -0,0 +1,11 @@
+
+import json, sys
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+stdout.write(b'{"ready": true}\n'); stdout.flush()
+for line in stdin:
+    header = json.loads(line)
+    payload = stdin.read(header["bytes"])
+    if payload == b"CRASH":
+        sys.exit(3)
+    stdout.write(json.dumps({"text": "heard %d bytes" % len(payload)}).encode() + b"\n")
+    stdout.flush()
@@ -0,0 +1,152 @@
+﻿import json
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import ScoreRecord, ScoreRollup
+
+PERIODS = ("day", "week")
+TOTAL = "total"
+
+
+def period_start(period: str, day: date) -> str:
+    if period == "week":
+        day = day - timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+def _rollup_rows(record: ScoreRecord, sign: int) -> list[dict]:
+    scores = {**json.loads(record.dimensions), TOTAL: record.total_score}
+    day = record.created_at.date()
+    return [
+        {
+            "trainee_id": record.trainee_id,
+            "period": period,
+            "period_start": period_start(period, day),
+            "dimension": name,
+            "sessions": sign,
+            "score_sum": sign * int(value),
+        }
+        for period in PERIODS
+        for name, value in scores.items()
+    ]
+
+
+def _apply_rollups(db: Session, rows: list[dict]) -> None:
+    stmt = insert(ScoreRollup).values(rows)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["trainee_id", "period", "period_start", "dimension"],
+            set_={
+                "sessions": ScoreRollup.sessions + stmt.excluded.sessions,
+                "score_sum": ScoreRollup.score_sum + stmt.excluded.score_sum,
+            },
+        )
+    )
+
+
+def record_score(
+    db: Session,
+    session_id: str,
+    trainee_id: str,
+    report: dict,
+    primary_objection: str,
+    scored_at: datetime | None = None,
+) -> ScoreRecord:
+    # The score row and its rollup deltas commit together, so rollups never drift from the scores.
+    for attempt in range(2):
+        previous = db.get(ScoreRecord, session_id)
+        if previous is not None:
+            _apply_rollups(db, _rollup_rows(previous, -1))
+            db.delete(previous)
+            db.flush()
+        record = ScoreRecord(
+            session_id=session_id,
+            trainee_id=trainee_id,
+            total_score=report["total_score"],
+            dimensions=json.dumps(report["dimensions"]),
+            primary_objection=primary_objection,
+            created_at=scored_at or datetime.now(timezone.utc),
+        )
+        db.add(record)
+        _apply_rollups(db, _rollup_rows(record, 1))
+        try:
+            db.commit()
+            return record
+        except IntegrityError:
+            # A concurrent score for the same session committed first; retry so it is replaced, not doubled.
+            db.rollback()
+            if attempt:
+                raise
+
+
+def encode_cursor(created_at: datetime, session_id: str) -> str:
+    return f"{created_at.isoformat()}|{session_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    created_at, _, session_id = cursor.partition("|")
+    return datetime.fromisoformat(created_at), session_id
+
+
+def history_page(
+    db: Session, trainee_id: str, limit: int = 20, cursor: str | None = None
+) -> tuple[list[dict], str | None]:
+    query = select(
+        ScoreRecord.session_id,
+        ScoreRecord.total_score,
+        ScoreRecord.primary_objection,
+        ScoreRecord.created_at,
+    ).where(ScoreRecord.trainee_id == trainee_id)
+    if cursor:
+        query = query.where(tuple_(ScoreRecord.created_at, ScoreRecord.session_id) < decode_cursor(cursor))
+    rows = db.execute(
+        query.order_by(ScoreRecord.created_at.desc(), ScoreRecord.session_id.desc()).limit(limit + 1)
+    ).all()
+    items = [
+        {
+            "session_id": session_id,
+            "total_score": total_score,
+            "primary_objection": primary_objection,
+            "created_at": created_at,
+        }
+        for session_id, total_score, primary_objection, created_at in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["session_id"])
+    return items, next_cursor
+
+
+def progress(db: Session, trainee_id: str, period: str = "week", limit: int = 12) -> list[dict]:
+    recent_periods = (
+        select(ScoreRollup.period_start)
+        .where(ScoreRollup.trainee_id == trainee_id, ScoreRollup.period == period, ScoreRollup.sessions > 0)
+        .distinct()
+        .order_by(ScoreRollup.period_start.desc())
+        .limit(limit)
+    )
+    rows = db.execute(
+        select(ScoreRollup.period_start, ScoreRollup.dimension, ScoreRollup.sessions, ScoreRollup.score_sum)
+        .where(
+            ScoreRollup.trainee_id == trainee_id,
+            ScoreRollup.period == period,
+            ScoreRollup.period_start.in_(recent_periods.scalar_subquery()),
+            ScoreRollup.sessions > 0,
+        )
+        .order_by(ScoreRollup.period_start)
+    ).all()
+    points: dict[str, dict] = {}
+    for start, dimension, sessions, score_sum in rows:
+        point = points.setdefault(start, {"period_start": start, "sessions": 0, "total_score": 0.0, "dimensions": {}})
+        average = round(score_sum / sessions, 2)
+        if dimension == TOTAL:
+            point["sessions"] = sessions
+            point["total_score"] = average
+        else:
+            point["dimensions"][dimension] = average
+    return list(points.values())
@@ -0,0 +1,57 @@
+﻿import threading
+from collections import deque
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import SessionRecord
+
+
+class AntiRepeatIndex:
+    # Rolling window of the most recent sessions so persona selection never has to query history.
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent: deque[dict] = deque(maxlen=window)
+        self._seed_counts: dict[int, int] = {}
+
+    def load(self, db: Session) -> None:
+        rows = db.execute(
+            select(
+                SessionRecord.seed,
+                SessionRecord.industry,
+                SessionRecord.role,
+                SessionRecord.primary_objection,
+            )
+            .order_by(SessionRecord.created_at.desc())
+            .limit(self.window)
+        ).all()
+        with self._lock:
+            self._recent.clear()
+            self._seed_counts.clear()
+        for seed, industry, role, primary_objection in reversed(rows):
+            self.add(seed=seed, industry=industry, role=role, primary_objection=primary_objection)
+
+    def add(self, seed: int, industry: str, role: str, primary_objection: str) -> None:
+        entry = {"seed": seed, "industry": industry, "role": role, "primary_objection": primary_objection}
+        with self._lock:
+            if len(self._recent) == self.window:
+                evicted = self._recent[0]["seed"]
+                self._seed_counts[evicted] -= 1
+                if not self._seed_counts[evicted]:
+                    del self._seed_counts[evicted]
+            self._recent.append(entry)
+            self._seed_counts[seed] = self._seed_counts.get(seed, 0) + 1
+
+    def recent_sessions(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def seed_used(self, seed: int) -> bool:
+        with self._lock:
+            return seed in self._seed_counts
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._recent)
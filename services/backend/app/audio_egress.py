@@ -0,0 +1,99 @@
+﻿from typing import Iterator
+
+import numpy as np
+
+try:
+    import av
+except ImportError:  # PyAV is optional; without it only WAV and raw PCM are offered.
+    av = None
+
+PCM_MEDIA_TYPE = "audio/pcm"
+OPUS_MEDIA_TYPE = "audio/ogg; codecs=opus"
+OPUS_SAMPLE_RATE = 48000
+
+_ACCEPT_FORMATS = {
+    "audio/pcm": "pcm",
+    "audio/l16": "pcm",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+    "audio/*": "wav",
+    "*/*": "wav",
+}
+
+
+def opus_available() -> bool:
+    return av is not None
+
+
+def negotiate_format(requested: str | None, accept: str) -> str | None:
+    # An explicit ?format= wins; otherwise the first Accept entry we can serve. None means nothing acceptable.
+    if requested is not None:
+        return requested if requested != "opus" or opus_available() else None
+    if not accept.strip():
+        return "wav"
+    for entry in accept.split(","):
+        fmt = _ACCEPT_FORMATS.get(entry.split(";")[0].strip().lower())
+        if fmt is not None and (fmt != "opus" or opus_available()):
+            return fmt
+    # Clients that never asked for audio (e.g. Accept: application/json) keep getting WAV.
+    return "wav"
+
+
+class _Sink:
+    def __init__(self):
+        self.parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def encode_opus(
+    chunks: Iterator[bytes],
+    sample_rate: int,
+    channels: int = 1,
+    bitrate: int = 24000,
+    page_ms: int = 100,
+) -> Iterator[bytes]:
+    # Ogg/Opus pages are emitted as they fill, so the first page leaves before synthesis finishes.
+    layout = "mono" if channels == 1 else "stereo"
+    sink = _Sink()
+    container = av.open(sink, mode="w", format="ogg", options={"page_duration": str(page_ms * 1000)})
+    try:
+        stream = container.add_stream("libopus", rate=OPUS_SAMPLE_RATE, layout=layout)
+        stream.bit_rate = bitrate
+        resampler = av.AudioResampler(format="s16", layout=layout, rate=OPUS_SAMPLE_RATE)
+        carry = b""
+        for chunk in chunks:
+            chunk = carry + chunk
+            usable = len(chunk) - len(chunk) % (2 * channels)
+            carry = chunk[usable:]
+            if not usable:
+                continue
+            frame = av.AudioFrame.from_ndarray(
+                np.frombuffer(chunk[:usable], dtype="<i2").reshape(1, -1), format="s16", layout=layout
+            )
+            frame.sample_rate = sample_rate
+            for resampled in resampler.resample(frame):
+                for packet in stream.encode(resampled):
+                    container.mux(packet)
+            data = sink.drain()
+            if data:
+                yield data
+        for resampled in resampler.resample(None):
+            for packet in stream.encode(resampled):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    finally:
+        container.close()
+    data = sink.drain()
+    if data:
+        yield data
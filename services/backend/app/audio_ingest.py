@@ -0,0 +1,164 @@
+﻿import threading
+import wave
+from typing import BinaryIO
+
+import numpy as np
+
+try:
+    import av
+except ImportError:  # PyAV is optional; without it compressed uploads are passed to STT undecoded.
+    av = None
+
+SAMPLE_RATE = 16000
+# Frames read from a WAV upload per step; keeps temporaries small regardless of utterance length.
+CHUNK_FRAMES = 8192
+
+_WAV_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+_DECODE_ERRORS: tuple[type[Exception], ...] = (wave.Error, EOFError, ValueError)
+if av is not None:
+    _DECODE_ERRORS += (av.error.FFmpegError,)
+
+
+class AudioTooLong(ValueError):
+    pass
+
+
+class PCMBuffer:
+    # Growable float32 sample buffer; reset() keeps the allocation for the next utterance.
+
+    def __init__(self, max_samples: int, initial_samples: int = SAMPLE_RATE * 10):
+        self.max_samples = max_samples
+        self._data = np.empty(min(initial_samples, max_samples), dtype=np.float32)
+        self.size = 0
+
+    def reset(self, max_samples: int) -> None:
+        self.max_samples = max_samples
+        self.size = 0
+
+    def append(self, samples: np.ndarray) -> None:
+        needed = self.size + len(samples)
+        if needed > self.max_samples:
+            raise AudioTooLong(f"audio exceeds {self.max_samples / SAMPLE_RATE:.0f} s")
+        if needed > len(self._data):
+            grown = np.empty(min(max(needed, len(self._data) * 2), self.max_samples), dtype=np.float32)
+            grown[: self.size] = self._data[: self.size]
+            self._data = grown
+        self._data[self.size : needed] = samples
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self._data[: self.size]
+
+
+class LinearResampler:
+    # Streaming linear interpolation to SAMPLE_RATE; carries the last input sample across chunks.
+
+    def __init__(self, source_rate: int):
+        self.step = source_rate / SAMPLE_RATE
+        self._next = 0.0
+        self._offset = 0
+        self._last: np.ndarray | None = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if self.step == 1.0 or not len(chunk):
+            return chunk
+        if self._last is not None:
+            chunk = np.concatenate((self._last, chunk))
+            base = self._offset - 1
+        else:
+            base = self._offset
+        end = base + len(chunk) - 1
+        self._offset = end + 1
+        self._last = chunk[-1:]
+        if self._next > end:
+            return chunk[:0]
+        count = int((end - self._next) // self.step) + 1
+        positions = self._next + self.step * np.arange(count) - base
+        self._next += self.step * count
+        left = positions.astype(np.int64)
+        right = np.minimum(left + 1, len(chunk) - 1)
+        frac = (positions - left).astype(np.float32)
+        return chunk[left] * (1.0 - frac) + chunk[right] * frac
+
+
+_local = threading.local()
+
+
+def _buffer(max_samples: int) -> PCMBuffer:
+    # One buffer per threadpool thread: decode and transcription run on the same thread, so it is never shared.
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = PCMBuffer(max_samples)
+    buffer.reset(max_samples)
+    return buffer
+
+
+def sniff_format(head: bytes, content_type: str = "") -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    return content_type.split(";")[0].split("/")[-1] or "unknown"
+
+
+def _decode_wav(fileobj: BinaryIO, buffer: PCMBuffer) -> None:
+    with wave.open(fileobj, "rb") as wav:
+        dtype = _WAV_DTYPES.get(wav.getsampwidth())
+        if dtype is None or wav.getcomptype() != "NONE":
+            raise wave.Error(f"unsupported WAV sample width {wav.getsampwidth()}")
+        channels = wav.getnchannels()
+        # 8-bit WAV is unsigned around 128; wider widths are signed.
+        offset = 128.0 if dtype is np.uint8 else 0.0
+        scale = 128.0 if dtype is np.uint8 else float(np.iinfo(dtype).max) + 1.0
+        resampler = LinearResampler(wav.getframerate())
+        while True:
+            frames = wav.readframes(CHUNK_FRAMES)
+            if not frames:
+                break
+            samples = np.frombuffer(frames, dtype=np.dtype(dtype).newbyteorder("<")).astype(np.float32)
+            if offset:
+                samples -= offset
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            samples /= scale
+            buffer.append(resampler.process(samples))
+
+
+def _decode_av(fileobj: BinaryIO, buffer: PCMBuffer) -> None:
+    with av.open(fileobj, mode="r") as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                buffer.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            buffer.append(resampled.to_ndarray().reshape(-1))
+
+
+# Returns 16 kHz mono float32 samples, or None when the upload has to go to STT as-is.
+# The array is a view into this thread's buffer and is only valid until the thread decodes again.
+def decode_upload(fileobj: BinaryIO, content_type: str = "", max_seconds: float = 120.0) -> np.ndarray | None:
+    head = fileobj.read(12)
+    fileobj.seek(0)
+    fmt = sniff_format(head, content_type)
+    buffer = _buffer(int(max_seconds * SAMPLE_RATE))
+    try:
+        if fmt == "wav":
+            _decode_wav(fileobj, buffer)
+        elif av is not None:
+            _decode_av(fileobj, buffer)
+        else:
+            return None
+    except AudioTooLong:
+        raise
+    except _DECODE_ERRORS:
+        return None
+    finally:
+        fileobj.seek(0)
+    return buffer.view()
+
+
+def pcm16_bytes(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
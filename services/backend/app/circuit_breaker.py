@@ -0,0 +1,70 @@
+﻿import asyncio
+import time
+from typing import Awaitable, Callable
+
+
+class CircuitOpenError(RuntimeError):
+    fallback_stage = "llm_circuit_open"
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive failures; while open, calls fail fast and only the probe runs.
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[None]],
+        failure_threshold: int = 3,
+        probe_interval_seconds: float = 5.0,
+    ):
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval_seconds = probe_interval_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trips = 0
+        self.probes = 0
+        self.last_error = ""
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def check(self) -> None:
+        if self.opened_at is not None:
+            raise CircuitOpenError(f"LLM circuit open: {self.last_error}")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, error: str) -> None:
+        self.failures += 1
+        self.last_error = error
+        if self.opened_at is None and self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+
+    async def tick(self) -> None:
+        if self.opened_at is None:
+            return
+        self.probes += 1
+        try:
+            await self.probe()
+        except RuntimeError as exc:
+            self.last_error = str(exc)
+            return
+        self.record_success()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval_seconds)
+            await self.tick()
+
+    def stats(self) -> dict:
+        return {
+            "open": self.is_open(),
+            "open_seconds": round(time.monotonic() - self.opened_at, 3) if self.opened_at is not None else None,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "probes": self.probes,
+            "last_error": self.last_error,
+        }
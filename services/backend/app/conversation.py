@@ -0,0 +1,121 @@
+﻿import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.dialogue import ProspectState
+from app.scoring import ScoreAccumulator
+
+
+@dataclass
+class Conversation:
+    session_id: str
+    objection: str
+    state: ProspectState
+    seed: int = 0
+    history: list[tuple[str, str]] = field(default_factory=list)
+    # Ollama's token context after the last reply it produced; reusing it keeps the KV cache warm.
+    context: list[int] | None = None
+    # Exchanges the model has not seen through `context`, e.g. rule-based fallback replies.
+    unsynced: list[tuple[str, str]] = field(default_factory=list)
+    pending_context: list[int] | None = None
+    updated_at: float = field(default_factory=time.monotonic)
+    score: ScoreAccumulator = field(default_factory=ScoreAccumulator)
+    ended: bool = False
+
+    def open_with(self, opening_line: str) -> None:
+        # The prospect speaks first; the model sees the line through the unsynced replay.
+        self.history.append(("prospect", opening_line))
+        self.unsynced.append(("prospect", opening_line))
+        self.score.add_turn("prospect", opening_line)
+
+    def replay(self, turns: list[tuple[str, str]]) -> None:
+        # Rebuilt from the turn log after eviction; the model has seen none of it through `context`.
+        self.history.extend(turns)
+        self.unsynced.extend(turns)
+        for speaker, text in turns:
+            self.score.add_turn(speaker, text)
+
+    def accept_context(self, context: list[int]) -> None:
+        self.pending_context = context
+
+    def record_turn(self, trainee_text: str, reply_text: str, next_state: ProspectState) -> None:
+        exchange = [("trainee", trainee_text), ("prospect", reply_text)]
+        self.history.extend(exchange)
+        for speaker, text in exchange:
+            self.score.add_turn(speaker, text)
+        if self.pending_context is not None:
+            self.context = self.pending_context
+            self.unsynced = []
+        else:
+            self.unsynced.extend(exchange)
+        self.pending_context = None
+        self.state = next_state
+        self.updated_at = time.monotonic()
+
+
+class ConversationStore:
+    def __init__(self, max_sessions: int = 256, ttl_seconds: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, Conversation] = OrderedDict()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._items:
+            oldest = next(iter(self._items.values()))
+            if oldest.updated_at >= cutoff and len(self._items) <= self.max_sessions:
+                return
+            self._items.popitem(last=False)
+
+    def get(self, session_id: str) -> Conversation | None:
+        with self._lock:
+            self._expire()
+            conversation = self._items.get(session_id)
+            if conversation is not None:
+                self._items.move_to_end(session_id)
+            return conversation
+
+    def get_or_create(self, session_id: str, objection: str, state: ProspectState, seed: int = 0) -> Conversation:
+        with self._lock:
+            self._expire()
+            conversation = self._items.get(session_id)
+            if conversation is None:
+                conversation = Conversation(session_id=session_id, objection=objection, state=state, seed=seed)
+                self._items[session_id] = conversation
+            self._items.move_to_end(session_id)
+            return conversation
+
+    def restore(
+        self,
+        session_id: str,
+        objection: str,
+        state: ProspectState,
+        seed: int,
+        turns: list[tuple[str, str]],
+        ended: bool = False,
+    ) -> Conversation:
+        with self._lock:
+            self._expire()
+            conversation = self._items.get(session_id)
+            if conversation is None:
+                # Another request may have restored it while we read the turn log; replay only once.
+                conversation = Conversation(session_id=session_id, objection=objection, state=state, seed=seed)
+                conversation.replay(turns)
+                conversation.ended = ended
+                self._items[session_id] = conversation
+            self._items.move_to_end(session_id)
+            return conversation
+
+    def end(self, session_id: str) -> Conversation | None:
+        # Ended conversations stay until normal expiry so the call can still be scored.
+        with self._lock:
+            conversation = self._items.get(session_id)
+            if conversation is not None:
+                conversation.ended = True
+            return conversation
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
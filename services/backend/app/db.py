@@ -1,14 +1,29 @@
-﻿from pathlib import Path
+﻿import os
+from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 DB_DIR = Path(__file__).resolve().parents[1] / "data"
 DB_DIR.mkdir(parents=True, exist_ok=True)
-DB_PATH = DB_DIR / "app.db"
+# DATABASE_PATH lets tools such as the benchmarks run against a throwaway database.
+DB_PATH = Path(os.getenv("DATABASE_PATH") or DB_DIR / "app.db")
 DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, _connection_record) -> None:
+    # WAL lets readers run alongside the turn-log writer; NORMAL skips the per-commit fsync,
+    # and the turn log forces a checkpoint when durability matters (session end).
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
@@ -1,8 +1,17 @@
-﻿import json
+﻿import asyncio
+import json
+import time
 from dataclasses import dataclass
-from typing import Protocol
-from urllib import request
-from urllib.error import URLError
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Protocol
+
+import httpx
+
+from app.metrics import record_stage
+from app.pipeline import aclose_upstream
+
+if TYPE_CHECKING:
+    from app.conversation import Conversation
+    from app.llm_cache import LLMResponseCache
 
 
 @dataclass(frozen=True)
@@ -11,87 +20,442 @@ class ProspectState:
     resistance: float
 
 
+# Matches the desktop client's starting meters.
+OPENING_STATE = ProspectState(trust=0.4, resistance=0.6)
+
+
 @dataclass(frozen=True)
 class DialogueTurn:
     text: str
     next_state: ProspectState
 
 
+@dataclass(frozen=True)
+class AsyncDialogueTurnStream:
+    tokens: AsyncIterator[str]
+    next_state: ProspectState
+
+
 class LocalLLMClient(Protocol):
     def generate(self, prompt: str) -> str: ...
 
 
-class OllamaClient:
-    def __init__(self, base_url: str, model: str, timeout_seconds: float = 15.0):
+class AsyncLLMClient(Protocol):
+    async def generate(self, prompt: str, **kwargs) -> str: ...
+
+    def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]: ...
+
+
+def _generate_body(
+    model: str,
+    prompt: str,
+    stream: bool,
+    keep_alive: str | None,
+    context: list[int] | None = None,
+) -> dict:
+    body: dict = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "options": {"temperature": 0.35},
+    }
+    if keep_alive:
+        body["keep_alive"] = keep_alive
+    if context:
+        body["context"] = context
+    return body
+
+
+def _preload_body(model: str, keep_alive: str | None) -> dict:
+    # A generate call without a prompt only loads the model and resets its keep-alive timer.
+    body: dict = {"model": model}
+    if keep_alive:
+        body["keep_alive"] = keep_alive
+    return body
+
+
+class AsyncOllamaClient:
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout_seconds: float = 15.0,
+        keep_alive: str | None = None,
+        max_connections: int = 16,
+        transport: httpx.AsyncBaseTransport | None = None,
+        first_token_timeout_seconds: float | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.timeout_seconds = timeout_seconds
+        self.first_token_timeout_seconds = first_token_timeout_seconds
+        self.keep_alive = keep_alive
+        self.max_connections = max_connections
+        self.transport = transport
+        self._http: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.in_flight = 0
 
-    def generate(self, prompt: str) -> str:
-        payload = json.dumps(
-            {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.35},
-            }
-        ).encode("utf-8")
-        req = request.Request(
-            f"{self.base_url}/api/generate",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
+    def _client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to one event loop; rebuild if we are called from a different one.
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(self.timeout_seconds, 3.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                transport=self.transport,
+            )
+            self._loop = loop
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._loop = None
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: float | None = None,
+        context: list[int] | None = None,
+        on_context: Callable[[list[int]], None] | None = None,
+    ) -> str:
+        if self.first_token_timeout_seconds:
+            # Streaming lets a stalled model be abandoned once the first-token budget passes.
+            tokens = [token async for token in self.generate_stream(prompt, timeout, context, on_context)]
+            response_text = "".join(tokens).strip()
+            if not response_text:
+                raise RuntimeError("Ollama response missing 'response' field")
+            return response_text
+
+        body = _generate_body(self.model, prompt, False, self.keep_alive, context)
+        self.in_flight += 1
+        started = time.perf_counter()
         try:
-            with request.urlopen(req, timeout=self.timeout_seconds) as resp:
-                body = json.loads(resp.read().decode("utf-8"))
-        except URLError as exc:
-            raise RuntimeError(f"Ollama request failed: {exc}") from exc
+            async with asyncio.timeout(timeout or self.timeout_seconds):
+                resp = await self._client().post("/api/generate", json=body)
+                resp.raise_for_status()
+                data = resp.json()
+        except (httpx.HTTPError, TimeoutError) as exc:
+            raise RuntimeError(f"Ollama request failed: {exc!r}") from exc
         except json.JSONDecodeError as exc:
             raise RuntimeError("Ollama returned invalid JSON") from exc
+        finally:
+            self.in_flight -= 1
+            record_stage("llm", time.perf_counter() - started)
 
-        response_text = body.get("response")
+        response_text = data.get("response")
         if not response_text:
             raise RuntimeError("Ollama response missing 'response' field")
+        if on_context is not None and data.get("context"):
+            on_context(list(data["context"]))
         return str(response_text).strip()
 
+    async def generate_stream(
+        self,
+        prompt: str,
+        timeout: float | None = None,
+        context: list[int] | None = None,
+        on_context: Callable[[list[int]], None] | None = None,
+    ) -> AsyncIterator[str]:
+        body = _generate_body(self.model, prompt, True, self.keep_alive, context)
+        loop = asyncio.get_running_loop()
+        # Budgets only count time spent waiting on Ollama, never time the consumer holds us at a yield,
+        # so no timeout is armed while suspended and a slow TTS consumer cannot trip it.
+        remaining = timeout or self.timeout_seconds
+        first_remaining = self.first_token_timeout_seconds or remaining
+
+        async def _wait(awaitable):
+            nonlocal remaining, first_remaining
+            budget = min(remaining, first_remaining) if first_token else remaining
+            began = loop.time()
+            try:
+                return await asyncio.wait_for(awaitable, budget)
+            finally:
+                elapsed = loop.time() - began
+                remaining -= elapsed
+                first_remaining -= elapsed
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        first_token = True
+        resp: httpx.Response | None = None
+        try:
+            client = self._client()
+            resp = await _wait(client.send(client.build_request("POST", "/api/generate", json=body), stream=True))
+            resp.raise_for_status()
+            lines = resp.aiter_lines()
+            while True:
+                try:
+                    line = await _wait(anext(lines))
+                except StopAsyncIteration:
+                    break
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+                token = chunk.get("response")
+                if token:
+                    if first_token:
+                        record_stage("llm_first_token", time.perf_counter() - started)
+                        first_token = False
+                    yield str(token)
+                if chunk.get("done"):
+                    if on_context is not None and chunk.get("context"):
+                        on_context(list(chunk["context"]))
+                    return
+        except TimeoutError as exc:
+            if first_token and self.first_token_timeout_seconds:
+                raise RuntimeError(
+                    f"Ollama produced no token within {self.first_token_timeout_seconds * 1000:.0f} ms"
+                ) from exc
+            raise RuntimeError(f"Ollama request failed: {exc!r}") from exc
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"Ollama request failed: {exc!r}") from exc
+        except json.JSONDecodeError as exc:
+            raise RuntimeError("Ollama returned invalid JSON") from exc
+        finally:
+            if resp is not None:
+                await resp.aclose()
+            self.in_flight -= 1
+            record_stage("llm", time.perf_counter() - started)
+        raise RuntimeError("Ollama stream ended before completion")
+
+    async def list_models(self, timeout: float = 5.0) -> set[str]:
+        try:
+            async with asyncio.timeout(timeout):
+                resp = await self._client().get("/api/tags")
+                resp.raise_for_status()
+                data = resp.json()
+        except (httpx.HTTPError, TimeoutError) as exc:
+            raise RuntimeError(f"unreachable: {exc!r}") from exc
+        except json.JSONDecodeError as exc:
+            raise RuntimeError("invalid JSON from /api/tags") from exc
+        return {item.get("name", "") for item in data.get("models", [])}
+
+    async def preload(self) -> None:
+        try:
+            async with asyncio.timeout(max(self.timeout_seconds, 120.0)):
+                resp = await self._client().post(
+                    "/api/generate", json=_preload_body(self.model, self.keep_alive)
+                )
+                resp.raise_for_status()
+        except (httpx.HTTPError, TimeoutError) as exc:
+            raise RuntimeError(f"Ollama preload failed: {exc!r}") from exc
+
+    async def probe(self) -> None:
+        # A loaded but saturated model passes a preload instantly; only a token within budget shows it can serve turns.
+        tokens = self.generate_stream("Reply with OK.", timeout=self.first_token_timeout_seconds or self.timeout_seconds)
+        try:
+            await anext(tokens)
+        except StopAsyncIteration:
+            raise RuntimeError("Ollama probe produced no token") from None
+        finally:
+            await tokens.aclose()
+
 
 def _clamp(value: float) -> float:
     return max(0.0, min(1.0, value))
 
 
-def generate_prospect_turn(
-    state: ProspectState,
-    trainee_text: str,
-    persona: dict,
-    llm_client: LocalLLMClient | None = None,
-) -> DialogueTurn:
-    objection = persona.get("primary_objection", "busy")
+def _next_state(state: ProspectState, trainee_text: str) -> ProspectState:
     lowered = trainee_text.lower()
 
     trust_delta = 0.1 if "30 seconds" in lowered or "quick" in lowered else -0.05
     resistance_delta = -0.12 if "value" in lowered or "help" in lowered else 0.04
 
-    next_state = ProspectState(
+    return ProspectState(
         trust=_clamp(state.trust + trust_delta),
         resistance=_clamp(state.resistance + resistance_delta),
     )
 
-    if llm_client is not None:
+
+def _build_prompt(objection: str, next_state: ProspectState, trainee_text: str) -> str:
+    return (
+        "You are a realistic B2B cold call prospect. "
+        f"Current objection style: {objection}. "
+        f"Trust={next_state.trust:.2f}, resistance={next_state.resistance:.2f}. "
+        "Reply in one short spoken sentence, natural and slightly skeptical.\n"
+        f"Trainee said: {trainee_text}"
+    )
+
+
+def _opener_prompt(persona: dict) -> str:
+    return (
+        "You are a B2B prospect answering an unexpected cold call. "
+        f"You are a {persona.get('personality', 'direct')} {persona.get('role', 'manager')} "
+        f"in {persona.get('industry', 'business')}, and your objection style is "
+        f"{persona.get('primary_objection', 'busy')}. "
+        "Answer the phone in one short spoken sentence. Do not introduce the caller."
+    )
+
+
+async def agenerate_opener(persona: dict, llm_client: AsyncLLMClient | None = None) -> str:
+    fallback = persona.get("opening_line") or "Hello?"
+    if llm_client is None:
+        return fallback
+    try:
+        return await llm_client.generate(_opener_prompt(persona))
+    except RuntimeError:
+        return fallback
+
+
+def fallback_lines(objections: list[str]) -> list[str]:
+    return list(dict.fromkeys(_fallback_text(objection) for objection in objections))
+
+
+def _conversation_prompt(
+    conversation: "Conversation",
+    next_state: ProspectState,
+    trainee_text: str,
+) -> str:
+    if conversation.context is None:
+        # Nothing cached yet: open with the persona brief and replay anything said so far.
+        prompt = _build_prompt(conversation.objection, next_state, trainee_text)
+    else:
+        # The cached context already holds the brief and earlier turns; only the new turn is evaluated.
         prompt = (
-            "You are a realistic B2B cold call prospect. "
-            f"Current objection style: {objection}. "
             f"Trust={next_state.trust:.2f}, resistance={next_state.resistance:.2f}. "
-            "Reply in one short spoken sentence, natural and slightly skeptical.\n"
+            "Reply in one short spoken sentence.\n"
             f"Trainee said: {trainee_text}"
         )
-        text = llm_client.generate(prompt)
+    if conversation.unsynced:
+        replay = "\n".join(
+            f"{'Trainee' if speaker == 'trainee' else 'You'} said: {text}"
+            for speaker, text in conversation.unsynced
+        )
+        prompt = f"Earlier in this call:\n{replay}\n{prompt}"
+    return prompt
+
+
+def _fallback_text(objection: str) -> str:
+    if objection == "busy":
+        return "I have a minute. What exactly are you offering?"
+    if objection == "no_budget":
+        return "We are not allocating budget right now."
+    return "I am listening, but keep it short."
+
+
+def generate_prospect_turn(
+    state: ProspectState,
+    trainee_text: str,
+    persona: dict,
+    llm_client: LocalLLMClient | None = None,
+) -> DialogueTurn:
+    objection = persona.get("primary_objection", "busy")
+    next_state = _next_state(state, trainee_text)
+
+    if llm_client is not None:
+        text = llm_client.generate(_build_prompt(objection, next_state, trainee_text))
     else:
-        if objection == "busy":
-            text = "I have a minute. What exactly are you offering?"
-        elif objection == "no_budget":
-            text = "We are not allocating budget right now."
-        else:
-            text = "I am listening, but keep it short."
+        text = _fallback_text(objection)
 
     return DialogueTurn(text=text, next_state=next_state)
+
+
+def _cache_key(
+    cache: "LLMResponseCache | None",
+    llm_client: AsyncLLMClient | None,
+    conversation: "Conversation | None",
+    objection: str,
+    state: ProspectState,
+    trainee_text: str,
+) -> tuple | None:
+    if cache is None or llm_client is None:
+        return None
+    # Later replies depend on what was said before, so only opening exchanges are shared between sessions.
+    if conversation is not None and any(speaker == "trainee" for speaker, _ in conversation.history):
+        return None
+    # The opener is replayed to the model, so replies to different openers must not share an entry.
+    opener = " ".join(text for _, text in conversation.history) if conversation is not None else ""
+    return cache.key(objection, state.trust, state.resistance, trainee_text, opener)
+
+
+async def agenerate_prospect_turn(
+    state: ProspectState,
+    trainee_text: str,
+    persona: dict,
+    llm_client: AsyncLLMClient | None = None,
+    conversation: "Conversation | None" = None,
+    cache: "LLMResponseCache | None" = None,
+    seed: int = 0,
+) -> DialogueTurn:
+    objection = persona.get("primary_objection", "busy")
+    next_state = _next_state(state, trainee_text)
+    key = _cache_key(cache, llm_client, conversation, objection, state, trainee_text)
+    if key is not None:
+        cached = cache.get(key, seed)
+        if cached is not None:
+            return DialogueTurn(text=cached, next_state=next_state)
+
+    if llm_client is not None and conversation is not None:
+        text = await llm_client.generate(
+            _conversation_prompt(conversation, next_state, trainee_text),
+            context=conversation.context,
+            on_context=conversation.accept_context,
+        )
+    elif llm_client is not None:
+        text = await llm_client.generate(_build_prompt(objection, next_state, trainee_text))
+    else:
+        text = _fallback_text(objection)
+
+    if key is not None:
+        cache.put(key, seed, text)
+    return DialogueTurn(text=text, next_state=next_state)
+
+
+async def _single_token(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _caching_tokens(
+    tokens: AsyncIterator[str], cache: "LLMResponseCache", key: tuple, seed: int
+) -> AsyncIterator[str]:
+    parts: list[str] = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield token
+    finally:
+        await aclose_upstream(tokens)
+    cache.put(key, seed, "".join(parts).strip())
+
+
+def astream_prospect_turn(
+    state: ProspectState,
+    trainee_text: str,
+    persona: dict,
+    llm_client: AsyncLLMClient | None = None,
+    conversation: "Conversation | None" = None,
+    cache: "LLMResponseCache | None" = None,
+    seed: int = 0,
+) -> AsyncDialogueTurnStream:
+    objection = persona.get("primary_objection", "busy")
+    next_state = _next_state(state, trainee_text)
+    key = _cache_key(cache, llm_client, conversation, objection, state, trainee_text)
+    if key is not None:
+        cached = cache.get(key, seed)
+        if cached is not None:
+            return AsyncDialogueTurnStream(tokens=_single_token(cached), next_state=next_state)
+
+    if llm_client is not None and conversation is not None:
+        tokens = llm_client.generate_stream(
+            _conversation_prompt(conversation, next_state, trainee_text),
+            context=conversation.context,
+            on_context=conversation.accept_context,
+        )
+    elif llm_client is not None:
+        tokens = llm_client.generate_stream(_build_prompt(objection, next_state, trainee_text))
+    else:
+        tokens = _single_token(_fallback_text(objection))
+
+    if key is not None:
+        tokens = _caching_tokens(tokens, cache, key, seed)
+    return AsyncDialogueTurnStream(tokens=tokens, next_state=next_state)
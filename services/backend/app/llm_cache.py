@@ -0,0 +1,96 @@
+﻿import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+FILLER_WORDS = frozenset(
+    {"um", "uh", "erm", "er", "ah", "hmm", "like", "so", "well", "just", "basically", "actually", "okay", "ok"}
+)
+
+
+def normalize_trainee_text(text: str) -> str:
+    words = re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+    return " ".join(word for word in words if word.strip("'") not in FILLER_WORDS)
+
+
+def response_cache_key(
+    objection: str, trust: float, resistance: float, trainee_text: str, bucket_step: float, opener: str = ""
+) -> tuple:
+    return (
+        objection,
+        round(trust / bucket_step),
+        round(resistance / bucket_step),
+        normalize_trainee_text(trainee_text),
+        opener,
+    )
+
+
+@dataclass
+class _Entry:
+    variants: list[str | None]
+    created_at: float
+
+
+class LLMResponseCache:
+    # Each key holds a few reply variants; a session's seed picks its slot so replies still differ between sessions.
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        variants: int = 3,
+        ttl_seconds: float = 3600.0,
+        bucket_step: float = 0.1,
+    ):
+        self.max_entries = max_entries
+        self.variants = variants
+        self.ttl_seconds = ttl_seconds
+        self.bucket_step = bucket_step
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, objection: str, trust: float, resistance: float, trainee_text: str, opener: str = "") -> tuple:
+        return response_cache_key(objection, trust, resistance, trainee_text, self.bucket_step, opener)
+
+    def get(self, key: tuple, seed: int) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            text = entry.variants[seed % self.variants] if entry is not None else None
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: tuple, seed: int, text: str) -> None:
+        if not text:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(variants=[None] * self.variants, created_at=time.monotonic())
+                self._entries[key] = entry
+            entry.variants[seed % self.variants] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,166 @@
+﻿import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator
+
+from app.circuit_breaker import CircuitBreaker
+from app.dialogue import AsyncLLMClient
+from app.pipeline import aclose_upstream
+from app.metrics import llm_shed_total, record_stage
+
+
+class Priority(IntEnum):
+    LIVE = 0
+    BACKGROUND = 1
+    BATCH = 2
+
+
+class LLMRequestShed(RuntimeError):
+    fallback_stage = "llm_shed"
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    deadline: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+def _admitted(future: asyncio.Future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+class LLMScheduler:
+    # Admits at most `max_concurrency` model calls; waiters are served by priority, then arrival.
+
+    def __init__(self, max_concurrency: int = 2):
+        self.max_concurrency = max(1, max_concurrency)
+        self.active = 0
+        self._heap: list[_Waiter] = []
+        self._seq = itertools.count()
+        self.admitted = {priority.name.lower(): 0 for priority in Priority}
+        self.shed = {priority.name.lower(): 0 for priority in Priority}
+
+    def queued(self) -> int:
+        return sum(1 for waiter in self._heap if not waiter.future.done())
+
+    def idle(self) -> bool:
+        return self.active == 0 and self.queued() == 0
+
+    def _shed(self, priority: Priority) -> LLMRequestShed:
+        self.shed[priority.name.lower()] += 1
+        llm_shed_total.inc(priority=priority.name.lower())
+        return LLMRequestShed(f"LLM request shed: {priority.name.lower()} deadline passed in queue")
+
+    def _release(self) -> None:
+        self.active -= 1
+        now = time.monotonic()
+        while self._heap and self.active < self.max_concurrency:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            if waiter.deadline <= now:
+                waiter.future.set_exception(self._shed(Priority(waiter.priority)))
+                continue
+            # The slot is handed over directly so a newcomer cannot overtake the queue.
+            self.active += 1
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, deadline_seconds: float) -> AsyncIterator[None]:
+        started = time.monotonic()
+        if self.active < self.max_concurrency and not self.queued():
+            self.active += 1
+        else:
+            waiter = _Waiter(
+                priority,
+                next(self._seq),
+                started + deadline_seconds,
+                asyncio.get_running_loop().create_future(),
+            )
+            heapq.heappush(self._heap, waiter)
+            try:
+                async with asyncio.timeout(deadline_seconds):
+                    await waiter.future
+            except (TimeoutError, asyncio.CancelledError) as exc:
+                if _admitted(waiter.future):
+                    # Admitted just as the wait ended; give the slot back.
+                    self._release()
+                elif not waiter.future.done():
+                    waiter.future.cancel()
+                if isinstance(exc, TimeoutError):
+                    raise self._shed(priority) from None
+                raise
+            # Only requests that actually queued report a wait, so uncontended turns stay uncluttered.
+            record_stage("llm_queue", time.monotonic() - started)
+        self.admitted[priority.name.lower()] += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queued": self.queued(),
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+class ScheduledLLMClient:
+    def __init__(
+        self,
+        client: AsyncLLMClient,
+        scheduler: LLMScheduler,
+        priority: Priority,
+        deadline_seconds: float,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.client = client
+        self.scheduler = scheduler
+        self.priority = priority
+        self.deadline_seconds = deadline_seconds
+        self.breaker = breaker
+
+    def _failed(self, exc: RuntimeError) -> None:
+        # Shedding means the queue is full, not that the model is broken.
+        if self.breaker is not None and not isinstance(exc, LLMRequestShed):
+            self.breaker.record_failure(str(exc))
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        if self.breaker is not None:
+            self.breaker.check()
+        try:
+            async with self.scheduler.slot(self.priority, self.deadline_seconds):
+                text = await self.client.generate(prompt, **kwargs)
+        except RuntimeError as exc:
+            self._failed(exc)
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return text
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        if self.breaker is not None:
+            self.breaker.check()
+        try:
+            # The slot is held until the last token so concurrent streams respect the limit too.
+            async with self.scheduler.slot(self.priority, self.deadline_seconds):
+                tokens = self.client.generate_stream(prompt, **kwargs)
+                try:
+                    async for token in tokens:
+                        yield token
+                finally:
+                    await aclose_upstream(tokens)
+        except RuntimeError as exc:
+            self._failed(exc)
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
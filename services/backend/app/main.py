@@ -1,91 +1,470 @@
-﻿from pathlib import Path
+﻿from contextlib import asynccontextmanager
+from dataclasses import asdict, replace
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Collection, Iterator, Literal, Sequence
+import asyncio
+import base64
+import json
 import os
+import time
 from random import randint
 from uuid import uuid4
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import Response
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db import engine, get_db
-from app.dialogue import OllamaClient, ProspectState, generate_prospect_turn
-from app.models import Base, SessionRecord
-from app.persona import PersonaGenerator
-from app.runtime_health import check_runtime_dependencies
+from app.analytics import history_page, progress, record_score
+from app.anti_repeat import AntiRepeatIndex
+from app.audio import pcm_to_wav
+from app.audio_egress import OPUS_MEDIA_TYPE, PCM_MEDIA_TYPE, encode_opus, negotiate_format
+from app.audio_ingest import AudioTooLong, decode_upload
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.conversation import Conversation, ConversationStore
+from app.db import SessionLocal, engine, get_db
+from app.dialogue import (
+    OPENING_STATE,
+    AsyncOllamaClient,
+    ProspectState,
+    agenerate_opener,
+    agenerate_prospect_turn,
+    astream_prospect_turn,
+    fallback_lines,
+    generate_prospect_turn,
+)
+from app.llm_cache import LLMResponseCache
+from app.llm_scheduler import LLMRequestShed, LLMScheduler, Priority, ScheduledLLMClient
+from app.metrics import (
+    REGISTRY,
+    Gauge,
+    collect_timings,
+    current_timings,
+    fallbacks_total,
+    request_seconds,
+    server_timing_header,
+    timed_stage,
+    timings_ms,
+)
+from app.models import Base, SessionRecord, TurnRecord
+from app.persona import Persona, PersonaGenerator
+from app.pipeline import aclose_upstream, asplit_sentences, pipeline_speech
+from app.runtime_health import RuntimeHealthProber, probe_checks
+from app.scratch import DEFAULT_MAX_BYTES, ScratchArea, default_scratch_root
 from app.schemas import (
     DialogueRequest,
     DialogueResponse,
+    ProgressResponse,
+    ScoringBatchRequest,
     ScoringRequest,
     ScoringResponse,
     SessionCreate,
     SessionCreateResponse,
+    SessionEndResponse,
+    SessionHistoryResponse,
     SessionReadResponse,
+    SessionScoreRequest,
+    SessionTurnsResponse,
     STTResponse,
     TTSRequest,
+    TurnRead,
 )
-from app.scoring import score_session
-from app.stt import STTService, WhisperCliSTTService
-from app.tts import PiperCliTTSService, TTSService
+from app.scoring import iter_score_sessions, score_session
+from app.session_pool import PreparedSession, SessionPool
+from app.similarity import PersonaEncoder, SimilarityIndex
+from app.streaming_stt import StreamingTranscriber, VADConfig
+from app.stt import STTService, WhisperCliSTTService, WhisperWorkerPoolSTTService
+from app.tts import CachedTTSService, PiperCliTTSService, PiperWorkerTTSService, TTSService
+from app.tts_cache import DEFAULT_CACHE_DIR, TTSAudioCache
+from app.turn_log import SESSION_END_SPEAKER, TurnEntry, TurnLogWriter
+from app.warmup import KeepAlive, Warmup
+from app.workers import WorkerPool
 
 REPO_ROOT = Path(__file__).resolve().parents[3]
 load_dotenv(REPO_ROOT / ".env")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    tasks = [
+        asyncio.create_task(keep_alive.run()),
+        asyncio.create_task(health_prober.run()),
+        asyncio.create_task(llm_breaker.run()),
+    ]
+    if os.getenv("WARMUP_ENABLED", "1") != "0":
+        tasks.append(asyncio.create_task(warmup.run()))
+    if session_pool.capacity > 0:
+        tasks.append(asyncio.create_task(session_pool.run()))
+    await run_in_threadpool(scratch.purge_leftovers)
+    yield
+    for task in tasks:
+        task.cancel()
+    await ollama_client.aclose()
+    await run_in_threadpool(turn_log.flush)
+    for service in (stt_service, tts_backend):
+        pool = getattr(service, "pool", None)
+        if isinstance(pool, WorkerPool):
+            pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist, so add indexes introduced since to older databases.
+for _index in SessionRecord.__table__.indexes:
+    _index.create(bind=engine, checkfirst=True)
 persona_generator = PersonaGenerator()
-ollama_client = OllamaClient(
+anti_repeat = AntiRepeatIndex(window=int(os.getenv("ANTI_REPEAT_WINDOW", "20")))
+PERSONA_SIMILARITY_MAX = float(os.getenv("PERSONA_SIMILARITY_MAX", "0.8"))
+PERSONA_CANDIDATES = int(os.getenv("PERSONA_CANDIDATES", "8"))
+persona_similarity = SimilarityIndex(
+    PersonaEncoder.for_generator(persona_generator),
+    window=int(os.getenv("PERSONA_SIMILARITY_WINDOW", "200")),
+)
+with SessionLocal() as _db:
+    anti_repeat.load(_db)
+    persona_similarity.load(_db)
+ollama_client = AsyncOllamaClient(
     base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
     model=os.getenv("OLLAMA_MODEL", "mistral:7b"),
+    keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "10m"),
+    max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "16")),
+    # A reply whose first token misses this budget is replaced by the rule-based line; 0 disables.
+    first_token_timeout_seconds=float(os.getenv("LLM_FIRST_TOKEN_BUDGET_MS", "3000")) / 1000.0 or None,
+)
+llm_breaker = CircuitBreaker(
+    probe=lambda: ollama_client.probe(),
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+    probe_interval_seconds=float(os.getenv("LLM_BREAKER_PROBE_S", "5")),
 )
+llm_scheduler = LLMScheduler(max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "2")))
+# How long a request may wait for a model slot before it is shed to the rule-based path.
+LLM_DEADLINES = {
+    Priority.LIVE: float(os.getenv("LLM_LIVE_DEADLINE_MS", "2500")) / 1000.0,
+    Priority.BACKGROUND: float(os.getenv("LLM_BACKGROUND_DEADLINE_MS", "30000")) / 1000.0,
+    Priority.BATCH: float(os.getenv("LLM_BATCH_DEADLINE_MS", "120000")) / 1000.0,
+}
+
+
+def _llm(priority: Priority) -> ScheduledLLMClient:
+    return ScheduledLLMClient(ollama_client, llm_scheduler, priority, LLM_DEADLINES[priority], breaker=llm_breaker)
 
+
+response_cache: LLMResponseCache | None = None
+if os.getenv("LLM_RESPONSE_CACHE", "0") == "1":
+    response_cache = LLMResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048")),
+        variants=int(os.getenv("LLM_CACHE_VARIANTS", "3")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_S", "3600")),
+    )
+
+scratch = ScratchArea(
+    root=Path(os.getenv("RUNTIME_IO_DIR", "") or default_scratch_root()),
+    max_bytes=int(os.getenv("RUNTIME_IO_MAX_MB", "0") or 0) * 1024 * 1024 or DEFAULT_MAX_BYTES,
+)
 _whisper_cmd = os.getenv("WHISPER_CMD_TEMPLATE", "")
+_whisper_worker_cmd = os.getenv("WHISPER_WORKER_CMD", "")
 _piper_cmd = os.getenv("PIPER_CMD_TEMPLATE", "")
+_piper_worker_cmd = os.getenv("PIPER_WORKER_CMD", "")
 _piper_voice = os.getenv("PIPER_VOICE_PATH", "")
-stt_service: STTService = WhisperCliSTTService(_whisper_cmd) if _whisper_cmd else STTService()
-tts_service: TTSService = (
-    PiperCliTTSService(_piper_cmd, _piper_voice) if _piper_cmd and _piper_voice else TTSService()
+stt_service: STTService
+if _whisper_worker_cmd:
+    stt_service = WhisperWorkerPoolSTTService(
+        WorkerPool(_whisper_worker_cmd, size=int(os.getenv("WHISPER_WORKERS", "1")))
+    )
+elif _whisper_cmd:
+    stt_service = WhisperCliSTTService(_whisper_cmd, scratch=scratch)
+else:
+    stt_service = STTService()
+vad_config = VADConfig(
+    energy_threshold=float(os.getenv("VAD_ENERGY_THRESHOLD", "500")),
+    end_of_turn_ms=int(os.getenv("VAD_END_OF_TURN_MS", "700")),
+    partial_interval_ms=int(os.getenv("STT_PARTIAL_INTERVAL_MS", "800")),
+)
+tts_backend: TTSService
+if _piper_worker_cmd and _piper_voice:
+    tts_backend = PiperWorkerTTSService(
+        WorkerPool(
+            _piper_worker_cmd.format(voice_path=_piper_voice),
+            size=int(os.getenv("PIPER_WORKERS", "1")),
+        )
+    )
+elif _piper_cmd and _piper_voice:
+    tts_backend = PiperCliTTSService(_piper_cmd, _piper_voice, scratch=scratch)
+else:
+    tts_backend = TTSService()
+
+tts_cache: TTSAudioCache | None = None
+tts_service: TTSService = tts_backend
+_tts_cache_mb = int(os.getenv("TTS_CACHE_MB", "64") or 0)
+if _tts_cache_mb > 0 and type(tts_backend) is not TTSService:
+    tts_cache = TTSAudioCache(
+        memory_budget_bytes=_tts_cache_mb * 1024 * 1024,
+        disk_dir=Path(os.getenv("TTS_CACHE_DIR", "") or DEFAULT_CACHE_DIR),
+    )
+    tts_service = CachedTTSService(
+        tts_backend,
+        tts_cache,
+        voice_path=_piper_voice,
+        params={"command": _piper_worker_cmd or _piper_cmd},
+    )
+
+
+health_prober = RuntimeHealthProber(
+    probe_checks(
+        ollama_client,
+        ollama_client.model,
+        whisper_cmd_template=_whisper_cmd,
+        piper_cmd_template=_piper_cmd,
+        piper_voice_path=_piper_voice,
+        whisper_worker_cmd=_whisper_worker_cmd,
+        piper_worker_cmd=_piper_worker_cmd,
+    ),
+    interval_seconds=float(os.getenv("RUNTIME_HEALTH_INTERVAL_S", "15")),
+    check_timeout_seconds=float(os.getenv("RUNTIME_HEALTH_TIMEOUT_S", "3")),
+)
+
+
+def _warm_stt() -> str | None:
+    if type(stt_service) is STTService:
+        return "not configured"
+    if isinstance(stt_service, WhisperWorkerPoolSTTService):
+        stt_service.pool.start()
+    try:
+        stt_service.transcribe_chunk(pcm_to_wav(bytes(16000), 16000))
+    except RuntimeError as exc:
+        # Half a second of silence legitimately transcribes to nothing.
+        if "no transcript" not in str(exc):
+            raise
+    return None
+
+
+def _warm_tts() -> str | None:
+    if type(tts_backend) is TTSService:
+        return "not configured"
+    if isinstance(tts_backend, PiperWorkerTTSService):
+        tts_backend.pool.start()
+    tts_backend.synthesize("Hello?")
+    # Rule-based fallback lines repeat verbatim, so render them into the cache up front.
+    for line in fallback_lines(PersonaGenerator.objections):
+        tts_service.synthesize(line)
+    return None
+
+
+conversations = ConversationStore(
+    max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", "256")),
+    ttl_seconds=float(os.getenv("CONVERSATION_TTL_S", "3600")),
+)
+warmup = Warmup(
+    {
+        "ollama": ollama_client.preload,
+        "whisper": partial(run_in_threadpool, _warm_stt),
+        "piper": partial(run_in_threadpool, _warm_tts),
+    }
+)
+turn_log = TurnLogWriter(
+    SessionLocal,
+    batch_size=int(os.getenv("TURN_LOG_BATCH_SIZE", "64")),
+    flush_interval_seconds=float(os.getenv("TURN_LOG_FLUSH_MS", "250")) / 1000.0,
+)
+keep_alive = KeepAlive(
+    refresh=ollama_client.preload,
+    interval_seconds=float(os.getenv("OLLAMA_KEEPALIVE_REFRESH_S", "120")),
+    active_window_seconds=float(os.getenv("SESSION_ACTIVE_WINDOW_S", "600")),
+)
+
+
+def _new_seed(taken: Collection[int] = ()) -> int:
+    seed = randint(1, 10_000_000)
+    while anti_repeat.seed_used(seed) or seed in taken:
+        seed = randint(1, 10_000_000)
+    return seed
+
+
+def _choose_persona(seed: int, pending: Sequence[PreparedSession] = ()) -> Persona:
+    # Sessions already waiting in the pool count as recent, so the pool itself stays varied.
+    recent = [asdict(p.persona) for p in reversed(pending)] + anti_repeat.recent_sessions()
+    return persona_generator.generate(
+        seed=seed,
+        recent_sessions=recent,
+        similarity=persona_similarity,
+        max_similarity=PERSONA_SIMILARITY_MAX,
+        candidates=PERSONA_CANDIDATES,
+    )
+
+
+async def _prepare_session(pending: list[PreparedSession]) -> PreparedSession:
+    seed = _new_seed({p.seed for p in pending})
+    persona = _choose_persona(seed, pending)
+    opening_line = await agenerate_opener(asdict(persona), _llm(Priority.BACKGROUND))
+    opening_audio = await run_in_threadpool(_synthesize_or_empty, opening_line)
+    # Carry the generated opener on the persona so freshness checks compare what will actually be said.
+    persona = replace(persona, opening_line=opening_line)
+    return PreparedSession(seed=seed, persona=persona, opening_line=opening_line, opening_audio=opening_audio)
+
+
+def _still_fresh(prepared: PreparedSession) -> bool:
+    persona = prepared.persona
+    return (
+        not anti_repeat.seed_used(prepared.seed)
+        and persona.primary_objection in persona_generator.objection_pool(anti_repeat.recent_sessions())
+        and float(persona_similarity.max_similarity([persona])[0]) < PERSONA_SIMILARITY_MAX
+    )
+
+
+session_pool = SessionPool(
+    _prepare_session,
+    capacity=int(os.getenv("SESSION_POOL_SIZE", "3")),
+    # Only prepare sessions while no live turn is using the model.
+    idle=lambda: llm_scheduler.idle() and getattr(ollama_client, "in_flight", 0) == 0,
 )
 
 
+def _worker_pools() -> dict[str, WorkerPool]:
+    pools = {}
+    for name, service in (("stt", stt_service), ("tts", tts_backend)):
+        pool = getattr(service, "pool", None)
+        if isinstance(pool, WorkerPool):
+            pools[name] = pool
+    return pools
+
+
+for _gauge in (
+    Gauge("wetpancake_llm_in_flight", "Ollama requests in flight.", lambda: getattr(ollama_client, "in_flight", 0)),
+    Gauge("wetpancake_llm_queue_depth", "LLM requests waiting for a model slot.", lambda: llm_scheduler.queued()),
+    Gauge("wetpancake_llm_circuit_open", "1 while LLM calls are short-circuited.", lambda: int(llm_breaker.is_open())),
+    Gauge(
+        "wetpancake_worker_busy",
+        "Busy resident workers per pool.",
+        lambda: {(name,): pool.stats()["busy"] for name, pool in _worker_pools().items()},
+    ),
+    Gauge(
+        "wetpancake_worker_queue_depth",
+        "Jobs waiting for a resident worker per pool.",
+        lambda: {(name,): pool.stats()["queue_depth"] for name, pool in _worker_pools().items()},
+    ),
+    Gauge("wetpancake_turn_log_pending", "Turns queued for the write-behind log.", lambda: turn_log.pending()),
+    Gauge("wetpancake_session_pool_depth", "Prepared sessions ready to start.", lambda: len(session_pool)),
+    Gauge("wetpancake_conversations", "Live server-side conversations.", lambda: len(conversations)),
+):
+    REGISTRY.register(_gauge)
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    started = time.perf_counter()
+    with collect_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Label by route template, not the raw path, so session ids do not explode the series.
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    request_seconds.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    # Streaming responses only cover time to first byte here; their done frame carries the full breakdown.
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
 @app.get("/runtime/health")
-def runtime_health() -> dict:
-    return check_runtime_dependencies(
-        ollama_base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
-        ollama_model=os.getenv("OLLAMA_MODEL", "mistral:7b"),
-        whisper_cmd_template=os.getenv("WHISPER_CMD_TEMPLATE", ""),
-        piper_cmd_template=os.getenv("PIPER_CMD_TEMPLATE", ""),
-        piper_voice_path=os.getenv("PIPER_VOICE_PATH", ""),
-    )
+async def runtime_health() -> dict:
+    if health_prober.last_probe_at is None:
+        # Only before the background prober's first pass (or when it is not running, as in tests).
+        await health_prober.probe_once()
+    report = health_prober.snapshot()
+    if isinstance(stt_service, WhisperWorkerPoolSTTService):
+        report["stt_workers"] = stt_service.pool.stats()
+    if isinstance(tts_backend, PiperWorkerTTSService):
+        report["tts_workers"] = tts_backend.pool.stats()
+    if tts_cache is not None:
+        report["tts_cache"] = tts_cache.stats()
+    report["llm_scheduler"] = llm_scheduler.stats()
+    report["llm_breaker"] = llm_breaker.stats()
+    if response_cache is not None:
+        report["llm_cache"] = response_cache.stats()
+    report["turn_log"] = turn_log.stats()
+    report["session_pool"] = session_pool.stats()
+    report["warmup"] = warmup.report()
+    report["keep_alive"] = {
+        "session_active": keep_alive.active(),
+        "refreshes": keep_alive.refreshes,
+        "last_error": keep_alive.last_error,
+    }
+    return report
 
 
 @app.post("/sessions", response_model=SessionCreateResponse, status_code=201)
 def create_session(payload: SessionCreate, db: Session = Depends(get_db)) -> SessionCreateResponse:
-    recent_rows = db.execute(
-        select(SessionRecord.primary_objection).order_by(SessionRecord.created_at.desc()).limit(20)
-    ).all()
-    recent_sessions = [{"primary_objection": row[0]} for row in recent_rows]
-
-    seed = randint(1, 10_000_000)
-    persona = persona_generator.generate(seed=seed, recent_sessions=recent_sessions)
+    keep_alive.touch()
+    prepared = session_pool.take(_still_fresh)
+    if prepared is None:
+        # Pool empty or stale: pick a persona inline and use its templated opener without audio.
+        seed = _new_seed()
+        persona = _choose_persona(seed)
+        prepared = PreparedSession(seed=seed, persona=persona, opening_line=persona.opening_line, opening_audio=b"")
+    persona = prepared.persona
 
     session = SessionRecord(
         session_id=str(uuid4()),
-        seed=seed,
+        seed=prepared.seed,
         duration_minutes=payload.duration_minutes,
         industry=persona.industry,
         role=persona.role,
         primary_objection=persona.primary_objection,
     )
     db.add(session)
-    db.commit()
-    return SessionCreateResponse(session_id=session.session_id, seed=session.seed)
+    with timed_stage("db"):
+        db.commit()
+    anti_repeat.add(
+        seed=session.seed,
+        industry=session.industry,
+        role=session.role,
+        primary_objection=session.primary_objection,
+    )
+    # Index the opener the session actually speaks, not the persona's template.
+    persona_similarity.add(replace(persona, opening_line=prepared.opening_line))
+
+    conversation = conversations.get_or_create(
+        session.session_id, objection=persona.primary_objection, state=OPENING_STATE, seed=session.seed
+    )
+    conversation.open_with(prepared.opening_line)
+    turn_log.record(
+        TurnEntry(
+            session.session_id,
+            0,
+            "prospect",
+            prepared.opening_line,
+            trust=OPENING_STATE.trust,
+            resistance=OPENING_STATE.resistance,
+        )
+    )
+    return SessionCreateResponse(
+        session_id=session.session_id,
+        seed=session.seed,
+        opening_line=prepared.opening_line,
+        opening_audio=base64.b64encode(prepared.opening_audio).decode("ascii") if prepared.opening_audio else None,
+    )
 
 
 @app.get("/sessions/{session_id}", response_model=SessionReadResponse)
@@ -104,43 +483,237 @@ def get_session(session_id: str, db: Session = Depends(get_db)) -> SessionReadRe
     )
 
 
+@app.post("/sessions/{session_id}/end", response_model=SessionEndResponse)
+async def end_session(session_id: str) -> SessionEndResponse:
+    conversation = conversations.get(session_id) or await run_in_threadpool(_restore_conversation, session_id)
+    if not conversation.ended:
+        conversations.end(session_id)
+        turn_log.record(TurnEntry(session_id, len(conversation.history), SESSION_END_SPEAKER, ""))
+    durable = await run_in_threadpool(turn_log.flush)
+    if not durable:
+        # Either the flush timed out or a batch since the last flush failed to commit.
+        raise HTTPException(status_code=503, detail="turn_log_flush_failed")
+    return SessionEndResponse(session_id=session_id, durable=durable)
+
+
+@app.get("/sessions/{session_id}/turns", response_model=SessionTurnsResponse)
+def get_session_turns(session_id: str, db: Session = Depends(get_db)) -> SessionTurnsResponse:
+    rows = db.scalars(
+        select(TurnRecord)
+        .where(TurnRecord.session_id == session_id, TurnRecord.speaker != SESSION_END_SPEAKER)
+        .order_by(TurnRecord.turn_index)
+    ).all()
+    return SessionTurnsResponse(
+        session_id=session_id,
+        turns=[
+            TurnRead(
+                turn_index=row.turn_index,
+                speaker=row.speaker,
+                text=row.text,
+                trust=row.trust,
+                resistance=row.resistance,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ],
+    )
+
+
+STT_MAX_SECONDS = float(os.getenv("STT_MAX_SECONDS", "120"))
+
+
+def _transcribe_upload(fileobj: BinaryIO, content_type: str) -> str:
+    # Decoding reads the spooled upload in chunks; formats we cannot decode go to STT untouched.
+    with timed_stage("audio_decode"):
+        samples = decode_upload(fileobj, content_type, max_seconds=STT_MAX_SECONDS)
+    if samples is None:
+        return stt_service.transcribe_chunk(fileobj.read())
+    return stt_service.transcribe_pcm(samples)
+
+
 @app.post("/stt/transcribe", response_model=STTResponse)
 async def stt_transcribe(audio: UploadFile = File(...)) -> STTResponse:
-    data = await audio.read()
     try:
-        text = stt_service.transcribe_chunk(data)
+        text = await run_in_threadpool(_transcribe_upload, audio.file, audio.content_type or "")
+    except AudioTooLong as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
     except RuntimeError as exc:
+        health_prober.report_failure("whisper", str(exc))
         raise HTTPException(status_code=503, detail=str(exc)) from exc
+    health_prober.report_success("whisper")
     return STTResponse(text=text)
 
 
+@app.websocket("/stt/stream")
+async def stt_stream(websocket: WebSocket) -> None:
+    await websocket.accept()
+    transcriber = StreamingTranscriber(stt_service, vad_config)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                step = partial(transcriber.feed, message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "flush":
+                step = transcriber.flush
+            else:
+                continue
+            try:
+                events = await run_in_threadpool(step)
+            except RuntimeError as exc:
+                events = [{"type": "error", "stage": "final", "detail": str(exc)}]
+                if step == transcriber.flush:
+                    # The client waits for end_of_turn after a flush; never leave it hanging.
+                    events.append({"type": "end_of_turn", "reason": "flush"})
+            for event in events:
+                if event["type"] == "error":
+                    health_prober.report_failure("whisper", event["detail"])
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        return
+
+
+TTS_OPUS_BITRATE = int(os.getenv("TTS_OPUS_BITRATE", "24000"))
+
+
+def _reported(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    # Headers are already sent once streaming starts; a failure can only cut the body short.
+    try:
+        yield from chunks
+    except RuntimeError as exc:
+        health_prober.report_failure("piper", str(exc))
+        raise
+
+
 @app.post("/tts/synthesize")
-def tts_synthesize(payload: TTSRequest) -> Response:
+def tts_synthesize(
+    payload: TTSRequest,
+    audio_format: Literal["wav", "pcm", "opus"] | None = Query(default=None, alias="format"),
+    accept: str = Header(default=""),
+) -> Response:
+    fmt = negotiate_format(audio_format, accept)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail="Opus output needs PyAV installed on the backend")
     try:
-        wav = tts_service.synthesize(payload.text)
+        if fmt == "wav":
+            wav = tts_service.synthesize(payload.text)
+        else:
+            stream = tts_service.open_pcm_stream(payload.text)
     except RuntimeError as exc:
+        health_prober.report_failure("piper", str(exc))
         raise HTTPException(status_code=503, detail=str(exc)) from exc
-    return Response(content=wav, media_type="audio/wav")
+    health_prober.report_success("piper")
+    if fmt == "wav":
+        return Response(content=wav, media_type="audio/wav")
+
+    if fmt == "pcm":
+        headers = {
+            "X-Audio-Sample-Rate": str(stream.sample_rate),
+            "X-Audio-Channels": str(stream.channels),
+            "X-Audio-Encoding": "s16le",
+        }
+        return StreamingResponse(_reported(stream.chunks), media_type=PCM_MEDIA_TYPE, headers=headers)
+    opus = encode_opus(_reported(stream.chunks), stream.sample_rate, stream.channels, bitrate=TTS_OPUS_BITRATE)
+    return StreamingResponse(opus, media_type=OPUS_MEDIA_TYPE)
+
+
+def _load_session(session_id: str) -> tuple[SessionRecord, list[TurnRecord]] | None:
+    # Turns are written behind; drain the queue so the replay sees everything said so far.
+    turn_log.flush()
+    with SessionLocal() as db:
+        record = db.get(SessionRecord, session_id)
+        if record is None:
+            return None
+        turns = db.scalars(
+            select(TurnRecord).where(TurnRecord.session_id == session_id).order_by(TurnRecord.turn_index)
+        ).all()
+        return record, list(turns)
+
+
+def _restore_conversation(session_id: str) -> Conversation:
+    # Evicted or from before a restart: rebuild from the turn log so new turn indices follow on.
+    loaded = _load_session(session_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="session_not_found")
+    record, rows = loaded
+    turns = [row for row in rows if row.speaker != SESSION_END_SPEAKER]
+    rated = [turn for turn in turns if turn.trust is not None and turn.resistance is not None]
+    state = ProspectState(trust=rated[-1].trust, resistance=rated[-1].resistance) if rated else OPENING_STATE
+    return conversations.restore(
+        session_id,
+        objection=record.primary_objection,
+        state=state,
+        seed=record.seed,
+        turns=[(turn.speaker, turn.text) for turn in turns],
+        ended=len(turns) < len(rows),
+    )
+
+
+async def _conversation_for(payload: DialogueRequest) -> Conversation | None:
+    if not payload.session_id:
+        return None
+    conversation = conversations.get(payload.session_id)
+    if conversation is None:
+        conversation = await run_in_threadpool(_restore_conversation, payload.session_id)
+    if conversation.ended:
+        raise HTTPException(status_code=409, detail="session_ended")
+    return conversation
+
+
+def _cache_seed(conversation: Conversation | None) -> int:
+    # Sessions keep one cached variant for their lifetime; anonymous turns pick one at random.
+    return conversation.seed if conversation is not None else randint(0, 10_000_000)
+
+
+def _turn_inputs(payload: DialogueRequest, conversation: Conversation | None) -> tuple[ProspectState, dict]:
+    if conversation is not None:
+        return conversation.state, {"primary_objection": conversation.objection}
+    return (
+        ProspectState(trust=payload.trust, resistance=payload.resistance),
+        {"primary_objection": payload.primary_objection},
+    )
 
 
 @app.post("/dialogue/turn", response_model=DialogueResponse)
-def dialogue_turn(payload: DialogueRequest) -> DialogueResponse:
+async def dialogue_turn(payload: DialogueRequest) -> DialogueResponse:
+    keep_alive.touch()
+    conversation = await _conversation_for(payload)
+    state, persona = _turn_inputs(payload, conversation)
     try:
+        turn = await agenerate_prospect_turn(
+            state=state,
+            trainee_text=payload.trainee_text,
+            persona=persona,
+            llm_client=_llm(Priority.LIVE),
+            conversation=conversation,
+            cache=response_cache,
+            seed=_cache_seed(conversation),
+        )
+        health_prober.report_success("ollama")
+    except (LLMRequestShed, CircuitOpenError) as exc:
+        # A saturated or known-down model would stall the call; a scripted reply now beats a late one.
+        fallbacks_total.inc(stage=exc.fallback_stage, endpoint="/dialogue/turn")
         turn = generate_prospect_turn(
-            state=ProspectState(trust=payload.trust, resistance=payload.resistance),
+            state=state,
             trainee_text=payload.trainee_text,
-            persona={"primary_objection": payload.primary_objection},
-            llm_client=ollama_client,
+            persona=persona,
+            llm_client=None,
         )
     except RuntimeError as exc:
         # If local LLM runtime is unavailable, degrade to deterministic rule-based output.
+        fallbacks_total.inc(stage="llm", endpoint="/dialogue/turn")
+        health_prober.report_failure("ollama", str(exc))
         turn = generate_prospect_turn(
-            state=ProspectState(trust=payload.trust, resistance=payload.resistance),
+            state=state,
             trainee_text=payload.trainee_text,
-            persona={"primary_objection": payload.primary_objection},
+            persona=persona,
             llm_client=None,
         )
 
+    if conversation is not None:
+        _record_turn(conversation, payload.trainee_text, turn.text, turn.next_state)
+
     return DialogueResponse(
         text=turn.text,
         trust=turn.next_state.trust,
@@ -148,6 +721,214 @@ def dialogue_turn(payload: DialogueRequest) -> DialogueResponse:
     )
 
 
+def _record_turn(conversation: Conversation, trainee_text: str, reply_text: str, next_state: ProspectState) -> None:
+    # The in-memory conversation is authoritative for the live call; the DB copy is written behind.
+    turn_index = len(conversation.history)
+    conversation.record_turn(trainee_text, reply_text, next_state)
+    turn_log.record(TurnEntry(conversation.session_id, turn_index, "trainee", trainee_text))
+    turn_log.record(
+        TurnEntry(
+            conversation.session_id,
+            turn_index + 1,
+            "prospect",
+            reply_text,
+            trust=next_state.trust,
+            resistance=next_state.resistance,
+        )
+    )
+
+
+def _ndjson(frame: dict) -> bytes:
+    return (json.dumps(frame) + "\n").encode("utf-8")
+
+
+async def _with_fallback(tokens: AsyncIterable[str], fallback_text: str) -> AsyncIterator[str]:
+    produced = False
+    try:
+        async for token in tokens:
+            produced = True
+            yield token
+        health_prober.report_success("ollama")
+    except (LLMRequestShed, CircuitOpenError) as exc:
+        fallbacks_total.inc(stage=exc.fallback_stage, endpoint="stream")
+        yield fallback_text
+    except RuntimeError as exc:
+        # Only substitute the rule-based reply if nothing was spoken yet; a partial reply stands.
+        fallbacks_total.inc(stage="llm", endpoint="stream" if not produced else "stream_partial")
+        health_prober.report_failure("ollama", str(exc))
+        if not produced:
+            yield fallback_text
+    finally:
+        await aclose_upstream(tokens)
+
+
+async def _start_turn_stream(
+    payload: DialogueRequest,
+) -> tuple[ProspectState, AsyncIterator[str], Conversation | None]:
+    keep_alive.touch()
+    conversation = await _conversation_for(payload)
+    state, persona = _turn_inputs(payload, conversation)
+    turn = astream_prospect_turn(
+        state=state,
+        trainee_text=payload.trainee_text,
+        persona=persona,
+        llm_client=_llm(Priority.LIVE),
+        conversation=conversation,
+        cache=response_cache,
+        seed=_cache_seed(conversation),
+    )
+    fallback = generate_prospect_turn(
+        state=state,
+        trainee_text=payload.trainee_text,
+        persona=persona,
+        llm_client=None,
+    )
+    return turn.next_state, _with_fallback(turn.tokens, fallback.text), conversation
+
+
+def _done_frame(text: str) -> bytes:
+    frame: dict = {"type": "done", "text": text}
+    timings = current_timings()
+    if timings:
+        # Headers left before the reply was generated, so the stage breakdown rides on the last frame.
+        frame["timings"] = timings_ms(timings)
+    return _ndjson(frame)
+
+
+def _state_frame(state: ProspectState) -> bytes:
+    return _ndjson({"type": "state", "trust": state.trust, "resistance": state.resistance})
+
+
+@app.post("/dialogue/turn/stream")
+async def dialogue_turn_stream(payload: DialogueRequest) -> StreamingResponse:
+    next_state, tokens, conversation = await _start_turn_stream(payload)
+
+    async def _frames():
+        yield _state_frame(next_state)
+        parts: list[str] = []
+        async for token in tokens:
+            parts.append(token)
+            yield _ndjson({"type": "token", "text": token})
+        text = "".join(parts).strip()
+        if conversation is not None:
+            _record_turn(conversation, payload.trainee_text, text, next_state)
+        yield _done_frame(text)
+
+    return StreamingResponse(_frames(), media_type="application/x-ndjson")
+
+
+def _synthesize_or_empty(text: str) -> bytes:
+    try:
+        wav = tts_service.synthesize(text)
+    except (RuntimeError, OSError) as exc:
+        # Keep the call going as text if TTS fails mid-reply, whatever broke underneath.
+        fallbacks_total.inc(stage="tts", endpoint="speech")
+        health_prober.report_failure("piper", str(exc))
+        return b""
+    health_prober.report_success("piper")
+    return wav
+
+
+@app.post("/dialogue/turn/speech")
+async def dialogue_turn_speech(payload: DialogueRequest) -> StreamingResponse:
+    next_state, tokens, conversation = await _start_turn_stream(payload)
+
+    async def _frames():
+        yield _state_frame(next_state)
+        spoken: list[str] = []
+        async for sentence, wav in pipeline_speech(asplit_sentences(tokens), _synthesize_or_empty):
+            spoken.append(sentence)
+            if wav:
+                yield _ndjson(
+                    {
+                        "type": "audio",
+                        "text": sentence,
+                        "media_type": "audio/wav",
+                        "audio": base64.b64encode(wav).decode("ascii"),
+                    }
+                )
+            else:
+                yield _ndjson({"type": "text", "text": sentence})
+        text = " ".join(spoken)
+        if conversation is not None:
+            _record_turn(conversation, payload.trainee_text, text, next_state)
+        yield _done_frame(text)
+
+    return StreamingResponse(_frames(), media_type="application/x-ndjson")
+
+
 @app.post("/sessions/score", response_model=ScoringResponse)
 def session_score(payload: ScoringRequest) -> ScoringResponse:
     return ScoringResponse(**score_session(payload.transcript, payload.outcomes))
+
+
+def _scored_conversation(session_id: str) -> Conversation:
+    # Scoring must outlive eviction too, or the final score is never recorded.
+    return conversations.get(session_id) or _restore_conversation(session_id)
+
+
+@app.get("/sessions/{session_id}/score/live", response_model=ScoringResponse)
+def session_score_live(
+    session_id: str,
+    close_attempt: bool | None = None,
+    value_statement: bool | None = None,
+    objection_resolved: bool | None = None,
+) -> ScoringResponse:
+    # Only outcomes the client has reported count, matching the keys it would post at the end.
+    reported = {
+        "close_attempt": close_attempt,
+        "value_statement": value_statement,
+        "objection_resolved": objection_resolved,
+    }
+    conversation = _scored_conversation(session_id)
+    return ScoringResponse(**conversation.score.score({k: v for k, v in reported.items() if v is not None}))
+
+
+@app.post("/sessions/{session_id}/score", response_model=ScoringResponse)
+def session_score_final(
+    session_id: str, payload: SessionScoreRequest, db: Session = Depends(get_db)
+) -> ScoringResponse:
+    # Hold the conversation itself; a second lookup could miss it if it is evicted meanwhile.
+    conversation = _scored_conversation(session_id)
+    scored = ScoringResponse(**conversation.score.score(payload.outcomes))
+    with timed_stage("db"):
+        record_score(
+            db,
+            session_id=session_id,
+            trainee_id=payload.trainee_id,
+            report=scored.model_dump(),
+            primary_objection=conversation.objection,
+        )
+    return scored
+
+
+@app.get("/trainees/{trainee_id}/sessions", response_model=SessionHistoryResponse)
+def trainee_sessions(
+    trainee_id: str,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+) -> SessionHistoryResponse:
+    try:
+        items, next_cursor = history_page(db, trainee_id, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+    return SessionHistoryResponse(items=items, next_cursor=next_cursor)
+
+
+@app.get("/trainees/{trainee_id}/progress", response_model=ProgressResponse)
+def trainee_progress(
+    trainee_id: str,
+    period: str = Query(default="week", pattern="^(day|week)$"),
+    limit: int = Query(default=12, ge=1, le=366),
+    db: Session = Depends(get_db),
+) -> ProgressResponse:
+    return ProgressResponse(trainee_id=trainee_id, period=period, points=progress(db, trainee_id, period, limit))
+
+
+@app.post("/sessions/score/batch")
+def session_score_batch(payload: ScoringBatchRequest) -> StreamingResponse:
+    # One NDJSON line per transcript, emitted chunk by chunk so large rescoring jobs start streaming at once.
+    reports = iter_score_sessions((item.transcript, item.outcomes) for item in payload.items)
+    lines = (_ndjson({"index": index, **report}) for index, report in enumerate(reports))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
@@ -0,0 +1,213 @@
+﻿import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INF_BUCKET = 'le="+Inf"'
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    # Sampled at scrape time, so queue depths and in-flight counts are never stale.
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], dict[tuple[str, ...], float] | float]):
+        super().__init__(name, help_text)
+        self.read = read
+
+    def _samples(self) -> list[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_label_text(('name',), key)} {v}" for key, v in sorted(value.items())]
+        return [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _label_text(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+stage_seconds = REGISTRY.register(
+    Histogram("wetpancake_stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+)
+request_seconds = REGISTRY.register(
+    Histogram("wetpancake_http_request_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+)
+fallbacks_total = REGISTRY.register(
+    Counter("wetpancake_fallbacks_total", "Replies degraded to a fallback path.", ("stage", "endpoint"))
+)
+subprocess_failures_total = REGISTRY.register(
+    Counter("wetpancake_subprocess_failures_total", "Failed STT/TTS subprocess or worker jobs.", ("component",))
+)
+llm_shed_total = REGISTRY.register(
+    Counter("wetpancake_llm_shed_total", "LLM requests dropped after their queue deadline passed.", ("priority",))
+)
+
+_request_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[list[tuple[str, float]]]:
+    timings: list[tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def current_timings() -> list[tuple[str, float]] | None:
+    return _request_timings.get()
+
+
+def instrumented(stage: str, component: str) -> Callable:
+    # Times a blocking adapter call and counts the RuntimeErrors it raises as component failures.
+    def decorate(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage):
+                try:
+                    return fn(*args, **kwargs)
+                except RuntimeError:
+                    subprocess_failures_total.inc(component=component)
+                    raise
+
+        return wrapper
+
+    return decorate
+
+
+def timings_ms(timings: list[tuple[str, float]]) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds * 1000.0
+    return {stage: round(ms, 1) for stage, ms in totals.items()}
+
+
+def server_timing_header(timings: list[tuple[str, float]], total_seconds: float) -> str:
+    entries = [f"{stage};dur={ms}" for stage, ms in timings_ms(timings).items()]
+    entries.append(f"total;dur={round(total_seconds * 1000.0, 1)}")
+    return ", ".join(entries)
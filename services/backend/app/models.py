@@ -1,6 +1,6 @@
 ﻿from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Integer, String
+from sqlalchemy import DateTime, Float, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -17,6 +17,57 @@ class SessionRecord(Base):
     industry: Mapped[str] = mapped_column(String(64), nullable=False)
     role: Mapped[str] = mapped_column(String(64), nullable=False)
     primary_objection: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True
+    )
+
+
+class TurnRecord(Base):
+    __tablename__ = "turns"
+    __table_args__ = (Index("ix_turns_session_turn", "session_id", "turn_index"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    session_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    turn_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    speaker: Mapped[str] = mapped_column(String(16), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    trust: Mapped[float | None] = mapped_column(Float, nullable=True)
+    resistance: Mapped[float | None] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
+
+
+class ScoreRecord(Base):
+    __tablename__ = "scores"
+    # Covers the history listing, so a page is served from the index alone.
+    __table_args__ = (
+        Index(
+            "ix_scores_trainee_history",
+            "trainee_id",
+            "created_at",
+            "session_id",
+            "total_score",
+            "primary_objection",
+        ),
+    )
+
+    session_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    trainee_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    total_score: Mapped[int] = mapped_column(Integer, nullable=False)
+    dimensions: Mapped[str] = mapped_column(Text, nullable=False)
+    primary_objection: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
+class ScoreRollup(Base):
+    __tablename__ = "score_rollups"
+
+    trainee_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)
+    period_start: Mapped[str] = mapped_column(String(10), primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(32), primary_key=True)
+    sessions: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    score_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,6 +1,9 @@
 ﻿from dataclasses import dataclass
 from random import Random
-from typing import Sequence
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from app.similarity import SimilarityIndex
 
 
 @dataclass(frozen=True)
@@ -11,6 +14,7 @@ class Persona:
     personality: str
     urgency: str
     primary_objection: str
+    opening_line: str = ""
 
 
 class PersonaGenerator:
@@ -20,22 +24,79 @@ class PersonaGenerator:
     personalities = ["skeptical", "direct", "friendly", "impatient", "analytical"]
     urgencies = ["this_quarter", "this_month", "no_rush", "active_project"]
     objections = ["no_budget", "busy", "send_email", "already_vendor", "no_interest"]
+    opening_lines = {
+        "no_budget": [
+            "Hello? If this is about buying something, we froze spending last month.",
+            "Yeah, who's this? Budgets are locked, just so you know.",
+            "Speaking. Before you start, there's no money for new tools this year.",
+        ],
+        "busy": [
+            "Yeah, I've got about two minutes. What is this?",
+            "Hello, I'm between meetings, make it quick.",
+            "This is a bad time, honestly. What do you need?",
+        ],
+        "send_email": [
+            "Hi. Can you just put whatever this is in an email?",
+            "Hello? If you're selling, send me something in writing.",
+            "Yeah, I don't really do calls. Email works better.",
+        ],
+        "already_vendor": [
+            "Hello. We already have a provider for pretty much everything.",
+            "Yeah? We signed with someone last year, so I doubt it.",
+            "Speaking. Just so you know, we're happy with our current vendor.",
+        ],
+        "no_interest": [
+            "Hello? Look, I'm not really interested in sales calls.",
+            "Yeah, who is this? We're not looking for anything.",
+            "Hi. I'll save you time, we're not in the market.",
+        ],
+    }
 
-    def generate(self, seed: int, recent_sessions: Sequence[dict]) -> Persona:
-        rnd = Random(seed)
+    def _draw(self, rnd: Random, objection_pool: Sequence[str]) -> Persona:
+        industry = rnd.choice(self.industries)
+        role = rnd.choice(self.roles)
+        pain_point = rnd.choice(self.pain_points)
+        personality = rnd.choice(self.personalities)
+        urgency = rnd.choice(self.urgencies)
+        primary_objection = rnd.choice(objection_pool)
+        return Persona(
+            industry=industry,
+            role=role,
+            pain_point=pain_point,
+            personality=personality,
+            urgency=urgency,
+            primary_objection=primary_objection,
+            opening_line=rnd.choice(self.opening_lines[primary_objection]),
+        )
+
+    def objection_pool(self, recent_sessions: Sequence[dict]) -> list[str]:
         recent_objections = {
             session.get("primary_objection")
             for session in recent_sessions
             if session.get("primary_objection")
         }
         available_objections = [o for o in self.objections if o not in recent_objections]
-        objection_pool = available_objections or self.objections
+        return available_objections or self.objections
 
-        return Persona(
-            industry=rnd.choice(self.industries),
-            role=rnd.choice(self.roles),
-            pain_point=rnd.choice(self.pain_points),
-            personality=rnd.choice(self.personalities),
-            urgency=rnd.choice(self.urgencies),
-            primary_objection=rnd.choice(objection_pool),
-        )
+    def generate_candidates(self, seed: int, recent_sessions: Sequence[dict], count: int) -> list[Persona]:
+        rnd = Random(seed)
+        objection_pool = self.objection_pool(recent_sessions)
+        return [self._draw(rnd, objection_pool) for _ in range(count)]
+
+    def generate(
+        self,
+        seed: int,
+        recent_sessions: Sequence[dict],
+        similarity: "SimilarityIndex | None" = None,
+        max_similarity: float = 0.8,
+        candidates: int = 8,
+    ) -> Persona:
+        if similarity is None or not len(similarity):
+            return self.generate_candidates(seed, recent_sessions, 1)[0]
+        # Score the whole candidate batch against the window at once and keep the first novel one.
+        pool = self.generate_candidates(seed, recent_sessions, candidates)
+        scores = similarity.max_similarity(pool)
+        for persona, score in zip(pool, scores):
+            if score < max_similarity:
+                return persona
+        return pool[int(scores.argmin())]
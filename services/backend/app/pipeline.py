@@ -0,0 +1,99 @@
+﻿import asyncio
+import re
+from typing import AsyncIterable, AsyncIterator, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+_CLAUSE_END = re.compile(r"[,;:]\s+")
+_DONE = object()
+
+
+async def aclose_upstream(iterable: AsyncIterable) -> None:
+    # `async for` never closes its iterable; do it now so HTTP streams and LLM slots are freed before GC.
+    aclose = getattr(iterable, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def _next_boundary(buffer: str, min_clause_chars: int) -> int:
+    match = _SENTENCE_END.search(buffer)
+    if match is not None:
+        return match.end()
+    for match in _CLAUSE_END.finditer(buffer):
+        if match.start() >= min_clause_chars:
+            return match.end()
+    return -1
+
+
+class SentenceSplitter:
+    def __init__(self, min_clause_chars: int = 40):
+        self.min_clause_chars = min_clause_chars
+        self._buffer = ""
+
+    def push(self, token: str) -> list[str]:
+        self._buffer += token
+        sentences = []
+        while True:
+            cut = _next_boundary(self._buffer, self.min_clause_chars)
+            if cut < 0:
+                return sentences
+            sentence, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if sentence:
+                sentences.append(sentence)
+
+    def finish(self) -> list[str]:
+        tail, self._buffer = self._buffer.strip(), ""
+        return [tail] if tail else []
+
+
+async def asplit_sentences(tokens: AsyncIterable[str], min_clause_chars: int = 40) -> AsyncIterator[str]:
+    splitter = SentenceSplitter(min_clause_chars)
+    try:
+        async for token in tokens:
+            for sentence in splitter.push(token):
+                yield sentence
+    finally:
+        await aclose_upstream(tokens)
+    for sentence in splitter.finish():
+        yield sentence
+
+
+async def pipeline_speech(
+    sentences: AsyncIterable[str],
+    synthesize: Callable[[str], bytes],
+    max_pending: int = 4,
+) -> AsyncIterator[tuple[str, bytes]]:
+    # Backpressure comes from `room`, so the terminal item can always be queued without blocking.
+    pending: asyncio.Queue = asyncio.Queue()
+    room = asyncio.Semaphore(max_pending)
+
+    async def _produce() -> None:
+        # Pulling sentences drives the LLM, so generation continues while TTS runs below.
+        outcome: object = _DONE
+        try:
+            async for sentence in sentences:
+                await room.acquire()
+                pending.put_nowait(sentence)
+        except Exception as exc:
+            outcome = exc
+        except asyncio.CancelledError:
+            outcome = RuntimeError("speech producer was cancelled")
+            raise
+        finally:
+            pending.put_nowait(outcome)
+            await aclose_upstream(sentences)
+
+    producer = asyncio.create_task(_produce())
+    try:
+        while True:
+            item = await pending.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            room.release()
+            yield item, await run_in_threadpool(synthesize, item)
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
@@ -0,0 +1,56 @@
+﻿import argparse
+import json
+import sys
+
+# Resident TTS worker: keeps one Piper voice loaded and synthesizes JSON-input lines.
+# Request: one JSON line {"text": ...}, the same shape Piper's --json-input reads.
+# Reply: zero or more {"pcm": n} lines each followed by n bytes of 16-bit mono PCM,
+# then {"done": true} or {"error": ...}.
+
+
+def _write(stream, message: dict, payload: bytes = b"") -> None:
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    if payload:
+        stream.write(payload)
+    stream.flush()
+
+
+def _pcm_chunks(voice, text: str):
+    if hasattr(voice, "synthesize_stream_raw"):
+        yield from voice.synthesize_stream_raw(text)
+        return
+    for chunk in voice.synthesize(text):
+        yield chunk.audio_int16_bytes
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--cuda", action="store_true")
+    args = parser.parse_args(argv)
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    sys.stdout = sys.stderr
+
+    from piper.voice import PiperVoice
+
+    voice = PiperVoice.load(args.model, use_cuda=args.cuda)
+    _write(stdout, {"ready": True, "sample_rate": voice.config.sample_rate, "sample_width": 2, "channels": 1})
+
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            text = str(json.loads(line).get("text", ""))
+            for pcm in _pcm_chunks(voice, text):
+                if pcm:
+                    _write(stdout, {"pcm": len(pcm)}, pcm)
+            _write(stdout, {"done": True})
+        except Exception as exc:
+            _write(stdout, {"error": str(exc)})
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,20 +1,20 @@
-﻿import json
+﻿import asyncio
 import shutil
+import threading
+import time
 from pathlib import Path
-from urllib import request
-from urllib.error import URLError
+from typing import Awaitable, Callable, Protocol
 
 
-def _check_ollama(base_url: str, model: str) -> tuple[bool, str]:
+class ModelListingClient(Protocol):
+    async def list_models(self, timeout: float = 5.0) -> set[str]: ...
+
+
+async def _acheck_ollama(client: ModelListingClient, model: str) -> tuple[bool, str]:
     try:
-        with request.urlopen(f"{base_url.rstrip('/')}/api/tags", timeout=5.0) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
-    except URLError as exc:
-        return (False, f"unreachable: {exc}")
-    except json.JSONDecodeError:
-        return (False, "invalid JSON from /api/tags")
-
-    names = {item.get("name", "") for item in data.get("models", [])}
+        names = await client.list_models(timeout=5.0)
+    except RuntimeError as exc:
+        return (False, str(exc))
     if model not in names:
         return (False, f"model '{model}' not installed")
     return (True, "ok")
@@ -26,37 +26,103 @@ def _extract_command_binary(command_template: str) -> str:
     return command_template.strip().split()[0].strip('"')
 
 
-def check_runtime_dependencies(
-    ollama_base_url: str,
+def _check_binary(command_template: str) -> tuple[bool, str]:
+    binary = _extract_command_binary(command_template)
+    ok = bool(binary) and shutil.which(binary) is not None
+    return (ok, "ok" if ok else "command not found or template missing")
+
+
+def _check_voice(piper_voice_path: str) -> tuple[bool, str]:
+    ok = bool(piper_voice_path) and Path(piper_voice_path).exists()
+    return (ok, "ok" if ok else "voice file path does not exist")
+
+
+HealthCheck = Callable[[], Awaitable[tuple[bool, str]]]
+
+
+def probe_checks(
+    ollama_client: ModelListingClient,
     ollama_model: str,
     whisper_cmd_template: str,
     piper_cmd_template: str,
     piper_voice_path: str,
-) -> dict:
-    checks: dict[str, dict[str, object]] = {}
+    whisper_worker_cmd: str = "",
+    piper_worker_cmd: str = "",
+) -> dict[str, HealthCheck]:
+    # Filesystem lookups go to a thread so a slow mount cannot stall the event loop or outlive its timeout.
+    return {
+        "ollama": lambda: _acheck_ollama(ollama_client, ollama_model),
+        "whisper": lambda: asyncio.to_thread(_check_binary, whisper_worker_cmd or whisper_cmd_template),
+        "piper": lambda: asyncio.to_thread(_check_binary, piper_worker_cmd or piper_cmd_template),
+        "piper_voice": lambda: asyncio.to_thread(_check_voice, piper_voice_path),
+    }
 
-    ok, detail = _check_ollama(ollama_base_url, ollama_model)
-    checks["ollama"] = {"ok": ok, "detail": detail}
 
-    whisper_bin = _extract_command_binary(whisper_cmd_template)
-    whisper_ok = bool(whisper_bin) and shutil.which(whisper_bin) is not None
-    checks["whisper"] = {
-        "ok": whisper_ok,
-        "detail": "ok" if whisper_ok else "command not found or template missing",
-    }
+class RuntimeHealthProber:
+    # Runs every check concurrently in the background; the endpoint only reads the cached snapshot.
 
-    piper_bin = _extract_command_binary(piper_cmd_template)
-    piper_ok = bool(piper_bin) and shutil.which(piper_bin) is not None
-    checks["piper"] = {
-        "ok": piper_ok,
-        "detail": "ok" if piper_ok else "command not found or template missing",
-    }
+    def __init__(
+        self,
+        checks: dict[str, HealthCheck],
+        interval_seconds: float = 15.0,
+        check_timeout_seconds: float = 3.0,
+    ):
+        self.checks = checks
+        self.interval_seconds = interval_seconds
+        self.check_timeout_seconds = check_timeout_seconds
+        self._lock = threading.Lock()
+        self._results: dict[str, dict] = {}
+        self.last_probe_at: float | None = None
 
-    voice_ok = bool(piper_voice_path) and Path(piper_voice_path).exists()
-    checks["piper_voice"] = {
-        "ok": voice_ok,
-        "detail": "ok" if voice_ok else "voice file path does not exist",
-    }
+    def _set(self, name: str, ok: bool, detail: str, source: str) -> None:
+        with self._lock:
+            self._results[name] = {"ok": ok, "detail": detail, "source": source, "checked_at": time.monotonic()}
+
+    async def _run_check(self, name: str, check: HealthCheck) -> None:
+        try:
+            async with asyncio.timeout(self.check_timeout_seconds):
+                ok, detail = await check()
+        except TimeoutError:
+            ok, detail = False, f"timed out after {self.check_timeout_seconds:g}s"
+        except Exception as exc:
+            ok, detail = False, str(exc)
+        self._set(name, ok, detail, "probe")
+
+    async def probe_once(self) -> None:
+        await asyncio.gather(*(self._run_check(name, check) for name, check in self.checks.items()))
+        self.last_probe_at = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    def report_failure(self, name: str, detail: str) -> None:
+        # Request-path errors show up immediately instead of waiting for the next probe.
+        self._set(name, False, detail, "request")
+
+    def report_success(self, name: str) -> None:
+        # Only clears failures that a request reported; configuration problems found by the probe stay.
+        with self._lock:
+            current = self._results.get(name)
+            if current is None or current["ok"] or current["source"] != "request":
+                return
+        self._set(name, True, "ok", "request")
 
-    overall_ok = all(bool(v["ok"]) for v in checks.values())
-    return {"ok": overall_ok, "checks": checks}
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            checks = {
+                name: {
+                    "ok": result["ok"],
+                    "detail": result["detail"],
+                    "source": result["source"],
+                    "age_seconds": round(now - result["checked_at"], 3),
+                }
+                for name, result in self._results.items()
+            }
+        return {
+            "ok": bool(checks) and all(c["ok"] for c in checks.values()),
+            "checks": checks,
+            "age_seconds": None if self.last_probe_at is None else round(now - self.last_probe_at, 3),
+        }
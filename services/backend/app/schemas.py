@@ -10,6 +10,9 @@ class SessionCreate(BaseModel):
 class SessionCreateResponse(BaseModel):
     session_id: str
     seed: int
+    opening_line: str = ""
+    # Base64 WAV of the opener when it was pre-rendered.
+    opening_audio: str | None = None
 
 
 class SessionReadResponse(BaseModel):
@@ -22,11 +25,31 @@ class SessionReadResponse(BaseModel):
     created_at: datetime
 
 
+class SessionEndResponse(BaseModel):
+    session_id: str
+    durable: bool
+
+
+class TurnRead(BaseModel):
+    turn_index: int
+    speaker: str
+    text: str
+    trust: float | None
+    resistance: float | None
+    created_at: datetime
+
+
+class SessionTurnsResponse(BaseModel):
+    session_id: str
+    turns: list[TurnRead]
+
+
 class DialogueRequest(BaseModel):
     trust: float = Field(ge=0.0, le=1.0)
     resistance: float = Field(ge=0.0, le=1.0)
     trainee_text: str
     primary_objection: str = "busy"
+    session_id: str | None = None
 
 
 class DialogueResponse(BaseModel):
@@ -40,6 +63,40 @@ class ScoringRequest(BaseModel):
     outcomes: dict
 
 
+class SessionScoreRequest(BaseModel):
+    outcomes: dict
+    trainee_id: str = "default"
+
+
+class SessionHistoryItem(BaseModel):
+    session_id: str
+    total_score: int
+    primary_objection: str
+    created_at: datetime
+
+
+class SessionHistoryResponse(BaseModel):
+    items: list[SessionHistoryItem]
+    next_cursor: str | None
+
+
+class ProgressPoint(BaseModel):
+    period_start: str
+    sessions: int
+    total_score: float
+    dimensions: dict[str, float]
+
+
+class ProgressResponse(BaseModel):
+    trainee_id: str
+    period: str
+    points: list[ProgressPoint]
+
+
+class ScoringBatchRequest(BaseModel):
+    items: list[ScoringRequest]
+
+
 class ScoringResponse(BaseModel):
     total_score: int
     dimensions: dict
@@ -1,4 +1,23 @@
 ﻿from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+WEIGHTS = {
+    "opener_clarity": 0.15,
+    "rapport_tone": 0.12,
+    "discovery_depth": 0.18,
+    "objection_handling": 0.16,
+    "value_articulation": 0.14,
+    "close_quality": 0.15,
+    "talk_listen_balance": 0.10,
+}
+
+REPLACEMENT_PHRASING = {
+    "actual": "Can I get 30 seconds?",
+    "stronger": "I called because teams like yours are cutting wasted follow-up time. Worth 30 seconds?",
+}
 
 
 def _clip(score: float) -> int:
@@ -6,33 +25,54 @@ def _clip(score: float) -> int:
 
 
 def score_session(transcript: list[dict], outcomes: dict) -> dict:
-    trainee_turns = [t for t in transcript if t.get("speaker") == "trainee"]
-    trainee_words = sum(len((t.get("text") or "").split()) for t in trainee_turns)
-    total_words = sum(len((t.get("text") or "").split()) for t in transcript) or 1
-    talk_ratio = trainee_words / total_words
+    accumulator = ScoreAccumulator()
+    for turn in transcript:
+        accumulator.add_turn(turn.get("speaker"), turn.get("text"))
+    return accumulator.score(outcomes)
+
+
+@dataclass
+class ScoreAccumulator:
+    # Running counts are all the scorecard needs, so each recorded turn costs O(1).
+    trainee_turns: int = 0
+    trainee_words: int = 0
+    total_words: int = 0
+
+    def add_turn(self, speaker: str | None, text: str | None) -> None:
+        words = len((text or "").split())
+        self.total_words += words
+        if speaker == "trainee":
+            self.trainee_turns += 1
+            self.trainee_words += words
+
+    def score(self, outcomes: dict) -> dict:
+        return _score_from_counts(self.trainee_turns, self.trainee_words, self.total_words, outcomes)
+
+
+def _score_from_counts(trainee_turns: int, trainee_words: int, total_words: int, outcomes: dict) -> dict:
+    talk_ratio = trainee_words / (total_words or 1)
 
     dimensions = {
         "opener_clarity": _clip(65 + (10 if trainee_turns else -20)),
         "rapport_tone": _clip(60 + (5 if talk_ratio <= 0.65 else -10)),
-        "discovery_depth": _clip(50 + min(20, len(trainee_turns) * 3)),
+        "discovery_depth": _clip(50 + min(20, trainee_turns * 3)),
         "objection_handling": _clip(55 + (10 if "objection_resolved" in outcomes else 0)),
         "value_articulation": _clip(58 + (10 if outcomes.get("value_statement") else 0)),
         "close_quality": _clip(50 + (20 if outcomes.get("close_attempt") else -10)),
         "talk_listen_balance": _clip(100 - abs(0.5 - talk_ratio) * 120),
     }
 
-    weights = {
-        "opener_clarity": 0.15,
-        "rapport_tone": 0.12,
-        "discovery_depth": 0.18,
-        "objection_handling": 0.16,
-        "value_articulation": 0.14,
-        "close_quality": 0.15,
-        "talk_listen_balance": 0.10,
+    total_score = _clip(sum(dimensions[k] * w for k, w in WEIGHTS.items()))
+
+    return {
+        "total_score": total_score,
+        "dimensions": dimensions,
+        "misses": _misses(dimensions),
+        "replacement_phrasing": dict(REPLACEMENT_PHRASING),
     }
 
-    total_score = _clip(sum(dimensions[k] * w for k, w in weights.items()))
 
+def _misses(dimensions: dict) -> list[str]:
     misses = []
     if dimensions["discovery_depth"] < 65:
         misses.append("Ask one additional pain-focused discovery question.")
@@ -42,13 +82,76 @@ def score_session(transcript: list[dict], outcomes: dict) -> dict:
         misses.append("Reduce monologue length and invite prospect responses earlier.")
     if not misses:
         misses.append("Solid execution. Next improvement: tighten opener in first 10 seconds.")
+    return misses[:3]
 
-    return {
-        "total_score": total_score,
-        "dimensions": dimensions,
-        "misses": misses[:3],
-        "replacement_phrasing": {
-            "actual": "Can I get 30 seconds?",
-            "stronger": "I called because teams like yours are cutting wasted follow-up time. Worth 30 seconds?",
-        },
+
+def _clip_array(scores: np.ndarray) -> np.ndarray:
+    # np.round rounds half to even like round(), so both paths agree exactly.
+    return np.clip(np.round(scores), 0, 100).astype(np.int64)
+
+
+def score_sessions(sessions: Sequence[tuple[list[dict], dict]]) -> list[dict]:
+    # Same rules as score_session, evaluated over columnar arrays for the whole batch.
+    count = len(sessions)
+    if not count:
+        return []
+    owners: list[int] = []
+    words: list[int] = []
+    is_trainee: list[bool] = []
+    for index, (transcript, _outcomes) in enumerate(sessions):
+        for turn in transcript:
+            owners.append(index)
+            words.append(len((turn.get("text") or "").split()))
+            is_trainee.append(turn.get("speaker") == "trainee")
+    owner = np.asarray(owners, dtype=np.int64)
+    word_count = np.asarray(words, dtype=np.int64)
+    trainee = np.asarray(is_trainee, dtype=bool)
+
+    trainee_turns = np.bincount(owner[trainee], minlength=count)
+    trainee_words = np.bincount(owner[trainee], weights=word_count[trainee], minlength=count)
+    total_words = np.bincount(owner, weights=word_count, minlength=count)
+    talk_ratio = trainee_words / np.where(total_words == 0, 1, total_words)
+
+    objection_resolved = np.array(["objection_resolved" in outcomes for _, outcomes in sessions])
+    value_statement = np.array([bool(outcomes.get("value_statement")) for _, outcomes in sessions])
+    close_attempt = np.array([bool(outcomes.get("close_attempt")) for _, outcomes in sessions])
+
+    dimensions = {
+        "opener_clarity": _clip_array(65 + np.where(trainee_turns > 0, 10, -20)),
+        "rapport_tone": _clip_array(60 + np.where(talk_ratio <= 0.65, 5, -10)),
+        "discovery_depth": _clip_array(50 + np.minimum(20, trainee_turns * 3)),
+        "objection_handling": _clip_array(55 + np.where(objection_resolved, 10, 0)),
+        "value_articulation": _clip_array(58 + np.where(value_statement, 10, 0)),
+        "close_quality": _clip_array(50 + np.where(close_attempt, 20, -10)),
+        "talk_listen_balance": _clip_array(100 - np.abs(0.5 - talk_ratio) * 120),
     }
+
+    # Accumulate in the same order as sum() so floating point totals match bit for bit.
+    weighted = np.zeros(count)
+    for name, weight in WEIGHTS.items():
+        weighted = weighted + dimensions[name] * weight
+    totals = _clip_array(weighted)
+
+    columns = {name: values.tolist() for name, values in dimensions.items()}
+    reports = []
+    for row, total in enumerate(totals.tolist()):
+        row_dimensions = {name: values[row] for name, values in columns.items()}
+        reports.append(
+            {
+                "total_score": total,
+                "dimensions": row_dimensions,
+                "misses": _misses(row_dimensions),
+                "replacement_phrasing": dict(REPLACEMENT_PHRASING),
+            }
+        )
+    return reports
+
+
+def iter_score_sessions(sessions: Iterable[tuple[list[dict], dict]], chunk_size: int = 512) -> Iterator[dict]:
+    chunk: list[tuple[list[dict], dict]] = []
+    for session in sessions:
+        chunk.append(session)
+        if len(chunk) >= chunk_size:
+            yield from score_sessions(chunk)
+            chunk = []
+    yield from score_sessions(chunk)
@@ -0,0 +1,106 @@
+﻿import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Where builds without tmpfs support kept their scratch files.
+DISK_SCRATCH_ROOT = Path(__file__).resolve().parents[1] / "data" / "runtime_io"
+# Older than any real job; younger entries may belong to another process sharing the root.
+STALE_AFTER_SECONDS = 600.0
+
+
+def default_scratch_root() -> Path:
+    # Prefer tmpfs so tool-required paths never touch the disk.
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / "wetpancake-runtime-io"
+    return DISK_SCRATCH_ROOT
+
+
+def _owned_entries(root: Path) -> list[Path]:
+    # Only job dirs and the uuid-named files older builds left behind; the root may be shared.
+    if not root.exists():
+        return []
+    return [
+        entry
+        for entry in root.iterdir()
+        if entry.name.startswith("job-") or entry.name.endswith(("-input.wav", "-input.txt", "-output.wav", "-output.txt"))
+    ]
+
+
+class ScratchArea:
+    def __init__(
+        self,
+        root: Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        stale_after_seconds: float = STALE_AFTER_SECONDS,
+        legacy_root: Path | None = DISK_SCRATCH_ROOT,
+    ):
+        self.root = root or default_scratch_root()
+        self.max_bytes = max_bytes
+        self.stale_after_seconds = stale_after_seconds
+        self.legacy_root = legacy_root
+        self._lock = threading.Lock()
+        self._active: set[Path] = set()
+        self._purged = False
+
+    def usage_bytes(self) -> int:
+        total = 0
+        for entry in _owned_entries(self.root):
+            if entry.is_dir():
+                total += sum(p.stat().st_size for p in entry.rglob("*") if p.is_file())
+            else:
+                total += entry.stat().st_size
+        return total
+
+    def purge(self, root: Path | None = None) -> None:
+        cutoff = time.time() - self.stale_after_seconds
+        for entry in _owned_entries(root or self.root):
+            try:
+                if entry in self._active or entry.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+    def _purge_leftovers(self) -> None:
+        # Once per process: crashed jobs here, plus whatever disk-backed builds left in the old root.
+        self.purge()
+        if self.legacy_root is not None and self.legacy_root.resolve() != self.root.resolve():
+            self.purge(self.legacy_root)
+        self._purged = True
+
+    def purge_leftovers(self) -> None:
+        with self._lock:
+            self._purge_leftovers()
+
+    @contextmanager
+    def job(self) -> Iterator[Path]:
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            if not self._purged:
+                self._purge_leftovers()
+            elif self.usage_bytes() > self.max_bytes:
+                # Leftovers from crashed jobs or older builds count against the cap.
+                self.purge()
+            if self.usage_bytes() > self.max_bytes:
+                raise RuntimeError("runtime_io scratch area is full")
+            job_dir = Path(tempfile.mkdtemp(prefix="job-", dir=self.root))
+            self._active.add(job_dir)
+        try:
+            yield job_dir
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            with self._lock:
+                self._active.discard(job_dir)
+
+
+runtime_scratch = ScratchArea()
@@ -0,0 +1,88 @@
+﻿import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from app.persona import Persona
+
+
+@dataclass(frozen=True)
+class PreparedSession:
+    seed: int
+    persona: Persona
+    opening_line: str
+    # Rendered opener WAV; empty when TTS was unavailable.
+    opening_audio: bytes
+
+
+class SessionPool:
+    # Keeps a few sessions ready so POST /sessions never waits on the LLM or TTS.
+
+    def __init__(
+        self,
+        prepare: Callable[[list[PreparedSession]], Awaitable[PreparedSession]],
+        capacity: int = 3,
+        idle: Callable[[], bool] = lambda: True,
+        poll_seconds: float = 0.5,
+    ):
+        self.prepare = prepare
+        self.capacity = capacity
+        self.idle = idle
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._ready: deque[PreparedSession] = deque()
+        self.produced = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.last_error = ""
+
+    def pending(self) -> list[PreparedSession]:
+        with self._lock:
+            return list(self._ready)
+
+    def take(self, accept: Callable[[PreparedSession], bool]) -> PreparedSession | None:
+        # Sessions prepared earlier may have gone stale against newer history; those are dropped.
+        with self._lock:
+            while self._ready:
+                prepared = self._ready.popleft()
+                if accept(prepared):
+                    self.hits += 1
+                    return prepared
+                self.discarded += 1
+            self.misses += 1
+            return None
+
+    async def fill_once(self) -> bool:
+        if len(self) >= self.capacity or not self.idle():
+            return False
+        try:
+            prepared = await self.prepare(self.pending())
+        except Exception as exc:
+            self.last_error = str(exc)
+            return False
+        with self._lock:
+            self._ready.append(prepared)
+            self.produced += 1
+        return True
+
+    async def run(self) -> None:
+        while True:
+            if not await self.fill_once():
+                await asyncio.sleep(self.poll_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self),
+            "capacity": self.capacity,
+            "produced": self.produced,
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "last_error": self.last_error,
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ready)
@@ -0,0 +1,129 @@
+﻿import re
+import threading
+import zlib
+from dataclasses import asdict, is_dataclass
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import SessionRecord
+
+CATEGORICAL_FIELDS = ("industry", "role", "pain_point", "personality", "urgency", "primary_objection")
+
+
+def _attributes(item: Any) -> Mapping[str, Any]:
+    if is_dataclass(item):
+        return asdict(item)
+    return item
+
+
+class PersonaEncoder:
+    # Cosine similarity of two encodings is
+    #   categorical_weight * (share of matching attributes) + (1 - categorical_weight) * opener n-gram cosine,
+    # so one matrix product scores every candidate against every stored session.
+
+    def __init__(
+        self,
+        vocabularies: Mapping[str, Sequence[str]],
+        ngram_dim: int = 256,
+        ngram: int = 3,
+        categorical_weight: float = 0.6,
+    ):
+        self.fields = [f for f in CATEGORICAL_FIELDS if f in vocabularies]
+        self._offsets: dict[str, dict[str, int]] = {}
+        offset = 0
+        for name in self.fields:
+            self._offsets[name] = {value: offset + i for i, value in enumerate(vocabularies[name])}
+            offset += len(vocabularies[name])
+        self.categorical_dim = offset
+        self.ngram_dim = ngram_dim
+        self.ngram = ngram
+        self.dim = offset + ngram_dim
+        self._categorical_scale = (categorical_weight / len(self.fields)) ** 0.5 if self.fields else 0.0
+        self._text_scale = (1.0 - categorical_weight) ** 0.5
+
+    @classmethod
+    def for_generator(cls, generator: Any, **kwargs) -> "PersonaEncoder":
+        return cls(
+            {
+                "industry": generator.industries,
+                "role": generator.roles,
+                "pain_point": generator.pain_points,
+                "personality": generator.personalities,
+                "urgency": generator.urgencies,
+                "primary_objection": generator.objections,
+            },
+            **kwargs,
+        )
+
+    def _ngram_slots(self, text: str) -> list[int]:
+        normalized = f" {re.sub(r'[^a-z0-9 ]+', '', text.lower()).strip()} "
+        return [
+            zlib.crc32(normalized[i : i + self.ngram].encode("utf-8")) % self.ngram_dim
+            for i in range(len(normalized) - self.ngram + 1)
+        ]
+
+    def encode_batch(self, items: Iterable[Any]) -> np.ndarray:
+        rows = [_attributes(item) for item in items]
+        matrix = np.zeros((len(rows), self.dim), dtype=np.float32)
+        for r, attributes in enumerate(rows):
+            for name in self.fields:
+                slot = self._offsets[name].get(attributes.get(name) or "")
+                if slot is not None:
+                    matrix[r, slot] = self._categorical_scale
+            slots = self._ngram_slots(attributes.get("opening_line") or "")
+            if slots:
+                counts = np.bincount(slots, minlength=self.ngram_dim).astype(np.float32)
+                matrix[r, self.categorical_dim :] = counts * (self._text_scale / np.linalg.norm(counts))
+        return matrix
+
+
+class SimilarityIndex:
+    # Ring buffer of encoded recent sessions; rows beyond `len(self)` are unused.
+
+    def __init__(self, encoder: PersonaEncoder, window: int = 200):
+        self.encoder = encoder
+        self.window = window
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((window, encoder.dim), dtype=np.float32)
+        self._count = 0
+        self._next = 0
+
+    def load(self, db: Session) -> None:
+        rows = db.execute(
+            select(SessionRecord.industry, SessionRecord.role, SessionRecord.primary_objection)
+            .order_by(SessionRecord.created_at.desc())
+            .limit(self.window)
+        ).all()
+        with self._lock:
+            self._count = 0
+            self._next = 0
+        # Stored sessions only carry these attributes; missing fields simply contribute nothing.
+        self.add_many(
+            {"industry": industry, "role": role, "primary_objection": objection}
+            for industry, role, objection in reversed(rows)
+        )
+
+    def add(self, item: Any) -> None:
+        self.add_many([item])
+
+    def add_many(self, items: Iterable[Any]) -> None:
+        encoded = self.encoder.encode_batch(items)
+        with self._lock:
+            for row in encoded:
+                self._matrix[self._next] = row
+                self._next = (self._next + 1) % self.window
+                self._count = min(self._count + 1, self.window)
+
+    def max_similarity(self, candidates: Sequence[Any]) -> np.ndarray:
+        encoded = self.encoder.encode_batch(candidates)
+        with self._lock:
+            if not self._count:
+                return np.zeros(len(encoded), dtype=np.float32)
+            return (encoded @ self._matrix[: self._count].T).max(axis=1)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
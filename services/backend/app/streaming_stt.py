@@ -0,0 +1,108 @@
+﻿from dataclasses import dataclass
+
+from app.audio import pcm16_rms, pcm_to_wav
+from app.stt import STTService
+
+
+@dataclass(frozen=True)
+class VADConfig:
+    sample_rate: int = 16000
+    frame_ms: int = 20
+    energy_threshold: float = 500.0
+    end_of_turn_ms: int = 700
+    min_speech_ms: int = 200
+    partial_interval_ms: int = 800
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.sample_rate * self.frame_ms // 1000 * 2
+
+
+class StreamingTranscriber:
+    # Consumes 16-bit mono PCM frames, tracks speech with an energy VAD and decodes the
+    # current utterance periodically so most STT work overlaps with the trainee talking.
+
+    def __init__(self, stt: STTService, config: VADConfig | None = None):
+        self.stt = stt
+        self.config = config or VADConfig()
+        self._pending = b""
+        self._utterance = bytearray()
+        self._in_speech = False
+        self._speech_ms = 0
+        self._silence_ms = 0
+        self._since_partial_ms = 0
+        self._partial_span_ms = 0
+        self._last_partial = ""
+
+    def _decode(self) -> str:
+        return self.stt.transcribe_chunk(pcm_to_wav(bytes(self._utterance), self.config.sample_rate))
+
+    def _finalize(self, reason: str) -> list[dict]:
+        events: list[dict] = []
+        try:
+            text = self._decode() if self._speech_ms >= self.config.min_speech_ms else ""
+            if text:
+                events.append({"type": "final", "text": text})
+        except RuntimeError as exc:
+            events.append({"type": "error", "stage": "final", "detail": str(exc)})
+        # A failed decode still closes the utterance and the turn, so the client is never left waiting.
+        self._utterance.clear()
+        self._in_speech = False
+        self._speech_ms = self._silence_ms = self._since_partial_ms = self._partial_span_ms = 0
+        self._last_partial = ""
+        return events + [{"type": "end_of_turn", "reason": reason}]
+
+    def feed(self, pcm: bytes) -> list[dict]:
+        cfg = self.config
+        events: list[dict] = []
+        data = self._pending + pcm
+        usable = len(data) - len(data) % cfg.frame_bytes
+        self._pending = data[usable:]
+
+        for offset in range(0, usable, cfg.frame_bytes):
+            frame = data[offset : offset + cfg.frame_bytes]
+            speech = pcm16_rms(frame) >= cfg.energy_threshold
+            if not self._in_speech:
+                if not speech:
+                    continue
+                self._in_speech = True
+                events.append({"type": "speech_start"})
+
+            self._utterance += frame
+            self._since_partial_ms += cfg.frame_ms
+            if speech:
+                self._speech_ms += cfg.frame_ms
+                self._silence_ms = 0
+            else:
+                self._silence_ms += cfg.frame_ms
+                if self._silence_ms >= cfg.end_of_turn_ms:
+                    events.extend(self._finalize("vad"))
+                    continue
+
+        # Each partial re-decodes the whole utterance, so wait at least as long as the last one covered;
+        # the decoded spans then grow geometrically and total partial work stays linear in the utterance.
+        if (
+            self._in_speech
+            and self._speech_ms >= cfg.min_speech_ms
+            and self._since_partial_ms >= max(cfg.partial_interval_ms, self._partial_span_ms)
+        ):
+            self._since_partial_ms = 0
+            self._partial_span_ms = len(self._utterance) // cfg.frame_bytes * cfg.frame_ms
+            try:
+                text = self._decode()
+            except RuntimeError as exc:
+                # A lost partial is cosmetic; keep the events this call already produced.
+                events.append({"type": "error", "stage": "partial", "detail": str(exc)})
+                return events
+            if text and text != self._last_partial:
+                self._last_partial = text
+                events.append({"type": "partial", "text": text})
+        return events
+
+    def flush(self) -> list[dict]:
+        if not self._in_speech:
+            self._pending = b""
+            return [{"type": "end_of_turn", "reason": "flush"}]
+        self._utterance += self._pending
+        self._pending = b""
+        return self._finalize("flush")
@@ -1,9 +1,12 @@
 ﻿import subprocess
-import uuid
-from pathlib import Path
 
-RUNTIME_IO_DIR = Path(__file__).resolve().parents[1] / "data" / "runtime_io"
-RUNTIME_IO_DIR.mkdir(parents=True, exist_ok=True)
+import numpy as np
+
+from app.audio import pcm_to_wav
+from app.audio_ingest import SAMPLE_RATE, pcm16_bytes
+from app.metrics import instrumented
+from app.scratch import ScratchArea, runtime_scratch
+from app.workers import WorkerError, WorkerPool
 
 
 class STTService:
@@ -12,49 +15,102 @@ class STTService:
             return ""
         return "[transcript_pending]"
 
+    def transcribe_pcm(self, samples: np.ndarray) -> str:
+        # Command-line tools need a file, so decoded audio is handed over as the 16 kHz WAV whisper expects.
+        return self.transcribe_chunk(pcm_to_wav(pcm16_bytes(samples), SAMPLE_RATE))
+
 
 class WhisperCliSTTService(STTService):
-    def __init__(self, command_template: str):
+    def __init__(self, command_template: str, scratch: ScratchArea | None = None):
         self.command_template = command_template
+        self.scratch = scratch or runtime_scratch
 
+    def _uses_files(self) -> bool:
+        return any(f"{{{key}}}" in self.command_template for key in ("input_wav", "output_txt", "output_dir"))
+
+    @instrumented("stt", "whisper_cli")
     def transcribe_chunk(self, pcm_bytes: bytes) -> str:
         if not self.command_template:
             raise RuntimeError("Whisper command template is not configured")
         if not pcm_bytes:
             return ""
 
-        token = str(uuid.uuid4())
-        input_wav = RUNTIME_IO_DIR / f"{token}-input.wav"
-        output_txt = RUNTIME_IO_DIR / f"{token}-output.txt"
-        input_wav.write_bytes(pcm_bytes)
-
-        command = self.command_template.format(
-            input_wav=str(input_wav),
-            output_txt=str(output_txt),
-            output_dir=str(RUNTIME_IO_DIR),
-        )
-        proc = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            cwd=RUNTIME_IO_DIR,
-        )
-        if proc.returncode != 0:
-            raise RuntimeError(f"STT command failed: {proc.stderr.strip()}")
-
-        if output_txt.exists():
-            text = output_txt.read_text(encoding="utf-8").strip()
-            if text:
-                return text
-        alt_txt = RUNTIME_IO_DIR / f"{input_wav.stem}.txt"
-        if alt_txt.exists():
-            text = alt_txt.read_text(encoding="utf-8").strip()
-            if text:
-                return text
+        if not self._uses_files():
+            # Pipe mode: audio on stdin, transcript on stdout, nothing on disk.
+            proc = subprocess.run(self.command_template, shell=True, input=pcm_bytes, capture_output=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"STT command failed: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+            stdout_text = proc.stdout.decode("utf-8", errors="replace").strip()
+            if stdout_text:
+                return stdout_text
+            raise RuntimeError("STT command succeeded but returned no transcript")
+
+        with self.scratch.job() as job_dir:
+            input_wav = job_dir / "input.wav"
+            output_txt = job_dir / "output.txt"
+            input_wav.write_bytes(pcm_bytes)
+
+            command = self.command_template.format(
+                input_wav=str(input_wav),
+                output_txt=str(output_txt),
+                output_dir=str(job_dir),
+            )
+            proc = subprocess.run(
+                command,
+                shell=True,
+                capture_output=True,
+                text=True,
+                cwd=job_dir,
+            )
+            if proc.returncode != 0:
+                raise RuntimeError(f"STT command failed: {proc.stderr.strip()}")
+
+            if output_txt.exists():
+                text = output_txt.read_text(encoding="utf-8").strip()
+                if text:
+                    return text
+            alt_txt = job_dir / f"{input_wav.stem}.txt"
+            if alt_txt.exists():
+                text = alt_txt.read_text(encoding="utf-8").strip()
+                if text:
+                    return text
 
         stdout_text = proc.stdout.strip()
         if stdout_text:
             return stdout_text
 
         raise RuntimeError("STT command succeeded but returned no transcript")
+
+
+class WhisperWorkerPoolSTTService(STTService):
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+
+    @instrumented("stt", "whisper_worker")
+    def transcribe_chunk(self, pcm_bytes: bytes) -> str:
+        if not pcm_bytes:
+            return ""
+        return self._run("audio", pcm_bytes)
+
+    @instrumented("stt", "whisper_worker")
+    def transcribe_pcm(self, samples: np.ndarray) -> str:
+        if not len(samples):
+            return ""
+        # Samples go to the worker as raw f32le straight from the decode buffer; it skips its ffmpeg step.
+        return self._run("f32le", memoryview(np.ascontiguousarray(samples, dtype="<f4")).cast("B"))
+
+    def _run(self, fmt: str, payload: bytes | memoryview) -> str:
+        # A crash mid-job gets one retry on a freshly started worker.
+        for attempt in range(2):
+            try:
+                with self.pool.acquire() as worker:
+                    worker.send({"format": fmt, "bytes": len(payload)}, payload)
+                    reply = worker.read_message()
+                break
+            except WorkerError as exc:
+                if attempt:
+                    raise RuntimeError(f"STT worker failed: {exc}") from exc
+
+        if reply.get("error"):
+            raise RuntimeError(f"STT worker failed: {reply['error']}")
+        return str(reply.get("text", "")).strip()
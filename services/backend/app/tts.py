@@ -1,9 +1,44 @@
-﻿import subprocess
-import uuid
+﻿import io
+import subprocess
+import wave
+from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
+from typing import Iterator
 
-RUNTIME_IO_DIR = Path(__file__).resolve().parents[1] / "data" / "runtime_io"
-RUNTIME_IO_DIR.mkdir(parents=True, exist_ok=True)
+from app.audio import pcm_to_wav
+from app.metrics import instrumented
+from app.scratch import ScratchArea, runtime_scratch
+from app.tts_cache import TTSAudioCache, tts_cache_key
+from app.workers import WorkerError, WorkerPool
+
+
+# Frames per chunk when a finished WAV is re-streamed as raw PCM.
+PCM_CHUNK_FRAMES = 4096
+
+
+@dataclass(frozen=True)
+class PCMStream:
+    # 16-bit little-endian PCM chunks at `sample_rate`.
+    sample_rate: int
+    chunks: Iterator[bytes]
+    channels: int = 1
+
+
+def wav_pcm_stream(wav_bytes: bytes) -> PCMStream:
+    try:
+        reader = wave.open(io.BytesIO(wav_bytes), "rb")
+    except (wave.Error, EOFError) as exc:
+        raise RuntimeError(f"TTS backend did not return WAV audio: {exc}") from exc
+    if reader.getsampwidth() != 2:
+        raise RuntimeError(f"TTS backend returned {reader.getsampwidth() * 8}-bit audio; expected 16-bit")
+
+    def _chunks() -> Iterator[bytes]:
+        with reader:
+            while frames := reader.readframes(PCM_CHUNK_FRAMES):
+                yield frames
+
+    return PCMStream(sample_rate=reader.getframerate(), chunks=_chunks(), channels=reader.getnchannels())
 
 
 class TTSService:
@@ -12,12 +47,21 @@ class TTSService:
             return b""
         return text.encode("utf-8")
 
+    def open_pcm_stream(self, text: str) -> PCMStream:
+        # Backends that only produce whole files are re-chunked after synthesis.
+        return wav_pcm_stream(self.synthesize(text))
+
 
 class PiperCliTTSService(TTSService):
-    def __init__(self, command_template: str, voice_path: str):
+    def __init__(self, command_template: str, voice_path: str, scratch: ScratchArea | None = None):
         self.command_template = command_template
         self.voice_path = voice_path
+        self.scratch = scratch or runtime_scratch
+
+    def _uses_files(self) -> bool:
+        return any(f"{{{key}}}" in self.command_template for key in ("input_txt", "output_wav"))
 
+    @instrumented("tts", "piper_cli")
     def synthesize(self, text: str) -> bytes:
         if not text:
             return b""
@@ -28,19 +72,107 @@ class PiperCliTTSService(TTSService):
         if not voice.exists():
             raise RuntimeError("Piper voice file not found")
 
-        token = str(uuid.uuid4())
-        input_txt = RUNTIME_IO_DIR / f"{token}-input.txt"
-        output_wav = RUNTIME_IO_DIR / f"{token}-output.wav"
-        input_txt.write_text(text, encoding="utf-8")
-
-        command = self.command_template.format(
-            voice_path=str(voice),
-            input_txt=str(input_txt),
-            output_wav=str(output_wav),
-        )
-        proc = subprocess.run(command, shell=True, capture_output=True, text=True)
-        if proc.returncode != 0:
-            raise RuntimeError(f"TTS command failed: {proc.stderr.strip()}")
-        if not output_wav.exists():
-            raise RuntimeError("TTS command succeeded but output WAV was not created")
-        return output_wav.read_bytes()
+        if not self._uses_files():
+            # Pipe mode: text on stdin, WAV on stdout, nothing on disk.
+            command = self.command_template.format(voice_path=str(voice))
+            proc = subprocess.run(command, shell=True, input=text.encode("utf-8"), capture_output=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"TTS command failed: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+            if not proc.stdout:
+                raise RuntimeError("TTS command succeeded but returned no audio")
+            return proc.stdout
+
+        with self.scratch.job() as job_dir:
+            input_txt = job_dir / "input.txt"
+            output_wav = job_dir / "output.wav"
+            input_txt.write_text(text, encoding="utf-8")
+
+            command = self.command_template.format(
+                voice_path=str(voice),
+                input_txt=str(input_txt),
+                output_wav=str(output_wav),
+            )
+            proc = subprocess.run(command, shell=True, capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"TTS command failed: {proc.stderr.strip()}")
+            if not output_wav.exists():
+                raise RuntimeError("TTS command succeeded but output WAV was not created")
+            return output_wav.read_bytes()
+
+
+class PiperWorkerTTSService(TTSService):
+    def __init__(self, pool: WorkerPool, sample_rate: int = 22050):
+        self.pool = pool
+        self.sample_rate = sample_rate
+
+    def synthesize_stream(self, text: str) -> Iterator[bytes]:
+        if not text:
+            return
+        try:
+            with self.pool.acquire() as worker:
+                self.sample_rate = int(worker.handshake.get("sample_rate", self.sample_rate))
+                worker.send({"text": text})
+                try:
+                    while True:
+                        message = worker.read_message()
+                        if "pcm" in message:
+                            yield worker.read_exact(int(message["pcm"]))
+                        elif message.get("error"):
+                            raise RuntimeError(f"TTS worker failed: {message['error']}")
+                        else:
+                            return
+                except GeneratorExit:
+                    # Unread frames would desync the next job on this worker, so recycle it.
+                    worker.stop()
+                    raise
+        except WorkerError as exc:
+            raise RuntimeError(f"TTS worker failed: {exc}") from exc
+
+    def open_pcm_stream(self, text: str) -> PCMStream:
+        chunks = self.synthesize_stream(text)
+        # Pulling the first frame acquires a worker, which reports the voice's sample rate for the headers.
+        first = next(chunks, b"")
+        return PCMStream(sample_rate=self.sample_rate, chunks=chain([first], chunks))
+
+    @instrumented("tts", "piper_worker")
+    def synthesize(self, text: str) -> bytes:
+        if not text:
+            return b""
+        pcm = b"".join(self.synthesize_stream(text))
+        return pcm_to_wav(pcm, self.sample_rate)
+
+
+class CachedTTSService(TTSService):
+    def __init__(self, inner: TTSService, cache: TTSAudioCache, voice_path: str = "", params: dict | None = None):
+        self.inner = inner
+        self.cache = cache
+        self.voice_path = voice_path
+        self.params = {"backend": type(inner).__name__, **(params or {})}
+
+    def synthesize(self, text: str) -> bytes:
+        if not text:
+            return b""
+        key = tts_cache_key(self.voice_path, text, self.params)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return audio
+        audio = self.inner.synthesize(text)
+        if audio:
+            self.cache.put(key, audio)
+        return audio
+
+    def open_pcm_stream(self, text: str) -> PCMStream:
+        key = tts_cache_key(self.voice_path, text, self.params)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return wav_pcm_stream(audio)
+        stream = self.inner.open_pcm_stream(text)
+        return PCMStream(stream.sample_rate, self._caching(key, stream), stream.channels)
+
+    def _caching(self, key: str, stream: PCMStream) -> Iterator[bytes]:
+        parts = []
+        for chunk in stream.chunks:
+            parts.append(chunk)
+            yield chunk
+        if any(parts):
+            self.cache.put(key, pcm_to_wav(b"".join(parts), stream.sample_rate, channels=stream.channels))
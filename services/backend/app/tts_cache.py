@@ -0,0 +1,123 @@
+﻿import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "tts_cache"
+
+
+def normalize_tts_text(text: str) -> str:
+    # Only whitespace is folded; case and punctuation change prosody.
+    return " ".join(text.split())
+
+
+def tts_cache_key(voice_path: str, text: str, params: dict) -> str:
+    material = json.dumps([voice_path, normalize_tts_text(text), params], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        disk_dir: Path | None = DEFAULT_CACHE_DIR,
+        disk_budget_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_dir = disk_dir
+        self.disk_budget_bytes = disk_budget_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.disk_dir.glob("*.wav"))
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.wav"
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        if len(audio) > self.memory_budget_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                audio = path.read_bytes()
+            except FileNotFoundError:
+                audio = None
+            if audio:
+                with self._lock:
+                    self._remember(key, audio)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes) -> None:
+        with self._lock:
+            self._remember(key, audio)
+        if self.disk_dir is None:
+            return
+
+        path = self._disk_path(key)
+        if path.exists():
+            return
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_bytes += len(audio)
+            if self._disk_bytes > self.disk_budget_bytes:
+                self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        files = sorted(self.disk_dir.glob("*.wav"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            if self._disk_bytes <= self.disk_budget_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._disk_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,140 @@
+﻿import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.metrics import timed_stage
+from app.models import TurnRecord
+
+# Logged as the last row of an ended session so a rebuilt conversation stays ended.
+SESSION_END_SPEAKER = "session_end"
+
+
+@dataclass(frozen=True)
+class TurnEntry:
+    session_id: str
+    turn_index: int
+    speaker: str
+    text: str
+    trust: float | None = None
+    resistance: float | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class _Barrier:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class TurnLogWriter:
+    # Turns are queued on the request path and group-committed by one background thread,
+    # so a turn never waits on SQLite. flush() is the durability point.
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 64,
+        flush_interval_seconds: float = 0.25,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_error = ""
+        # Set when a batch was dropped since the last barrier; that barrier must not report durability.
+        self._lost_since_barrier = False
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="turn-log-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, entry: TurnEntry) -> None:
+        self._ensure_started()
+        self._queue.put_nowait(entry)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        self._ensure_started()
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        return barrier.done.wait(timeout) and barrier.ok
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def _write(self, entries: list[TurnEntry], durable: bool) -> None:
+        with timed_stage("db_turn_log"), self.session_factory() as db:
+            if entries:
+                db.execute(
+                    insert(TurnRecord),
+                    [
+                        {
+                            "session_id": e.session_id,
+                            "turn_index": e.turn_index,
+                            "speaker": e.speaker,
+                            "text": e.text,
+                            "trust": e.trust,
+                            "resistance": e.resistance,
+                            "created_at": e.created_at,
+                        }
+                        for e in entries
+                    ],
+                )
+                db.commit()
+            if durable:
+                # synchronous=NORMAL defers the WAL fsync; a checkpoint makes every commit so far durable.
+                db.execute(text("PRAGMA wal_checkpoint(FULL)"))
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch: list[TurnEntry] = []
+            barriers: list[_Barrier] = []
+            item = first
+            while True:
+                if isinstance(item, _Barrier):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=0 if barriers else self.flush_interval_seconds)
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch, durable=bool(barriers))
+                if batch:
+                    self.batches += 1
+                    self.rows += len(batch)
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = str(exc)
+                self._lost_since_barrier = True
+            if barriers:
+                for barrier in barriers:
+                    barrier.ok = not self._lost_since_barrier
+                    barrier.done.set()
+                self._lost_since_barrier = False
@@ -0,0 +1,82 @@
+﻿import asyncio
+import threading
+import time
+from typing import Awaitable, Callable
+
+
+class Warmup:
+    def __init__(self, steps: dict[str, Callable[[], Awaitable[str | None]]]):
+        self.steps = steps
+        self._lock = threading.Lock()
+        self.started = False
+        self.finished = False
+        self._status: dict[str, dict] = {
+            name: {"ready": False, "detail": "pending", "seconds": None} for name in steps
+        }
+
+    async def run(self) -> None:
+        self.started = True
+        for name, step in self.steps.items():
+            started = time.perf_counter()
+            try:
+                detail = await step() or "ok"
+                ready = True
+            except Exception as exc:
+                detail = str(exc)
+                ready = False
+            with self._lock:
+                self._status[name] = {
+                    "ready": ready,
+                    "detail": detail,
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+        self.finished = True
+
+    def report(self) -> dict:
+        with self._lock:
+            components = {name: dict(status) for name, status in self._status.items()}
+        return {
+            "ready": self.finished and all(c["ready"] for c in components.values()),
+            "started": self.started,
+            "finished": self.finished,
+            "components": components,
+        }
+
+
+class KeepAlive:
+    def __init__(
+        self,
+        refresh: Callable[[], Awaitable[None]],
+        interval_seconds: float,
+        active_window_seconds: float,
+    ):
+        self.refresh = refresh
+        self.interval_seconds = interval_seconds
+        self.active_window_seconds = active_window_seconds
+        self._last_activity: float | None = None
+        self.refreshes = 0
+        self.last_error = ""
+
+    def touch(self) -> None:
+        self._last_activity = time.monotonic()
+
+    def active(self) -> bool:
+        return (
+            self._last_activity is not None
+            and time.monotonic() - self._last_activity <= self.active_window_seconds
+        )
+
+    async def tick(self) -> None:
+        if not self.active():
+            return
+        try:
+            await self.refresh()
+            self.refreshes += 1
+            self.last_error = ""
+        except RuntimeError as exc:
+            self.last_error = str(exc)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.tick()
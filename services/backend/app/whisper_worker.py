@@ -0,0 +1,83 @@
+﻿import argparse
+import json
+import subprocess
+import sys
+
+# Resident STT worker: loads the model once, then serves jobs over stdin/stdout.
+# Request: one JSON header line {"format": "audio" | "f32le", "bytes": n} followed by n raw bytes.
+# Reply: one JSON line {"text": ...} or {"error": ...}.
+
+
+def _write(stream, message: dict) -> None:
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def _decode(data: bytes, fmt: str):
+    import numpy as np
+
+    if fmt == "f32le":
+        return np.frombuffer(data, dtype=np.float32)
+    proc = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", "16000", "pipe:1"],
+        input=data,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def _load_transcriber(backend: str, model_name: str, language: str, device: str):
+    if backend == "faster-whisper":
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(model_name, device=device)
+
+        def _transcribe(audio) -> str:
+            segments, _ = model.transcribe(audio, language=language)
+            return "".join(segment.text for segment in segments)
+
+        return _transcribe
+
+    import whisper
+
+    model = whisper.load_model(model_name, device=device if device != "auto" else None)
+
+    def _transcribe(audio) -> str:
+        return model.transcribe(audio, language=language, fp16=False, verbose=None)["text"]
+
+    return _transcribe
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["whisper", "faster-whisper"], default="whisper")
+    parser.add_argument("--model", default="base.en")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--device", default="auto")
+    args = parser.parse_args(argv)
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # Anything the model libraries print must not corrupt the protocol stream.
+    sys.stdout = sys.stderr
+
+    transcribe = _load_transcriber(args.backend, args.model, args.language, args.device)
+    _write(stdout, {"ready": True, "model": args.model})
+
+    for line in stdin:
+        if not line.strip():
+            continue
+        header = json.loads(line)
+        payload = stdin.read(int(header.get("bytes", 0)))
+        try:
+            audio = _decode(payload, header.get("format", "audio"))
+            _write(stdout, {"text": transcribe(audio).strip()})
+        except Exception as exc:
+            _write(stdout, {"error": str(exc)})
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+﻿import json
+import os
+import shlex
+import subprocess
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue
+from typing import Iterator
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+def _split_command(command: str) -> list[str] | str:
+    # CreateProcess parses the raw string on Windows; elsewhere we need argv.
+    if os.name == "nt":
+        return command
+    return shlex.split(command)
+
+
+class ResidentWorker:
+    def __init__(self, command: str, cwd: Path = BACKEND_DIR):
+        self.command = command
+        self.cwd = cwd
+        self.process: subprocess.Popen | None = None
+        self.handshake: dict = {}
+        self.restarts = 0
+        self._stderr_tail: deque[str] = deque(maxlen=20)
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_started(self) -> None:
+        if self.alive():
+            return
+        if self.process is not None:
+            self.restarts += 1
+        try:
+            self.process = subprocess.Popen(
+                _split_command(self.command),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.cwd,
+            )
+            threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+            # Workers announce readiness with one JSON line once their model is loaded.
+            self.handshake = self.read_message()
+        except (OSError, ValueError) as exc:
+            # A missing binary or malformed command is a worker failure like any other, so callers can report it.
+            raise WorkerError(f"worker failed to start: {exc}") from exc
+
+    def _drain_stderr(self, process: subprocess.Popen) -> None:
+        for line in process.stderr:
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _crashed(self, reason: str) -> WorkerError:
+        tail = " | ".join(list(self._stderr_tail)[-3:])
+        return WorkerError(f"{reason}: {tail}" if tail else reason)
+
+    def send(self, header: dict, payload: bytes | memoryview = b"") -> None:
+        if self.process is None:
+            raise WorkerError("worker is not running")
+        try:
+            self.process.stdin.write(json.dumps(header).encode("utf-8") + b"\n")
+            if payload:
+                self.process.stdin.write(payload)
+            self.process.stdin.flush()
+        except OSError as exc:
+            raise self._crashed(f"worker pipe closed ({exc})") from exc
+
+    def read_message(self) -> dict:
+        line = self.process.stdout.readline() if self.process is not None else b""
+        if not line:
+            raise self._crashed("worker exited")
+        try:
+            return json.loads(line.decode("utf-8"))
+        except json.JSONDecodeError as exc:
+            raise self._crashed("worker wrote invalid JSON") from exc
+
+    def read_exact(self, size: int) -> bytes:
+        data = self.process.stdout.read(size) if self.process is not None else b""
+        if len(data) != size:
+            raise self._crashed("worker exited mid-frame")
+        return data
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class WorkerPool:
+    def __init__(self, command: str, size: int = 1, cwd: Path = BACKEND_DIR):
+        self.workers = [ResidentWorker(command, cwd=cwd) for _ in range(max(1, size))]
+        self._idle: Queue[ResidentWorker] = Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._busy = 0
+
+    def start(self) -> None:
+        for worker in self.workers:
+            worker.ensure_started()
+
+    @contextmanager
+    def acquire(self) -> Iterator[ResidentWorker]:
+        with self._lock:
+            self._waiting += 1
+        worker = self._idle.get()
+        with self._lock:
+            self._waiting -= 1
+            self._busy += 1
+        try:
+            worker.ensure_started()
+            yield worker
+        except WorkerError:
+            # Protocol state is unknown after a crash; kill it so the next job gets a fresh process.
+            worker.stop()
+            raise
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._idle.put(worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self.workers),
+                "alive": sum(1 for w in self.workers if w.alive()),
+                "busy": self._busy,
+                "queue_depth": self._waiting,
+                "restarts": sum(w.restarts for w in self.workers),
+            }
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.stop()
@@ -0,0 +1,107 @@
+﻿import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "I only have a minute. Tell me quickly why this matters to my team right now."
+
+
+class FakeOllamaServer:
+    # Stands in for Ollama's /api/generate and /api/tags with a fixed first-token delay and token rate.
+
+    def __init__(self, tokens_per_second: float = 40.0, first_token_ms: float = 150.0, port: int = 0):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_ms = first_token_ms
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args) -> None:
+                return None
+
+            def _send_json(self, payload: dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "fake:latest"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                if not body.get("prompt"):
+                    # Preload request: the model is "loaded" immediately.
+                    self._send_json({"done": True})
+                    return
+                tokens = [word + " " for word in REPLY.split()]
+                interval = 1.0 / server.tokens_per_second
+                time.sleep(server.first_token_ms / 1000.0)
+                if not body.get("stream", True):
+                    time.sleep(interval * (len(tokens) - 1))
+                    self._send_json({"response": REPLY, "done": True, "context": [1, 2, 3]})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for index, token in enumerate(tokens):
+                    if index:
+                        time.sleep(interval)
+                    self._write_chunk({"response": token, "done": False})
+                self._write_chunk({"response": "", "done": True, "context": [1, 2, 3]})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, payload: dict) -> None:
+                line = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--first-token-ms", type=float, default=150.0)
+    args = parser.parse_args()
+    server = FakeOllamaServer(args.tokens_per_second, args.first_token_ms, args.port).start()
+    print(f"fake ollama listening on {server.base_url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
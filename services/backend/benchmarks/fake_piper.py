@@ -0,0 +1,23 @@
+﻿import argparse
+import sys
+import time
+
+from app.audio import pcm_to_wav
+
+
+def main() -> None:
+    # Pipe-mode piper stand-in: text on stdin, WAV on stdout, delay proportional to the text length.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="")
+    parser.add_argument("--delay-ms-per-char", type=float, default=2.0)
+    parser.add_argument("--sample-rate", type=int, default=22050)
+    args = parser.parse_args()
+    text = sys.stdin.buffer.read().decode("utf-8")
+    time.sleep(len(text) * args.delay_ms_per_char / 1000.0)
+    # Roughly 60 ms of silence per character, like real speech output.
+    samples = int(args.sample_rate * 0.06 * len(text))
+    sys.stdout.buffer.write(pcm_to_wav(b"\x00\x00" * samples, args.sample_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+﻿import argparse
+import sys
+import time
+
+
+def main() -> None:
+    # Pipe-mode whisper stand-in: audio on stdin, transcript on stdout.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    audio = sys.stdin.buffer.read()
+    time.sleep(args.delay_ms / 1000.0)
+    sys.stdout.write(f"Hi, this is Sam from Acme, do you have a minute? ({len(audio)} bytes)\n")
+
+
+if __name__ == "__main__":
+    main()
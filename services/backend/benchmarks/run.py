@@ -0,0 +1,205 @@
+﻿import argparse
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+from uuid import uuid4
+
+import httpx
+import numpy as np
+import uvicorn
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    values = np.asarray(samples_ms)
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def _timed(fn: Callable[[], object], iterations: int, warmup: int = 2) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _configure_environment(args: argparse.Namespace, ollama_url: str, workdir: Path) -> None:
+    # Must run before app.main is imported: the app wires its adapters from the environment at import time.
+    python = shlex.quote(sys.executable)
+    voice = workdir / "fake-voice.onnx"
+    voice.write_bytes(b"fake")
+    os.environ.update(
+        {
+            "DATABASE_PATH": str(workdir / "bench.db"),
+            "OLLAMA_BASE_URL": ollama_url,
+            "OLLAMA_MODEL": "fake:latest",
+            "WHISPER_WORKER_CMD": "",
+            "WHISPER_CMD_TEMPLATE": f"{python} -m benchmarks.fake_whisper --delay-ms {args.stt_delay_ms}",
+            "PIPER_WORKER_CMD": "",
+            "PIPER_CMD_TEMPLATE": (
+                f"{python} -m benchmarks.fake_piper --model {{voice_path}} "
+                f"--delay-ms-per-char {args.tts_ms_per_char}"
+            ),
+            "PIPER_VOICE_PATH": str(voice),
+            "TTS_CACHE_MB": "0",
+            "WARMUP_ENABLED": "0",
+            "SESSION_POOL_SIZE": "0",
+        }
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app, port: int) -> uvicorn.Server:
+    # A real server, so streamed frames reach the client as they are produced.
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def run(args: argparse.Namespace) -> dict:
+    ollama = FakeOllamaServer(args.tokens_per_second, args.first_token_ms).start()
+    workdir = Path(tempfile.mkdtemp(prefix="wetpancake-bench-"))
+    _configure_environment(args, ollama.base_url, workdir)
+
+    import app.main as main_module
+    from app.audio import pcm_to_wav
+    from app.stt import STTService
+    from app.turn_log import TurnEntry
+
+    audio = pcm_to_wav(b"\x00\x00" * 16000 * 3, 16000)
+    files = {"audio": ("turn.wav", audio, "audio/wav")}
+    stages: dict[str, list[float]] = {}
+    port = _free_port()
+    server = _serve(main_module.app, port)
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60.0) as client:
+        session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+        turn_body = {"trust": 0.4, "resistance": 0.6, "trainee_text": "Do you have a minute?", "session_id": session_id}
+
+        real_stt = main_module.stt_service
+        main_module.stt_service = STTService()
+        stages["upload"] = _timed(lambda: client.post("/stt/transcribe", files=files), args.iterations)
+        main_module.stt_service = real_stt
+
+        stages["stt"] = _timed(lambda: real_stt.transcribe_chunk(audio), args.iterations)
+        stages["dialogue"] = _timed(lambda: client.post("/dialogue/turn", json=turn_body), args.iterations)
+        stages["tts"] = _timed(
+            lambda: main_module.tts_service.synthesize("I only have a minute, so tell me quickly."),
+            args.iterations,
+        )
+
+        def _db_commit() -> None:
+            main_module.turn_log.record(TurnEntry(session_id, 0, "trainee", "benchmark"))
+            main_module.turn_log.flush()
+
+        stages["db_commit"] = _timed(_db_commit, args.iterations)
+
+        first_audio: list[float] = []
+
+        def _full_turn() -> None:
+            started = time.perf_counter()
+            text = client.post("/stt/transcribe", files=files).json()["text"]
+            with client.stream("POST", "/dialogue/turn/speech", json={**turn_body, "trainee_text": text}) as resp:
+                seen_audio = False
+                for line in resp.iter_lines():
+                    if not seen_audio and json.loads(line)["type"] == "audio":
+                        first_audio.append((time.perf_counter() - started) * 1000.0)
+                        seen_audio = True
+
+        stages["full_turn"] = _timed(_full_turn, args.iterations)
+        stages["first_audio"] = first_audio[-args.iterations :]
+
+    server.should_exit = True
+    ollama.stop()
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "iterations": args.iterations,
+            "tokens_per_second": args.tokens_per_second,
+            "first_token_ms": args.first_token_ms,
+            "stt_delay_ms": args.stt_delay_ms,
+            "tts_ms_per_char": args.tts_ms_per_char,
+        },
+        "stages": {name: _percentiles(samples) for name, samples in stages.items()},
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before and stats["p95_ms"] > before["p95_ms"] * (1.0 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} ms -> {stats['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmarks against fake model runtimes")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--first-token-ms", type=float, default=150.0)
+    parser.add_argument("--stt-delay-ms", type=float, default=300.0)
+    parser.add_argument("--tts-ms-per-char", type=float, default=2.0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier results file to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    results = run(args)
+    output = args.output or RESULTS_DIR / f"{results['timestamp'][:19].replace(':', '')}-{uuid4().hex[:6]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    for name, stats in results["stages"].items():
+        print(f"{name:12} p50={stats['p50_ms']:8.1f}  p95={stats['p95_ms']:8.1f}  p99={stats['p99_ms']:8.1f} ms")
+    print(f"results written to {output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
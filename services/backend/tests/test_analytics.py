@@ -0,0 +1,94 @@
+﻿from datetime import datetime, timezone
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.main as main_module
+from app.analytics import history_page, progress, record_score
+from app.db import SessionLocal
+from app.models import ScoreRecord
+
+
+def _report(total: int) -> dict:
+    return {"total_score": total, "dimensions": {"close_quality": total - 5, "rapport_tone": total + 5}}
+
+
+def test_rollups_update_incrementally_and_history_pages_by_keyset():
+    trainee = f"trainee-{uuid4()}"
+    with SessionLocal() as db:
+        record_score(db, "s-a-" + trainee, trainee, _report(60), "busy", datetime(2026, 3, 2, 9, tzinfo=timezone.utc))
+        record_score(db, "s-b-" + trainee, trainee, _report(80), "busy", datetime(2026, 3, 4, 9, tzinfo=timezone.utc))
+        record_score(db, "s-c-" + trainee, trainee, _report(50), "no_budget", datetime(2026, 3, 10, 9, tzinfo=timezone.utc))
+        # Rescoring a session replaces its contribution instead of double counting it.
+        record_score(db, "s-c-" + trainee, trainee, _report(70), "no_budget", datetime(2026, 3, 10, 9, tzinfo=timezone.utc))
+
+        weeks = progress(db, trainee, "week", limit=12)
+        first_page, cursor = history_page(db, trainee, limit=2)
+        second_page, last_cursor = history_page(db, trainee, limit=2, cursor=cursor)
+        plan = db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT session_id, total_score, primary_objection, created_at "
+                "FROM scores WHERE trainee_id = :t ORDER BY created_at DESC"
+            ),
+            {"t": trainee},
+        ).all()
+
+    assert [(w["period_start"], w["sessions"], w["total_score"]) for w in weeks] == [
+        ("2026-03-02", 2, 70.0),
+        ("2026-03-09", 1, 70.0),
+    ]
+    assert weeks[0]["dimensions"] == {"close_quality": 65.0, "rapport_tone": 75.0}
+    assert [item["total_score"] for item in first_page + second_page] == [70, 80, 60]
+    assert last_cursor is None
+    assert "COVERING INDEX ix_scores_trainee_history" in " ".join(str(row) for row in plan)
+
+
+def test_final_session_score_is_persisted_for_trainee():
+    client = TestClient(main_module.app)
+    trainee = f"trainee-{uuid4()}"
+    created = client.post("/sessions", json={"duration_minutes": 8}).json()
+
+    client.post(f"/sessions/{created['session_id']}/score", json={"outcomes": {}, "trainee_id": trainee})
+    history = client.get(f"/trainees/{trainee}/sessions").json()
+    days = client.get(f"/trainees/{trainee}/progress", params={"period": "day"}).json()
+
+    assert [item["session_id"] for item in history["items"]] == [created["session_id"]]
+    assert days["points"][0]["sessions"] == 1
+
+
+def test_progress_skips_emptied_periods_when_applying_the_limit():
+    trainee = f"trainee-{uuid4()}"
+    with SessionLocal() as db:
+        record_score(db, "s-a-" + trainee, trainee, _report(60), "busy", datetime(2026, 3, 2, 9, tzinfo=timezone.utc))
+        record_score(db, "s-b-" + trainee, trainee, _report(80), "busy", datetime(2026, 3, 9, 9, tzinfo=timezone.utc))
+        # Rescoring moves the session into a later week and leaves a zero-session bucket behind.
+        record_score(db, "s-b-" + trainee, trainee, _report(80), "busy", datetime(2026, 3, 16, 9, tzinfo=timezone.utc))
+
+        weeks = progress(db, trainee, "week", limit=2)
+
+    assert [w["period_start"] for w in weeks] == ["2026-03-02", "2026-03-16"]
+
+
+def test_concurrent_score_for_the_same_session_replaces_instead_of_failing():
+    trainee = f"trainee-{uuid4()}"
+    session_id = "s-race-" + trainee
+    scored_at = datetime(2026, 4, 6, 9, tzinfo=timezone.utc)
+    with SessionLocal() as db:
+        record_score(db, session_id, trainee, _report(60), "busy", scored_at)
+    with SessionLocal() as db:
+        real_get = db.get
+        lookups = []
+
+        def _racing_get(model, key):
+            # The first lookup misses the row another request just committed.
+            lookups.append(key)
+            return None if len(lookups) == 1 else real_get(model, key)
+
+        db.get = _racing_get
+        record_score(db, session_id, trainee, _report(80), "busy", scored_at)
+        weeks = progress(db, trainee, "week")
+        stored = real_get(ScoreRecord, session_id)
+
+    assert stored.total_score == 80
+    assert [(w["sessions"], w["total_score"]) for w in weeks] == [(1, 80.0)]
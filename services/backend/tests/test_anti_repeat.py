@@ -0,0 +1,26 @@
+﻿from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+
+import app.main as main_module
+from app.anti_repeat import AntiRepeatIndex
+from app.db import engine
+
+
+def test_anti_repeat_index_keeps_rolling_window_newest_first():
+    index = AntiRepeatIndex(window=2)
+    index.add(seed=1, industry="saas", role="owner", primary_objection="busy")
+    index.add(seed=2, industry="saas", role="owner", primary_objection="no_budget")
+    index.add(seed=3, industry="saas", role="owner", primary_objection="send_email")
+
+    assert [s["primary_objection"] for s in index.recent_sessions()] == ["send_email", "no_budget"]
+    assert not index.seed_used(1)
+    assert index.seed_used(3)
+
+
+def test_created_session_updates_anti_repeat_index():
+    client = TestClient(main_module.app)
+    created = client.post("/sessions", json={"duration_minutes": 8}).json()
+
+    assert main_module.anti_repeat.recent_sessions()[0]["seed"] == created["seed"]
+    indexed = {ix["name"] for ix in inspect(engine).get_indexes("sessions")}
+    assert "ix_sessions_created_at" in indexed
@@ -0,0 +1,68 @@
+﻿import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.audio import pcm_to_wav
+from app.audio_ingest import SAMPLE_RATE, AudioTooLong, LinearResampler, decode_upload
+
+
+def _sine_wav(seconds: float, rate: int, channels: int = 1) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 16000).astype("<i2")
+    return pcm_to_wav(np.repeat(tone, channels).tobytes(), rate, channels=channels)
+
+
+def test_stereo_48k_wav_decodes_to_16k_mono_float32():
+    samples = decode_upload(io.BytesIO(_sine_wav(1.0, 48000, channels=2)), "audio/wav")
+
+    assert samples.dtype == np.float32
+    assert abs(len(samples) - SAMPLE_RATE) <= 1
+    expected = np.sin(2 * np.pi * 440 * np.arange(len(samples)) / SAMPLE_RATE) * 16000 / 32768
+    assert np.max(np.abs(samples - expected)) < 0.01
+
+
+def test_chunked_resampling_matches_single_pass():
+    signal = np.random.default_rng(1).standard_normal(44100).astype(np.float32)
+    whole = LinearResampler(44100).process(signal)
+    chunked = LinearResampler(44100)
+    pieces = [chunked.process(signal[i : i + 1000]) for i in range(0, len(signal), 1000)]
+
+    np.testing.assert_allclose(np.concatenate(pieces), whole, atol=1e-6)
+
+
+def test_decode_buffer_is_reused_between_uploads():
+    first = decode_upload(io.BytesIO(_sine_wav(0.5, SAMPLE_RATE)))
+    second = decode_upload(io.BytesIO(_sine_wav(0.25, SAMPLE_RATE)))
+
+    assert len(second) == SAMPLE_RATE // 4
+    assert np.shares_memory(first, second)
+
+
+def test_long_uploads_are_bounded_and_unknown_formats_pass_through():
+    with pytest.raises(AudioTooLong):
+        decode_upload(io.BytesIO(_sine_wav(2.0, SAMPLE_RATE)), max_seconds=1.0)
+
+    opaque = io.BytesIO(b"RIFFFAKEWAV")
+    assert decode_upload(opaque, "audio/wav") is None
+    assert opaque.read() == b"RIFFFAKEWAV"
+
+
+def test_transcribe_endpoint_hands_decoded_samples_to_stt(monkeypatch):
+    class _PCMSTT:
+        def transcribe_pcm(self, samples: np.ndarray) -> str:
+            return f"{len(samples)} {samples.dtype}"
+
+    monkeypatch.setattr(main_module, "stt_service", _PCMSTT())
+    client = TestClient(main_module.app)
+
+    resp = client.post("/stt/transcribe", files={"audio": ("turn.wav", _sine_wav(0.5, 8000), "audio/wav")})
+    monkeypatch.setattr(main_module, "STT_MAX_SECONDS", 0.1)
+    too_long = client.post("/stt/transcribe", files={"audio": ("turn.wav", _sine_wav(0.5, 8000), "audio/wav")})
+
+    count, dtype = resp.json()["text"].split()
+    assert abs(int(count) - SAMPLE_RATE // 2) <= 1 and dtype == "float32"
+    assert "audio_decode;dur=" in resp.headers["Server-Timing"]
+    assert too_long.status_code == 413
@@ -0,0 +1,105 @@
+﻿import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.dialogue import AsyncOllamaClient
+from app.llm_scheduler import LLMScheduler, Priority, ScheduledLLMClient
+from app.metrics import fallbacks_total
+
+
+class _FlakyLLM:
+    def __init__(self):
+        self.up = False
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        if not self.up:
+            raise RuntimeError("ollama down")
+        return "Who is this?"
+
+    async def preload(self) -> None:
+        if not self.up:
+            raise RuntimeError("ollama down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_after_probe():
+    llm = _FlakyLLM()
+    breaker = CircuitBreaker(probe=llm.preload, failure_threshold=2)
+    client = ScheduledLLMClient(llm, LLMScheduler(), Priority.LIVE, 1.0, breaker=breaker)
+
+    async def _call() -> str:
+        try:
+            return await client.generate("prompt")
+        except RuntimeError as exc:
+            return type(exc).__name__
+
+    async def _run():
+        results = [await _call() for _ in range(3)]
+        await breaker.tick()
+        failed_probe = breaker.is_open()
+        llm.up = True
+        await breaker.tick()
+        results.append(await _call())
+        return results, failed_probe
+
+    results, failed_probe = asyncio.run(_run())
+    assert results == ["RuntimeError", "RuntimeError", "CircuitOpenError", "Who is this?"]
+    assert failed_probe
+    assert llm.calls == 3
+    assert breaker.stats()["trips"] == 1 and breaker.stats()["probes"] == 2
+    assert not breaker.is_open()
+
+
+def test_open_circuit_short_circuits_dialogue_turns(monkeypatch):
+    llm = _FlakyLLM()
+    breaker = CircuitBreaker(probe=llm.preload, failure_threshold=1)
+    breaker.record_failure("ollama down")
+    monkeypatch.setattr(main_module, "ollama_client", llm)
+    monkeypatch.setattr(main_module, "llm_breaker", breaker)
+    client = TestClient(main_module.app)
+    before = fallbacks_total.value(stage=CircuitOpenError.fallback_stage, endpoint="/dialogue/turn")
+
+    resp = client.post("/dialogue/turn", json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi"})
+
+    assert resp.status_code == 200
+    assert resp.json()["text"]
+    assert llm.calls == 0
+    assert fallbacks_total.value(stage=CircuitOpenError.fallback_stage, endpoint="/dialogue/turn") == before + 1
+    assert client.get("/runtime/health").json()["llm_breaker"]["open"] is True
+
+
+class _SlowFirstToken(httpx.AsyncByteStream):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.delay)
+        yield b'{"response": "OK", "done": true}\n'
+
+
+def test_probe_keeps_breaker_open_while_first_token_is_slow():
+    delay = [0.5]
+    client = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=_SlowFirstToken(delay[0]))),
+        first_token_timeout_seconds=0.05,
+    )
+    breaker = CircuitBreaker(probe=client.probe, failure_threshold=1)
+    breaker.record_failure("no token within 50 ms")
+
+    async def _run():
+        await breaker.tick()
+        still_open = breaker.is_open()
+        delay[0] = 0.0
+        await breaker.tick()
+        await client.aclose()
+        return still_open
+
+    assert asyncio.run(_run())
+    assert "no token within 50 ms" in breaker.stats()["last_error"]
+    assert not breaker.is_open()
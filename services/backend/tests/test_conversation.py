@@ -0,0 +1,85 @@
+﻿from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.conversation import ConversationStore
+from app.dialogue import ProspectState
+
+
+class _ContextLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, prompt: str, timeout=None, context=None, on_context=None) -> str:
+        self.calls.append({"prompt": prompt, "context": context})
+        if on_context is not None:
+            on_context([len(self.calls)] * 3)
+        return f"reply {len(self.calls)}"
+
+
+def test_dialogue_turns_reuse_server_side_context(monkeypatch):
+    llm = _ContextLLM()
+    monkeypatch.setattr(main_module, "ollama_client", llm)
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+
+    first = client.post(
+        "/dialogue/turn",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi, quick one.", "session_id": session_id},
+    ).json()
+    client.post(
+        "/dialogue/turn",
+        json={"trust": 0.0, "resistance": 1.0, "trainee_text": "Can I explain?", "session_id": session_id},
+    )
+
+    assert llm.calls[0]["context"] is None
+    assert "realistic B2B cold call prospect" in llm.calls[0]["prompt"]
+    assert llm.calls[1]["context"] == [1, 1, 1]
+    assert "realistic B2B cold call prospect" not in llm.calls[1]["prompt"]
+    # The client-sent state is ignored once the server owns the conversation.
+    assert f"Trust={first['trust'] - 0.05:.2f}" in llm.calls[1]["prompt"]
+
+    conversation = main_module.conversations.get(session_id)
+    assert [speaker for speaker, _ in conversation.history] == ["prospect"] + ["trainee", "prospect"] * 2
+
+
+def test_evicted_session_is_rebuilt_from_the_turn_log(monkeypatch):
+    llm = _ContextLLM()
+    monkeypatch.setattr(main_module, "ollama_client", llm)
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    turn = {"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi, quick one.", "session_id": session_id}
+    first = client.post("/dialogue/turn", json=turn).json()
+
+    with main_module.conversations._lock:
+        main_module.conversations._items.pop(session_id)
+    client.post("/dialogue/turn", json={**turn, "trainee_text": "Can I explain?"})
+    client.post(f"/sessions/{session_id}/end")
+    turns = client.get(f"/sessions/{session_id}/turns").json()["turns"]
+
+    # The cached context died with the evicted conversation, so the model gets the call replayed.
+    assert llm.calls[1]["context"] is None
+    assert "Earlier in this call" in llm.calls[1]["prompt"]
+    assert f"Trust={first['trust'] - 0.05:.2f}" in llm.calls[1]["prompt"]
+    assert [t["turn_index"] for t in turns] == [0, 1, 2, 3, 4]
+
+
+def test_turns_for_unknown_sessions_are_rejected():
+    client = TestClient(main_module.app)
+
+    response = client.post(
+        "/dialogue/turn",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hello?", "session_id": "missing"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_fallback_replies_are_replayed_to_the_model_next_turn():
+    store = ConversationStore()
+    conversation = store.get_or_create("s1", objection="busy", state=ProspectState(0.4, 0.6))
+    conversation.accept_context([7, 8])
+    conversation.record_turn("Hello", "Who is this?", ProspectState(0.5, 0.6))
+    conversation.record_turn("It's Sam", "I am listening, but keep it short.", ProspectState(0.45, 0.6))
+
+    assert conversation.context == [7, 8]
+    assert conversation.unsynced == [("trainee", "It's Sam"), ("prospect", "I am listening, but keep it short.")]
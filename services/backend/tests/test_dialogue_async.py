@@ -0,0 +1,118 @@
+﻿import asyncio
+import json
+
+import httpx
+
+from app.dialogue import AsyncOllamaClient, ProspectState, agenerate_prospect_turn
+from app.runtime_health import probe_checks
+
+
+def _client(handler) -> AsyncOllamaClient:
+    return AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def test_async_client_reuses_pooled_client_for_turns_and_health():
+    seen = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": "mistral:7b"}]})
+        assert json.loads(request.content)["stream"] is False
+        return httpx.Response(200, json={"response": " Who is this? "})
+
+    client = _client(_handler)
+
+    async def _run():
+        turn = await agenerate_prospect_turn(
+            state=ProspectState(trust=0.4, resistance=0.6),
+            trainee_text="Can I get 30 seconds?",
+            persona={"primary_objection": "busy"},
+            llm_client=client,
+        )
+        pooled = client._http
+        checks = probe_checks(
+            ollama_client=client,
+            ollama_model="mistral:7b",
+            whisper_cmd_template="",
+            piper_cmd_template="",
+            piper_voice_path="",
+        )
+        health = await checks["ollama"]()
+        assert client._http is pooled
+        await client.aclose()
+        return turn, health
+
+    turn, health = asyncio.run(_run())
+    assert turn.text == "Who is this?"
+    assert health == (True, "ok")
+    assert seen == ["/api/generate", "/api/tags"]
+
+
+def test_async_client_raises_runtime_error_on_http_failure():
+    client = _client(lambda request: httpx.Response(500, json={"error": "boom"}))
+
+    async def _run():
+        try:
+            await client.generate("prompt")
+        except RuntimeError as exc:
+            return str(exc)
+        finally:
+            await client.aclose()
+
+    assert "Ollama request failed" in asyncio.run(_run())
+
+
+class _SlowStream(httpx.AsyncByteStream):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.delay)
+        yield b'{"response": "Late.", "done": true}\n'
+
+
+def test_first_token_budget_abandons_stalled_generation():
+    def _handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, stream=_SlowStream(0.5))
+
+    client = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(_handler),
+        first_token_timeout_seconds=0.05,
+    )
+
+    async def _run():
+        try:
+            await client.generate("prompt")
+        except RuntimeError as exc:
+            return str(exc)
+        finally:
+            await client.aclose()
+
+    assert "no token within 50 ms" in asyncio.run(_run())
+
+
+def test_first_token_budget_does_not_cut_off_a_started_reply():
+    def _handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b'{"response": "Who "}\n{"response": "is this?", "done": true}\n')
+
+    client = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(_handler),
+        first_token_timeout_seconds=0.05,
+    )
+
+    async def _run():
+        text = await client.generate("prompt")
+        await client.aclose()
+        return text
+
+    assert asyncio.run(_run()) == "Who is this?"
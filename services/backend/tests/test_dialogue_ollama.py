@@ -1,46 +1,29 @@
-﻿from unittest.mock import patch
+﻿import asyncio
 
+import httpx
 import pytest
 
-from app.dialogue import OllamaClient
+from app.dialogue import AsyncOllamaClient
 
 
-def test_ollama_client_parses_response_text():
-    client = OllamaClient(base_url="http://127.0.0.1:11434", model="mistral:7b")
-
-    class _Resp:
-        status = 200
+def _client(payload: bytes) -> AsyncOllamaClient:
+    return AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=payload)),
+    )
 
-        def read(self):
-            return b'{"response":"prospect reply"}'
 
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc, tb):
-            return False
+def test_ollama_client_parses_response_text():
+    client = _client(b'{"response":"prospect reply"}')
 
-    with patch("urllib.request.urlopen", return_value=_Resp()):
-        out = client.generate("prompt")
+    out = asyncio.run(client.generate("prompt"))
 
     assert out == "prospect reply"
 
 
 def test_ollama_client_raises_on_bad_payload():
-    client = OllamaClient(base_url="http://127.0.0.1:11434", model="mistral:7b")
-
-    class _Resp:
-        status = 200
-
-        def read(self):
-            return b'{"not_response":"x"}'
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc, tb):
-            return False
+    client = _client(b'{"not_response":"x"}')
 
-    with patch("urllib.request.urlopen", return_value=_Resp()):
-        with pytest.raises(RuntimeError, match="missing 'response'"):
-            client.generate("prompt")
+    with pytest.raises(RuntimeError, match="missing 'response'"):
+        asyncio.run(client.generate("prompt"))
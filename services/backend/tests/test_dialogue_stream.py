@@ -0,0 +1,66 @@
+﻿import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.dialogue import AsyncOllamaClient
+import app.main as main_module
+
+
+def test_ollama_client_streams_tokens_until_done():
+    body = (
+        b'{"response":"Who","done":false}\n'
+        b'{"response":" is this?","done":false}\n'
+        b'{"response":"","done":true}\n'
+    )
+    client = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)),
+    )
+
+    async def _collect():
+        return [token async for token in client.generate_stream("prompt")]
+
+    assert asyncio.run(_collect()) == ["Who", " is this?"]
+
+
+async def _tokens(*tokens: str):
+    for token in tokens:
+        yield token
+
+
+def test_dialogue_stream_endpoint_sends_state_first_then_tokens(monkeypatch):
+    client = TestClient(main_module.app)
+    monkeypatch.setattr(main_module.ollama_client, "generate_stream", lambda _prompt: _tokens("Go", " ahead."))
+
+    response = client.post(
+        "/dialogue/turn/stream",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Can I get 30 seconds?"},
+    )
+
+    assert response.status_code == 200
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0]["type"] == "state"
+    assert frames[0]["trust"] == 0.5
+    assert [f["text"] for f in frames if f["type"] == "token"] == ["Go", " ahead."]
+    assert frames[-1] == {"type": "done", "text": "Go ahead."}
+
+
+def test_dialogue_stream_endpoint_falls_back_when_ollama_unavailable(monkeypatch):
+    client = TestClient(main_module.app)
+
+    async def _raise(_prompt: str):
+        raise RuntimeError("llm unavailable")
+        yield ""
+
+    monkeypatch.setattr(main_module.ollama_client, "generate_stream", _raise)
+
+    response = client.post(
+        "/dialogue/turn/stream",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Can I get 30 seconds?"},
+    )
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[-1]["text"] == "I have a minute. What exactly are you offering?"
@@ -0,0 +1,78 @@
+﻿from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.main as main_module
+from app.db import SessionLocal
+from app.dialogue import ProspectState
+from app.models import ScoreRecord
+from app.scoring import ScoreAccumulator, score_session
+
+
+def test_accumulator_matches_full_transcript_scoring():
+    transcript = [
+        {"speaker": "prospect", "text": "Who is this?"},
+        {"speaker": "trainee", "text": "Sam from Acme, we cut reporting time in half."},
+        {"speaker": "prospect", "text": "We already have a vendor."},
+    ]
+    accumulator = ScoreAccumulator()
+    for turn in transcript:
+        accumulator.add_turn(turn["speaker"], turn["text"])
+
+    assert accumulator.score({"close_attempt": True}) == score_session(transcript, {"close_attempt": True})
+
+
+def test_live_and_final_scores_come_from_recorded_turns():
+    client = TestClient(main_module.app)
+    created = client.post("/sessions", json={"duration_minutes": 8}).json()
+    conversation = main_module.conversations.get(created["session_id"])
+    conversation.record_turn("Hi, it's Sam from Acme.", "Not interested.", ProspectState(0.4, 0.6))
+    transcript = [{"speaker": speaker, "text": text} for speaker, text in conversation.history]
+
+    live = client.get(f"/sessions/{created['session_id']}/score/live", params={"close_attempt": "true"})
+    final = client.post(f"/sessions/{created['session_id']}/score", json={"outcomes": {"close_attempt": True}})
+
+    assert live.json() == score_session(transcript, {"close_attempt": True})
+    assert final.json() == live.json()
+    assert client.get("/sessions/missing/score/live").status_code == 404
+
+
+def test_final_score_survives_eviction_after_lookup(monkeypatch):
+    client = TestClient(main_module.app)
+    created = client.post("/sessions", json={"duration_minutes": 8}).json()
+    conversation = main_module.conversations.get(created["session_id"])
+    lookups = iter([conversation])
+    monkeypatch.setattr(main_module.conversations, "get", lambda _session_id: next(lookups, None))
+
+    final = client.post(f"/sessions/{created['session_id']}/score", json={"outcomes": {}})
+
+    assert final.status_code == 200
+
+
+def _evict(session_id: str) -> None:
+    with main_module.conversations._lock:
+        main_module.conversations._items.pop(session_id)
+
+
+def test_score_endpoints_rebuild_evicted_conversations(monkeypatch):
+    class _LLM:
+        async def generate(self, prompt: str, timeout=None, context=None, on_context=None) -> str:
+            return "Not interested."
+
+    monkeypatch.setattr(main_module, "ollama_client", _LLM())
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    client.post(
+        "/dialogue/turn",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "We cut reporting time in half.", "session_id": session_id},
+    )
+    before = client.get(f"/sessions/{session_id}/score/live").json()
+
+    _evict(session_id)
+    live = client.get(f"/sessions/{session_id}/score/live")
+    _evict(session_id)
+    final = client.post(f"/sessions/{session_id}/score", json={"outcomes": {}})
+
+    assert live.json() == before
+    assert final.json() == before
+    with SessionLocal() as db:
+        assert db.scalar(select(ScoreRecord).where(ScoreRecord.session_id == session_id)) is not None
@@ -0,0 +1,134 @@
+﻿import asyncio
+
+from app.conversation import Conversation
+from app.dialogue import ProspectState, agenerate_prospect_turn, astream_prospect_turn
+from app.llm_cache import LLMResponseCache, normalize_trainee_text
+
+
+class _CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        return f"reply {self.calls}"
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        self.calls += 1
+        for token in ("streamed ", f"reply {self.calls}"):
+            yield token
+
+
+def test_normalization_drops_fillers_and_punctuation():
+    assert normalize_trainee_text("Um, so... can I get 30 seconds?") == "can i get 30 seconds"
+    assert normalize_trainee_text("Can I get 30 seconds") == "can i get 30 seconds"
+
+
+def test_keys_bucket_nearby_states_together():
+    cache = LLMResponseCache(bucket_step=0.1)
+    assert cache.key("busy", 0.41, 0.59, "Hi there") == cache.key("busy", 0.39, 0.61, "uh, hi there!")
+    assert cache.key("busy", 0.4, 0.6, "Hi there") != cache.key("price", 0.4, 0.6, "Hi there")
+    assert cache.key("busy", 0.4, 0.6, "Hi there") != cache.key("busy", 0.7, 0.6, "Hi there")
+
+
+def test_seed_selects_variant_slot():
+    cache = LLMResponseCache(variants=2)
+    key = cache.key("busy", 0.4, 0.6, "hello")
+    cache.put(key, seed=0, text="first")
+    assert cache.get(key, seed=2) == "first"
+    assert cache.get(key, seed=1) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_entries_expire_and_evict_least_recent(monkeypatch):
+    cache = LLMResponseCache(max_entries=2, variants=1, ttl_seconds=10.0)
+    now = [100.0]
+    monkeypatch.setattr("app.llm_cache.time.monotonic", lambda: now[0])
+    a, b, c = (cache.key("busy", 0.4, 0.6, text) for text in ("a", "b", "c"))
+    cache.put(a, 0, "A")
+    cache.put(b, 0, "B")
+    assert cache.get(a, 0) == "A"
+    cache.put(c, 0, "C")
+    assert cache.get(b, 0) is None
+    assert cache.get(a, 0) == "A"
+
+    now[0] = 200.0
+    assert cache.get(c, 0) is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_opening_turns_are_served_from_cache():
+    cache = LLMResponseCache(variants=1)
+    client = _CountingClient()
+    state = ProspectState(trust=0.4, resistance=0.6)
+
+    async def _run():
+        first = await agenerate_prospect_turn(
+            state, "Um, can I get 30 seconds?", {"primary_objection": "busy"}, llm_client=client, cache=cache
+        )
+        second = await agenerate_prospect_turn(
+            state, "can I get 30 seconds", {"primary_objection": "busy"}, llm_client=client, cache=cache
+        )
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert first.text == second.text == "reply 1"
+    assert client.calls == 1
+
+
+def test_streamed_reply_is_cached_after_completion():
+    cache = LLMResponseCache(variants=1)
+    client = _CountingClient()
+    state = ProspectState(trust=0.4, resistance=0.6)
+
+    async def _collect():
+        turn = astream_prospect_turn(state, "hello", {"primary_objection": "busy"}, llm_client=client, cache=cache)
+        return "".join([token async for token in turn.tokens])
+
+    assert asyncio.run(_collect()) == "streamed reply 1"
+    assert asyncio.run(_collect()) == "streamed reply 1"
+    assert client.calls == 1
+
+
+def test_turns_after_the_opening_exchange_bypass_cache():
+    cache = LLMResponseCache(variants=1)
+    client = _CountingClient()
+    conversation = Conversation(session_id="s", objection="busy", state=ProspectState(0.4, 0.6))
+    conversation.record_turn("hello", "who is this?", ProspectState(0.4, 0.6))
+
+    async def _run():
+        for _ in range(2):
+            await agenerate_prospect_turn(
+                conversation.state, "hello", {"primary_objection": "busy"}, llm_client=client, cache=cache
+            )
+            await agenerate_prospect_turn(
+                conversation.state,
+                "hello",
+                {"primary_objection": "busy"},
+                llm_client=client,
+                conversation=conversation,
+                cache=cache,
+            )
+
+    asyncio.run(_run())
+    assert client.calls == 3
+
+
+def test_sessions_with_different_openers_do_not_share_replies():
+    cache = LLMResponseCache(variants=1)
+    client = _CountingClient()
+    state = ProspectState(trust=0.4, resistance=0.6)
+
+    async def _run(opener: str):
+        conversation = Conversation(session_id=opener, objection="busy", state=state)
+        conversation.open_with(opener)
+        turn = await agenerate_prospect_turn(
+            state, "hello", {"primary_objection": "busy"}, llm_client=client, conversation=conversation, cache=cache
+        )
+        return turn.text
+
+    assert asyncio.run(_run("Hello?")) == "reply 1"
+    assert asyncio.run(_run("Dana speaking, make it quick.")) == "reply 2"
+    assert asyncio.run(_run("Hello?")) == "reply 1"
+    assert client.calls == 2
@@ -0,0 +1,97 @@
+﻿import asyncio
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.llm_scheduler import LLMRequestShed, LLMScheduler, Priority, ScheduledLLMClient
+from app.metrics import collect_timings, fallbacks_total
+
+
+class _GatedLLM:
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.order: list[str] = []
+        self.running = 0
+        self.peak = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.gate.wait()
+            self.order.append(prompt)
+            return prompt
+        finally:
+            self.running -= 1
+
+
+def test_limit_is_enforced_and_live_work_overtakes_background():
+    async def _run():
+        scheduler = LLMScheduler(max_concurrency=1)
+        llm = _GatedLLM()
+        background = ScheduledLLMClient(llm, scheduler, Priority.BACKGROUND, 5.0)
+        live = ScheduledLLMClient(llm, scheduler, Priority.LIVE, 5.0)
+
+        first = asyncio.create_task(background.generate("bg-1"))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(background.generate("bg-2")), asyncio.create_task(live.generate("live"))]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 2
+        llm.gate.set()
+        await asyncio.gather(first, *queued)
+        return llm, scheduler
+
+    llm, scheduler = asyncio.run(_run())
+    assert llm.order == ["bg-1", "live", "bg-2"]
+    assert llm.peak == 1
+    assert scheduler.active == 0 and scheduler.idle()
+    assert scheduler.stats()["admitted"] == {"live": 1, "background": 2, "batch": 0}
+
+
+def test_expired_requests_are_shed_and_queue_wait_is_recorded():
+    async def _run():
+        scheduler = LLMScheduler(max_concurrency=1)
+        llm = _GatedLLM()
+        slow = asyncio.create_task(ScheduledLLMClient(llm, scheduler, Priority.BATCH, 5.0).generate("batch"))
+        await asyncio.sleep(0)
+        live = ScheduledLLMClient(llm, scheduler, Priority.LIVE, 0.01)
+        try:
+            await live.generate("late")
+        except LLMRequestShed:
+            shed = True
+        else:
+            shed = False
+
+        with collect_timings() as timings:
+            waiting = asyncio.create_task(ScheduledLLMClient(llm, scheduler, Priority.LIVE, 5.0).generate("next"))
+            await asyncio.sleep(0.01)
+            llm.gate.set()
+            await asyncio.gather(slow, waiting)
+        return shed, scheduler, timings
+
+    shed, scheduler, timings = asyncio.run(_run())
+    assert shed
+    assert scheduler.stats()["shed"]["live"] == 1
+    assert scheduler.active == 0
+    assert [stage for stage, _ in timings] == ["llm_queue"]
+    assert timings[0][1] >= 0.01
+
+
+def test_shed_dialogue_turn_falls_back_without_marking_ollama_down(monkeypatch):
+    class _SaturatedLLM:
+        async def generate(self, prompt: str, **kwargs) -> str:
+            raise LLMRequestShed("LLM request shed: live deadline passed in queue")
+
+    reported = []
+    monkeypatch.setattr(main_module, "ollama_client", _SaturatedLLM())
+    monkeypatch.setattr(main_module.health_prober, "report_failure", lambda *args: reported.append(args))
+    client = TestClient(main_module.app)
+    before = fallbacks_total.value(stage="llm_shed", endpoint="/dialogue/turn")
+
+    resp = client.post("/dialogue/turn", json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi"})
+
+    assert resp.status_code == 200
+    assert resp.json()["text"]
+    assert fallbacks_total.value(stage="llm_shed", endpoint="/dialogue/turn") == before + 1
+    assert reported == []
+    assert "llm_scheduler" in client.get("/runtime/health").json()
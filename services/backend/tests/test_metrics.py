@@ -0,0 +1,38 @@
+﻿from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.metrics import fallbacks_total, stage_seconds, timed_stage
+
+
+def test_dialogue_fallback_is_counted_and_exposed_on_metrics(monkeypatch):
+    class _DownLLM:
+        async def generate(self, prompt: str, **kwargs) -> str:
+            raise RuntimeError("ollama down")
+
+    monkeypatch.setattr(main_module, "ollama_client", _DownLLM())
+    client = TestClient(main_module.app)
+    before = fallbacks_total.value(stage="llm", endpoint="/dialogue/turn")
+
+    resp = client.post("/dialogue/turn", json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi"})
+    body = client.get("/metrics").text
+
+    assert resp.headers["Server-Timing"].startswith("total;dur=")
+    assert fallbacks_total.value(stage="llm", endpoint="/dialogue/turn") == before + 1
+    assert 'wetpancake_http_request_seconds_count{method="POST",route="/dialogue/turn",status="200"}' in body
+    assert "wetpancake_llm_in_flight" in body
+
+
+def test_stage_timings_reach_server_timing_header(monkeypatch):
+    class _SlowSTT:
+        def transcribe_chunk(self, pcm_bytes: bytes) -> str:
+            with timed_stage("stt"):
+                return "hello"
+
+    monkeypatch.setattr(main_module, "stt_service", _SlowSTT())
+    client = TestClient(main_module.app)
+    before = stage_seconds.count(stage="stt")
+
+    resp = client.post("/stt/transcribe", files={"audio": ("turn.wav", b"RIFF", "audio/wav")})
+
+    assert "stt;dur=" in resp.headers["Server-Timing"]
+    assert stage_seconds.count(stage="stt") == before + 1
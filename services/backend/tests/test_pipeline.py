@@ -0,0 +1,98 @@
+﻿import asyncio
+import base64
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.dialogue import AsyncOllamaClient
+from app.llm_scheduler import LLMScheduler, Priority, ScheduledLLMClient
+from app.pipeline import asplit_sentences, pipeline_speech
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(aiterable):
+    return [item async for item in aiterable]
+
+
+def test_split_sentences_emits_each_sentence_as_tokens_arrive():
+    tokens = ["Look", ", I", " am busy.", " What do", " you want?"]
+    assert asyncio.run(_collect(asplit_sentences(_aiter(tokens)))) == ["Look, I am busy.", "What do you want?"]
+
+
+def test_pipeline_speech_keeps_sentence_order():
+    sentences = _aiter(["One.", "Two.", "Three."])
+    out = asyncio.run(_collect(pipeline_speech(sentences, lambda s: s.encode("utf-8"))))
+    assert out == [("One.", b"One."), ("Two.", b"Two."), ("Three.", b"Three.")]
+
+
+def test_dialogue_speech_endpoint_streams_audio_per_sentence(monkeypatch):
+    client = TestClient(main_module.app)
+    monkeypatch.setattr(
+        main_module.ollama_client, "generate_stream", lambda _prompt: _aiter(["Sure.", " Who is", " this?"])
+    )
+    monkeypatch.setattr(main_module.tts_service, "synthesize", lambda text: b"WAV:" + text.encode())
+
+    response = client.post(
+        "/dialogue/turn/speech",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Can I get 30 seconds?"},
+    )
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0]["type"] == "state"
+    audio = [f for f in frames if f["type"] == "audio"]
+    assert [base64.b64decode(f["audio"]) for f in audio] == [b"WAV:Sure.", b"WAV:Who is this?"]
+    assert frames[-1] == {"type": "done", "text": "Sure. Who is this?"}
+
+
+def test_slow_tts_does_not_trip_llm_timeout_or_leak_scheduler_slot():
+    lines = b"".join(json.dumps({"response": f"Sentence {i}. "}).encode() + b"\n" for i in range(12))
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=lines + b'{"response": "", "done": true}\n')
+
+    def _slow_synthesize(text: str) -> bytes:
+        time.sleep(0.06)
+        return text.encode("utf-8")
+
+    ollama = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        timeout_seconds=0.3,
+        transport=httpx.MockTransport(_handler),
+    )
+    scheduler = LLMScheduler(max_concurrency=1)
+    llm = ScheduledLLMClient(ollama, scheduler, Priority.LIVE, 1.0)
+
+    async def _run():
+        sentences = asplit_sentences(llm.generate_stream("prompt"))
+        spoken = await asyncio.wait_for(_collect(pipeline_speech(sentences, _slow_synthesize, max_pending=2)), 10)
+        await ollama.aclose()
+        return spoken
+
+    spoken = asyncio.run(_run())
+    assert [text for text, _ in spoken] == [f"Sentence {i}." for i in range(12)]
+    assert scheduler.stats()["active"] == 0
+    assert ollama.in_flight == 0
+
+
+def test_pipeline_reports_producer_failure_instead_of_hanging():
+    async def _failing():
+        yield "One."
+        raise RuntimeError("llm died")
+
+    async def _run():
+        spoken = []
+        try:
+            async for item in pipeline_speech(_failing(), lambda s: s.encode("utf-8")):
+                spoken.append(item)
+        except RuntimeError as exc:
+            return spoken, str(exc)
+
+    assert asyncio.run(asyncio.wait_for(_run(), 5)) == ([("One.", b"One.")], "llm died")
@@ -1,17 +1,66 @@
-﻿from unittest.mock import patch
+﻿import asyncio
 
-from app.runtime_health import check_runtime_dependencies
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.runtime_health import RuntimeHealthProber, probe_checks
 
 
 def test_runtime_health_reports_unavailable_dependencies():
-    with patch("app.runtime_health._check_ollama", return_value=(False, "down")):
-        report = check_runtime_dependencies(
-            ollama_base_url="http://127.0.0.1:11434",
-            ollama_model="mistral:7b",
-            whisper_cmd_template="",
-            piper_cmd_template="",
-            piper_voice_path="",
-        )
+    class _DownOllama:
+        async def list_models(self, timeout: float = 5.0) -> set[str]:
+            raise RuntimeError("down")
+
+    checks = probe_checks(
+        ollama_client=_DownOllama(),
+        ollama_model="mistral:7b",
+        whisper_cmd_template="",
+        piper_cmd_template="",
+        piper_voice_path="",
+    )
+    prober = RuntimeHealthProber(checks)
+    asyncio.run(prober.probe_once())
 
+    report = prober.snapshot()
     assert report["ok"] is False
     assert report["checks"]["ollama"]["ok"] is False
+    assert report["checks"]["ollama"]["detail"] == "down"
+
+
+def test_prober_times_out_slow_checks_and_takes_request_failures():
+    async def _ok():
+        return (True, "ok")
+
+    async def _hang():
+        await asyncio.sleep(10)
+        return (True, "ok")
+
+    prober = RuntimeHealthProber({"whisper": _ok, "ollama": _hang}, check_timeout_seconds=0.05)
+    asyncio.run(prober.probe_once())
+
+    snapshot = prober.snapshot()
+    assert snapshot["checks"]["whisper"]["ok"] is True
+    assert snapshot["checks"]["ollama"] == {
+        "ok": False,
+        "detail": "timed out after 0.05s",
+        "source": "probe",
+        "age_seconds": snapshot["checks"]["ollama"]["age_seconds"],
+    }
+
+    prober.report_failure("whisper", "STT command failed")
+    assert prober.snapshot()["checks"]["whisper"]["ok"] is False
+    prober.report_success("whisper")
+    assert prober.snapshot()["checks"]["whisper"]["ok"] is True
+    # A success on the request path does not hide a failure the probe found.
+    prober.report_success("ollama")
+    assert prober.snapshot()["checks"]["ollama"]["ok"] is False
+
+
+def test_runtime_health_endpoint_serves_cached_snapshot():
+    client = TestClient(main_module.app)
+
+    first = client.get("/runtime/health").json()
+    second = client.get("/runtime/health").json()
+
+    assert set(first["checks"]) == {"ollama", "whisper", "piper", "piper_voice"}
+    assert second["age_seconds"] >= first["age_seconds"]
@@ -0,0 +1,35 @@
+﻿import json
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.scoring import score_session, score_sessions
+
+SESSIONS = [
+    ([{"speaker": "trainee", "text": "Can I get 30 seconds?"}], {"close_attempt": True}),
+    ([], {}),
+    (
+        [
+            {"speaker": "prospect", "text": "Who is this?"},
+            {"speaker": "trainee", "text": "It's Sam from Acme, we cut reporting time in half."},
+            {"speaker": "prospect", "text": None},
+        ],
+        {"value_statement": True, "objection_resolved": False},
+    ),
+]
+
+
+def test_score_sessions_matches_single_transcript_path():
+    assert score_sessions(SESSIONS) == [score_session(t, o) for t, o in SESSIONS]
+
+
+def test_score_batch_endpoint_streams_one_line_per_transcript():
+    client = TestClient(main_module.app)
+    resp = client.post(
+        "/sessions/score/batch",
+        json={"items": [{"transcript": t, "outcomes": o} for t, o in SESSIONS]},
+    )
+
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line.pop("index") for line in lines] == [0, 1, 2]
+    assert lines == [score_session(t, o) for t, o in SESSIONS]
@@ -0,0 +1,88 @@
+﻿import os
+from pathlib import Path
+from unittest.mock import patch
+import time
+import uuid
+
+import pytest
+
+from app.scratch import ScratchArea
+from app.tts import PiperCliTTSService
+
+
+def _scratch(max_bytes: int = 1024, legacy_root: Path | None = None) -> ScratchArea:
+    return ScratchArea(root=Path(".runtime_test") / str(uuid.uuid4()), max_bytes=max_bytes, legacy_root=legacy_root)
+
+
+def _leftover(root: Path, name: str, age_seconds: float) -> Path:
+    entry = root / name
+    entry.mkdir(parents=True)
+    stamp = time.time() - age_seconds
+    os.utime(entry, (stamp, stamp))
+    return entry
+
+
+def test_scratch_job_directory_is_removed_after_use():
+    scratch = _scratch()
+    with scratch.job() as job_dir:
+        (job_dir / "input.wav").write_bytes(b"RIFF")
+        assert scratch.usage_bytes() == 4
+    assert not job_dir.exists()
+    assert scratch.usage_bytes() == 0
+
+
+def test_scratch_rejects_jobs_over_size_cap():
+    scratch = _scratch(max_bytes=2)
+    with scratch.job() as job_dir:
+        (job_dir / "big.wav").write_bytes(b"RIFFWAVE")
+        with pytest.raises(RuntimeError, match="scratch area is full"):
+            with scratch.job():
+                pass
+
+
+def test_scratch_purge_spares_recent_jobs_from_other_processes():
+    scratch = _scratch()
+    stale = _leftover(scratch.root, "job-crashed", age_seconds=3600)
+    in_flight = _leftover(scratch.root, "job-other-process", age_seconds=5)
+
+    with scratch.job():
+        pass
+
+    assert not stale.exists()
+    assert in_flight.exists()
+
+
+def test_scratch_purges_legacy_disk_root_once_on_startup():
+    legacy = Path(".runtime_test") / str(uuid.uuid4())
+    scratch = _scratch(legacy_root=legacy)
+    old = _leftover(legacy, "job-old-build", age_seconds=3600)
+
+    scratch.purge_leftovers()
+
+    assert not old.exists()
+    with scratch.job():
+        pass
+    again = _leftover(legacy, "job-later", age_seconds=3600)
+    with scratch.job():
+        pass
+    assert again.exists()
+
+
+def test_tts_cli_pipe_mode_uses_stdin_and_stdout():
+    scratch = _scratch()
+    voice = scratch.root / "voice.onnx"
+    voice.parent.mkdir(parents=True, exist_ok=True)
+    voice.write_text("voice", encoding="utf-8")
+    svc = PiperCliTTSService('piper --model "{voice_path}"', str(voice), scratch=scratch)
+
+    class _Proc:
+        returncode = 0
+        stdout = b"WAVDATA"
+        stderr = b""
+
+    with patch("subprocess.run", return_value=_Proc()) as run:
+        out = svc.synthesize("hello")
+
+    assert out == b"WAVDATA"
+    assert run.call_args.kwargs["input"] == b"hello"
+    assert [p.name for p in scratch.root.iterdir()] == ["voice.onnx"]
@@ -0,0 +1,73 @@
+﻿import asyncio
+import base64
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.persona import PersonaGenerator
+from app.session_pool import PreparedSession, SessionPool
+
+
+def _prepared(seed: int) -> PreparedSession:
+    persona = PersonaGenerator().generate(seed=seed, recent_sessions=[])
+    return PreparedSession(seed=seed, persona=persona, opening_line=persona.opening_line, opening_audio=b"RIFF")
+
+
+def test_pool_fills_to_capacity_only_when_idle_and_drops_stale_entries():
+    idle = {"value": False}
+
+    async def _prepare(pending):
+        return _prepared(len(pending) + 1)
+
+    pool = SessionPool(_prepare, capacity=2, idle=lambda: idle["value"])
+
+    async def _fill():
+        results = [await pool.fill_once()]
+        idle["value"] = True
+        results += [await pool.fill_once() for _ in range(3)]
+        return results
+
+    assert asyncio.run(_fill()) == [False, True, True, False]
+    taken = pool.take(lambda prepared: prepared.seed == 2)
+    assert taken.seed == 2
+    assert pool.stats()["discarded"] == 1
+    assert pool.take(lambda prepared: True) is None
+
+
+def test_create_session_pops_prepared_session_with_opener_audio(monkeypatch):
+    prepared = _prepared(424242)
+    monkeypatch.setattr(main_module, "_still_fresh", lambda _prepared: True)
+    pool = main_module.session_pool
+    with pool._lock:
+        pool._ready.clear()
+        pool._ready.append(prepared)
+    client = TestClient(main_module.app)
+
+    body = client.post("/sessions", json={"duration_minutes": 8}).json()
+
+    assert body["seed"] == 424242
+    assert body["opening_line"] == prepared.opening_line
+    assert base64.b64decode(body["opening_audio"]) == b"RIFF"
+    conversation = main_module.conversations.get(body["session_id"])
+    assert conversation.history == [("prospect", prepared.opening_line)]
+
+
+def test_similarity_window_indexes_the_spoken_opener(monkeypatch):
+    prepared = _prepared(515151)
+    prepared = PreparedSession(
+        seed=prepared.seed,
+        persona=prepared.persona,
+        opening_line="Dana here, you have ten seconds.",
+        opening_audio=b"",
+    )
+    indexed = []
+    monkeypatch.setattr(main_module, "_still_fresh", lambda _prepared: True)
+    monkeypatch.setattr(main_module.persona_similarity, "add", indexed.append)
+    pool = main_module.session_pool
+    with pool._lock:
+        pool._ready.clear()
+        pool._ready.append(prepared)
+
+    TestClient(main_module.app).post("/sessions", json={"duration_minutes": 8})
+
+    assert [persona.opening_line for persona in indexed] == ["Dana here, you have ten seconds."]
@@ -0,0 +1,57 @@
+﻿import time
+
+from app.persona import Persona, PersonaGenerator
+from app.similarity import PersonaEncoder, SimilarityIndex
+
+
+def _persona(**overrides) -> Persona:
+    fields = {
+        "industry": "saas",
+        "role": "owner",
+        "pain_point": "high_churn",
+        "personality": "direct",
+        "urgency": "no_rush",
+        "primary_objection": "busy",
+        "opening_line": "Yeah, I've got about two minutes. What is this?",
+    }
+    fields.update(overrides)
+    return Persona(**fields)
+
+
+def test_similarity_scores_duplicates_above_distinct_personas():
+    index = SimilarityIndex(PersonaEncoder.for_generator(PersonaGenerator()), window=4)
+    index.add(_persona())
+
+    scores = index.max_similarity(
+        [
+            _persona(),
+            _persona(
+                industry="healthcare",
+                role="vp_sales",
+                pain_point="tool_sprawl",
+                personality="friendly",
+                urgency="this_month",
+                primary_objection="send_email",
+                opening_line="Hi. Can you just put whatever this is in an email?",
+            ),
+        ]
+    )
+
+    assert abs(float(scores[0]) - 1.0) < 1e-5
+    assert scores[1] < 0.3
+
+
+def test_generator_rejects_candidates_too_close_to_the_window():
+    generator = PersonaGenerator()
+    index = SimilarityIndex(PersonaEncoder.for_generator(generator), window=400)
+    first = generator.generate(seed=7, recent_sessions=[])
+    index.add(first)
+    for seed in range(300):
+        index.add(generator.generate(seed=1000 + seed, recent_sessions=[]))
+
+    started = time.perf_counter()
+    chosen = generator.generate(seed=7, recent_sessions=[], similarity=index, max_similarity=0.99)
+    elapsed = time.perf_counter() - started
+
+    assert chosen != first
+    assert elapsed < 0.05
@@ -0,0 +1,102 @@
+﻿from array import array
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.streaming_stt import StreamingTranscriber, VADConfig
+from app.stt import STTService
+
+
+def _pcm(ms: int, amplitude: int) -> bytes:
+    samples = 16000 * ms // 1000
+    return array("h", [amplitude if i % 2 else -amplitude for i in range(samples)]).tobytes()
+
+
+class _CountingSTT(STTService):
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe_chunk(self, pcm_bytes: bytes) -> str:
+        self.calls += 1
+        return f"utterance {self.calls}"
+
+
+def test_transcriber_emits_partials_then_final_on_silence():
+    stt = _CountingSTT()
+    transcriber = StreamingTranscriber(stt, VADConfig(partial_interval_ms=200, end_of_turn_ms=300))
+
+    events = transcriber.feed(_pcm(400, 3000))
+    assert [e["type"] for e in events] == ["speech_start", "partial"]
+
+    events = transcriber.feed(_pcm(400, 0))
+    assert [e["type"] for e in events] == ["final", "end_of_turn"]
+    assert events[0]["text"] == f"utterance {stt.calls}"
+
+
+def test_transcriber_ignores_silence_only_input():
+    transcriber = StreamingTranscriber(_CountingSTT())
+    assert transcriber.feed(_pcm(1000, 10)) == []
+    assert transcriber.flush() == [{"type": "end_of_turn", "reason": "flush"}]
+
+
+def test_stt_stream_websocket_flush_returns_final(monkeypatch):
+    monkeypatch.setattr(main_module, "stt_service", _CountingSTT())
+    client = TestClient(main_module.app)
+
+    with client.websocket_connect("/stt/stream") as ws:
+        ws.send_bytes(_pcm(300, 3000))
+        assert ws.receive_json() == {"type": "speech_start"}
+        ws.send_text('{"type": "flush"}')
+        final = ws.receive_json()
+        assert final["type"] == "final"
+        assert ws.receive_json() == {"type": "end_of_turn", "reason": "flush"}
+
+
+def test_stt_stream_flush_error_still_ends_the_turn(monkeypatch):
+    class _FailingSTT(STTService):
+        def transcribe_chunk(self, pcm_bytes: bytes) -> str:
+            raise RuntimeError("whisper crashed")
+
+    monkeypatch.setattr(main_module, "stt_service", _FailingSTT())
+    client = TestClient(main_module.app)
+
+    with client.websocket_connect("/stt/stream") as ws:
+        ws.send_bytes(_pcm(300, 3000))
+        assert ws.receive_json() == {"type": "speech_start"}
+        ws.send_text('{"type": "flush"}')
+        assert ws.receive_json() == {"type": "error", "stage": "final", "detail": "whisper crashed"}
+        assert ws.receive_json() == {"type": "end_of_turn", "reason": "flush"}
+        ws.send_text('{"type": "flush"}')
+        assert ws.receive_json() == {"type": "end_of_turn", "reason": "flush"}
+
+
+def test_transcriber_keeps_turn_events_when_decodes_fail():
+    class _FlakySTT(_CountingSTT):
+        def transcribe_chunk(self, pcm_bytes: bytes) -> str:
+            super().transcribe_chunk(pcm_bytes)
+            if self.calls > 1:
+                raise RuntimeError("whisper crashed")
+            return "first utterance"
+
+    transcriber = StreamingTranscriber(_FlakySTT(), VADConfig(partial_interval_ms=200, end_of_turn_ms=300))
+
+    # The first utterance ends on silence; the second starts in the same chunk and its partial fails.
+    events = transcriber.feed(_pcm(300, 3000) + _pcm(400, 0) + _pcm(300, 3000))
+    assert [e["type"] for e in events] == ["speech_start", "final", "end_of_turn", "speech_start", "error"]
+    assert events[-1]["stage"] == "partial"
+
+    events = transcriber.feed(_pcm(400, 0))
+    assert events == [
+        {"type": "error", "stage": "final", "detail": "whisper crashed"},
+        {"type": "end_of_turn", "reason": "vad"},
+    ]
+
+
+def test_partial_decodes_stay_linear_in_utterance_length():
+    stt = _CountingSTT()
+    transcriber = StreamingTranscriber(stt, VADConfig(partial_interval_ms=200))
+    for _ in range(64):
+        transcriber.feed(_pcm(100, 3000))
+
+    # 6.4 s of speech in 100 ms chunks: a fixed 200 ms cadence would decode 32 times.
+    assert stt.calls <= 7
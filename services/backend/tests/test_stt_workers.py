@@ -0,0 +1,75 @@
+﻿import sys
+from pathlib import Path
+import uuid
+
+import numpy as np
+import pytest
+
+from app.stt import WhisperWorkerPoolSTTService
+from app.workers import WorkerPool
+
+FAKE_WORKER = """
+import json, sys
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+stdout.write(b'{"ready": true}\\n'); stdout.flush()
+for line in stdin:
+    header = json.loads(line)
+    payload = stdin.read(header["bytes"])
+    if payload == b"CRASH":
+        sys.exit(3)
+    stdout.write(json.dumps({"text": "heard %d bytes" % len(payload)}).encode() + b"\\n")
+    stdout.flush()
+"""
+
+
+def _fake_worker_command() -> str:
+    test_dir = Path(".runtime_test") / str(uuid.uuid4())
+    test_dir.mkdir(parents=True, exist_ok=True)
+    script = test_dir / "fake_whisper_worker.py"
+    script.write_text(FAKE_WORKER, encoding="utf-8")
+    return f'"{sys.executable}" "{script.resolve()}"'
+
+
+def test_worker_pool_reuses_resident_process():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = WhisperWorkerPoolSTTService(pool)
+    try:
+        assert svc.transcribe_chunk(b"RIFFfakewav") == "heard 11 bytes"
+        pid = pool.workers[0].process.pid
+        assert svc.transcribe_chunk(b"RIFF") == "heard 4 bytes"
+        assert pool.workers[0].process.pid == pid
+        assert pool.stats()["queue_depth"] == 0
+    finally:
+        pool.close()
+
+
+def test_worker_pool_restarts_crashed_worker():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = WhisperWorkerPoolSTTService(pool)
+    try:
+        with pytest.raises(RuntimeError, match="STT worker failed"):
+            svc.transcribe_chunk(b"CRASH")
+        assert svc.transcribe_chunk(b"RIFF") == "heard 4 bytes"
+        assert pool.stats()["restarts"] >= 1
+    finally:
+        pool.close()
+
+
+def test_missing_worker_binary_surfaces_as_stt_failure():
+    pool = WorkerPool("/nonexistent/whisper --x", size=1)
+    svc = WhisperWorkerPoolSTTService(pool)
+    try:
+        with pytest.raises(RuntimeError, match="STT worker failed: worker failed to start"):
+            svc.transcribe_chunk(b"abc")
+        assert pool.stats()["busy"] == 0
+    finally:
+        pool.close()
+
+
+def test_worker_receives_decoded_samples_as_f32le():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = WhisperWorkerPoolSTTService(pool)
+    try:
+        assert svc.transcribe_pcm(np.zeros(1600, dtype=np.float32)) == "heard 6400 bytes"
+    finally:
+        pool.close()
@@ -0,0 +1,45 @@
+﻿from pathlib import Path
+import uuid
+
+from app.tts import CachedTTSService, TTSService
+from app.tts_cache import TTSAudioCache
+
+
+class _CountingTTS(TTSService):
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text: str) -> bytes:
+        self.calls += 1
+        return b"WAV:" + text.encode("utf-8")
+
+
+def _cache_dir() -> Path:
+    return Path(".runtime_test") / str(uuid.uuid4())
+
+
+def test_cached_tts_skips_backend_on_repeat_lines():
+    backend = _CountingTTS()
+    cache = TTSAudioCache(memory_budget_bytes=1024, disk_dir=_cache_dir())
+    svc = CachedTTSService(backend, cache, voice_path="voice.onnx")
+
+    first = svc.synthesize("We are not allocating budget right now.")
+    second = svc.synthesize("We are  not allocating budget right now. ")
+
+    assert first == second
+    assert backend.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_lru_in_memory_and_serves_from_disk():
+    disk = _cache_dir()
+    cache = TTSAudioCache(memory_budget_bytes=10, disk_dir=disk)
+    cache.put("a", b"123456")
+    cache.put("b", b"abcdef")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["memory_entries"] == 1
+
+    reopened = TTSAudioCache(memory_budget_bytes=10, disk_dir=disk)
+    assert reopened.get("a") == b"123456"
+    assert reopened.stats()["disk_hits"] == 1
@@ -0,0 +1,87 @@
+﻿import io
+from pathlib import Path
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.audio_egress as audio_egress
+import app.main as main_module
+from app.audio import pcm_to_wav
+from app.audio_egress import negotiate_format
+from app.tts import CachedTTSService, TTSService
+from app.tts_cache import TTSAudioCache
+
+PCM = (np.sin(np.arange(22050) / 10.0) * 8000).astype("<i2").tobytes()
+
+
+class _WavTTS(TTSService):
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text: str) -> bytes:
+        self.calls += 1
+        return pcm_to_wav(PCM, 22050)
+
+
+def test_format_negotiation_prefers_explicit_format_then_accept(monkeypatch):
+    monkeypatch.setattr(audio_egress, "av", object())
+    assert negotiate_format("pcm", "audio/ogg") == "pcm"
+    assert negotiate_format(None, "audio/ogg;codecs=opus, audio/pcm") == "opus"
+    assert negotiate_format(None, "application/json") == "wav"
+    assert negotiate_format(None, "") == "wav"
+
+    monkeypatch.setattr(audio_egress, "av", None)
+    assert negotiate_format(None, "audio/ogg, audio/pcm") == "pcm"
+    assert negotiate_format("opus", "") is None
+
+
+def test_pcm_format_streams_raw_frames_with_rate_headers(monkeypatch):
+    monkeypatch.setattr(main_module, "tts_service", _WavTTS())
+    client = TestClient(main_module.app)
+
+    resp = client.post("/tts/synthesize?format=pcm", json={"text": "hello"})
+    wav = client.post("/tts/synthesize", json={"text": "hello"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "audio/pcm"
+    assert resp.headers["x-audio-sample-rate"] == "22050"
+    assert resp.headers["x-audio-encoding"] == "s16le"
+    assert resp.content == PCM
+    assert wav.headers["content-type"] == "audio/wav"
+
+
+def test_opus_without_pyav_is_not_acceptable(monkeypatch):
+    monkeypatch.setattr(audio_egress, "av", None)
+    client = TestClient(main_module.app)
+
+    assert client.post("/tts/synthesize?format=opus", json={"text": "hello"}).status_code == 406
+
+
+def test_streamed_pcm_fills_the_tts_cache():
+    backend = _WavTTS()
+    cache = TTSAudioCache(memory_budget_bytes=1 << 20, disk_dir=Path(".runtime_test") / str(uuid.uuid4()))
+    svc = CachedTTSService(backend, cache, voice_path="voice.onnx")
+
+    first = b"".join(svc.open_pcm_stream("hello").chunks)
+    second = svc.open_pcm_stream("hello")
+
+    assert first == PCM
+    assert second.sample_rate == 22050 and b"".join(second.chunks) == PCM
+    assert backend.calls == 1
+
+
+def test_opus_output_is_ogg_and_much_smaller_than_pcm(monkeypatch):
+    av = pytest.importorskip("av")
+    monkeypatch.setattr(audio_egress, "av", av)
+    monkeypatch.setattr(main_module, "tts_service", _WavTTS())
+    client = TestClient(main_module.app)
+
+    resp = client.post("/tts/synthesize", json={"text": "hello"}, headers={"Accept": "audio/ogg"})
+
+    assert resp.headers["content-type"] == "audio/ogg; codecs=opus"
+    assert resp.content[:4] == b"OggS"
+    assert len(resp.content) * 4 < len(PCM)
+    with av.open(io.BytesIO(resp.content)) as container:
+        assert sum(frame.samples for frame in container.decode(audio=0)) == 48000
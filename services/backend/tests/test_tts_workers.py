@@ -0,0 +1,94 @@
+﻿import io
+import json
+import sys
+from pathlib import Path
+import uuid
+import wave
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.tts import PiperWorkerTTSService
+from app.workers import WorkerPool
+
+FAKE_WORKER = """
+import json, sys
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+stdout.write(b'{"ready": true, "sample_rate": 16000}\\n'); stdout.flush()
+for line in stdin:
+    text = json.loads(line)["text"]
+    if text == "fail":
+        stdout.write(b'{"error": "bad text"}\\n'); stdout.flush()
+        continue
+    for word in text.split():
+        pcm = word.encode() * 2
+        stdout.write(json.dumps({"pcm": len(pcm)}).encode() + b"\\n" + pcm)
+    stdout.write(b'{"done": true}\\n'); stdout.flush()
+"""
+
+
+def _fake_worker_command() -> str:
+    test_dir = Path(".runtime_test") / str(uuid.uuid4())
+    test_dir.mkdir(parents=True, exist_ok=True)
+    script = test_dir / "fake_piper_worker.py"
+    script.write_text(FAKE_WORKER, encoding="utf-8")
+    return f'"{sys.executable}" "{script.resolve()}"'
+
+
+def test_piper_worker_streams_pcm_and_wraps_wav():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = PiperWorkerTTSService(pool)
+    try:
+        assert list(svc.synthesize_stream("hi there")) == [b"hihi", b"therethere"]
+        with wave.open(io.BytesIO(svc.synthesize("hi there")), "rb") as wav:
+            assert wav.getframerate() == 16000
+            assert wav.readframes(wav.getnframes()) == b"hihitherethere"
+    finally:
+        pool.close()
+
+
+def test_piper_worker_reports_errors_without_losing_worker():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = PiperWorkerTTSService(pool)
+    try:
+        with pytest.raises(RuntimeError, match="TTS worker failed"):
+            svc.synthesize("fail")
+        assert list(svc.synthesize_stream("ok")) == [b"okok"]
+        assert pool.stats()["restarts"] == 0
+    finally:
+        pool.close()
+
+
+def test_piper_worker_pcm_stream_reports_voice_sample_rate():
+    pool = WorkerPool(_fake_worker_command(), size=1)
+    svc = PiperWorkerTTSService(pool, sample_rate=22050)
+    try:
+        stream = svc.open_pcm_stream("hi there")
+        assert stream.sample_rate == 16000
+        assert list(stream.chunks) == [b"hihi", b"therethere"]
+    finally:
+        pool.close()
+
+
+def test_missing_piper_worker_degrades_speech_to_text(monkeypatch):
+    async def _tokens(_prompt):
+        yield "Sure."
+
+    pool = WorkerPool("/nonexistent/piper --x", size=1)
+    monkeypatch.setattr(main_module, "tts_service", PiperWorkerTTSService(pool))
+    monkeypatch.setattr(main_module.ollama_client, "generate_stream", _tokens)
+    client = TestClient(main_module.app)
+    try:
+        speech = client.post(
+            "/dialogue/turn/speech",
+            json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Can I get 30 seconds?"},
+        )
+        tts = client.post("/tts/synthesize", json={"text": "hello"}, params={"format": "pcm"})
+    finally:
+        pool.close()
+
+    frames = [json.loads(line) for line in speech.text.splitlines()]
+    assert frames[-1]["type"] == "done"
+    assert frames[-1]["text"] == "Sure."
+    assert tts.status_code == 503
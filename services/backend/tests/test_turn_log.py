@@ -0,0 +1,123 @@
+﻿from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.main as main_module
+from app.db import SessionLocal
+from app.models import TurnRecord
+from app.turn_log import TurnEntry, TurnLogWriter
+
+
+def test_turn_log_group_commits_and_flushes_durably():
+    writer = TurnLogWriter(SessionLocal, batch_size=64, flush_interval_seconds=5.0)
+    session_id = str(uuid4())
+    for index in range(5):
+        writer.record(TurnEntry(session_id, index, "trainee", f"line {index}"))
+
+    assert writer.flush(timeout=5.0)
+
+    with SessionLocal() as db:
+        rows = db.scalars(select(TurnRecord).where(TurnRecord.session_id == session_id)).all()
+    assert [row.turn_index for row in rows] == [0, 1, 2, 3, 4]
+    # All five arrived before the barrier, so they land in one transaction.
+    assert writer.batches == 1
+    assert writer.rows == 5
+
+
+def test_session_end_persists_dialogue_turns(monkeypatch):
+    class _LLM:
+        async def generate(self, prompt: str, timeout=None, context=None, on_context=None) -> str:
+            return "Not interested."
+
+    monkeypatch.setattr(main_module, "ollama_client", _LLM())
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    client.post(
+        "/dialogue/turn",
+        json={"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi there.", "session_id": session_id},
+    )
+
+    ended = client.post(f"/sessions/{session_id}/end")
+    turns = client.get(f"/sessions/{session_id}/turns").json()["turns"]
+
+    assert ended.json() == {"session_id": session_id, "durable": True}
+    assert [(t["speaker"], t["text"]) for t in turns][1:] == [("trainee", "Hi there."), ("prospect", "Not interested.")]
+    assert [t["turn_index"] for t in turns] == [0, 1, 2]
+    assert turns[2]["trust"] is not None
+
+
+def test_ended_session_can_still_be_scored_but_takes_no_more_turns(monkeypatch):
+    class _LLM:
+        async def generate(self, prompt: str, timeout=None, context=None, on_context=None) -> str:
+            return "Not interested."
+
+    monkeypatch.setattr(main_module, "ollama_client", _LLM())
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    turn = {"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi there.", "session_id": session_id}
+    client.post("/dialogue/turn", json=turn)
+
+    assert client.post(f"/sessions/{session_id}/end").status_code == 200
+    scored = client.post(f"/sessions/{session_id}/score", json={"outcomes": {"close_attempt": False}})
+    late = client.post("/dialogue/turn", json=turn)
+
+    assert scored.status_code == 200
+    assert late.status_code == 409
+
+
+def test_flush_reports_failure_when_a_batch_was_lost():
+    writer = TurnLogWriter(SessionLocal, batch_size=1, flush_interval_seconds=5.0)
+    real_write = writer._write
+    failures = [RuntimeError("disk I/O error")]
+
+    def _write(entries, durable):
+        if entries and failures:
+            raise failures.pop()
+        real_write(entries, durable)
+
+    writer._write = _write
+    session_id = str(uuid4())
+    writer.record(TurnEntry(session_id, 0, "trainee", "lost"))
+
+    assert writer.flush(timeout=5.0) is False
+    assert writer.stats()["errors"] == 1
+    writer.record(TurnEntry(session_id, 1, "trainee", "kept"))
+    assert writer.flush(timeout=5.0) is True
+
+
+def test_session_end_returns_503_when_turns_were_not_persisted(monkeypatch):
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    monkeypatch.setattr(main_module.turn_log, "flush", lambda timeout=10.0: False)
+
+    ended = client.post(f"/sessions/{session_id}/end")
+
+    assert ended.status_code == 503
+
+
+def test_ending_unknown_sessions_is_rejected():
+    assert TestClient(main_module.app).post(f"/sessions/{uuid4()}/end").status_code == 404
+
+
+def test_ended_session_stays_ended_after_eviction(monkeypatch):
+    class _LLM:
+        async def generate(self, prompt: str, timeout=None, context=None, on_context=None) -> str:
+            return "Not interested."
+
+    monkeypatch.setattr(main_module, "ollama_client", _LLM())
+    client = TestClient(main_module.app)
+    session_id = client.post("/sessions", json={"duration_minutes": 8}).json()["session_id"]
+    turn = {"trust": 0.4, "resistance": 0.6, "trainee_text": "Hi there.", "session_id": session_id}
+    client.post("/dialogue/turn", json=turn)
+    client.post(f"/sessions/{session_id}/end")
+
+    with main_module.conversations._lock:
+        main_module.conversations._items.pop(session_id)
+    late = client.post("/dialogue/turn", json=turn)
+    again = client.post(f"/sessions/{session_id}/end")
+    turns = client.get(f"/sessions/{session_id}/turns").json()["turns"]
+
+    assert late.status_code == 409
+    assert again.status_code == 200
+    assert [t["speaker"] for t in turns] == ["prospect", "trainee", "prospect"]
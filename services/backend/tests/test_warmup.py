@@ -0,0 +1,60 @@
+﻿import asyncio
+import json
+
+import httpx
+
+from app.dialogue import AsyncOllamaClient
+from app.warmup import KeepAlive, Warmup
+
+
+def test_warmup_reports_each_component_readiness():
+    async def _ok() -> None:
+        return None
+
+    async def _fail() -> None:
+        raise RuntimeError("piper missing")
+
+    warmup = Warmup({"ollama": _ok, "piper": _fail})
+    assert warmup.report()["ready"] is False
+
+    asyncio.run(warmup.run())
+    report = warmup.report()
+
+    assert report["finished"] is True
+    assert report["ready"] is False
+    assert report["components"]["ollama"]["ready"] is True
+    assert report["components"]["piper"]["detail"] == "piper missing"
+
+
+def test_keep_alive_refreshes_only_while_session_active():
+    calls = []
+
+    async def _refresh() -> None:
+        calls.append(1)
+
+    keep_alive = KeepAlive(refresh=_refresh, interval_seconds=60, active_window_seconds=600)
+
+    asyncio.run(keep_alive.tick())
+    assert calls == []
+
+    keep_alive.touch()
+    asyncio.run(keep_alive.tick())
+    assert calls == [1]
+
+
+def test_ollama_preload_sends_keep_alive_without_prompt():
+    sent = {}
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        sent.update(json.loads(request.content))
+        return httpx.Response(200, json={"done": True})
+
+    client = AsyncOllamaClient(
+        base_url="http://127.0.0.1:11434",
+        model="mistral:7b",
+        keep_alive="15m",
+        transport=httpx.MockTransport(_handler),
+    )
+    asyncio.run(client.preload())
+
+    assert sent == {"model": "mistral:7b", "keep_alive": "15m"}